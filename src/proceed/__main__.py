@@ -0,0 +1,5 @@
+import sys
+
+from proceed.cli import main
+
+sys.exit(main())
@@ -1,23 +1,43 @@
+import heapq
+import itertools
 import logging
-from typing import Any
+import math
+import os
+import pickle
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Iterable, Iterator
 from pathlib import Path
 from pandas import DataFrame
-import yaml
-from proceed.model import ExecutionRecord, Pipeline, Step, Timing, StepResult
+from proceed.model import ArrayTaskResult, ExecutionRecord, Pipeline, Step, Timing, StepResult
 from proceed.file_matching import flatten_matches, file_summary, hash_contents
+from proceed.custom_columns import collect_custom_columns, custom_columns_for_file
+from proceed.summary_index import SummaryIndex
 
-def summarize_results(results_path: Path, columns: list[str] = None, sort_rows_by: list[str] = None) -> DataFrame:
-    summary_rows = []
-    group_paths = [path for path in results_path.iterdir() if path.is_dir()]
-    for group_path in group_paths:
-        id_paths = [path for path in group_path.iterdir() if path.is_dir()]
-        for id_path in id_paths:
-            for yaml_file in id_path.glob("execution_record.yaml"):
-                execution_record = safe_read_execution_record(yaml_file)
-                if execution_record:
-                    execution_summary = summarize_execution(id_path.stem, group_path.stem, execution_record)
-                    summary_rows = summary_rows + execution_summary
+def summarize_results(
+    results_path: Path,
+    columns: list[str] = None,
+    sort_rows_by: list[str] = None,
+    max_workers: int = None,
+    index_path: Path = None,
+    summary_filter: "SummaryFilter" = None
+) -> DataFrame:
+    """Summarize all the execution records found under the given results_path.
+
+    Records are parsed and summarized in parallel, by up to max_workers processes.
+    The default is to use all CPUs available to this process, and max_workers=1 works without a process pool.
+    Either way, summary rows are combined in the same, sorted order of results group and results id.
+
+    With an index_path, summary rows are also kept in a :class:`SummaryIndex` at that path.
+    Then only records that are new or changed since the last summary need to be parsed again.
+
+    With a :class:`SummaryFilter`, only records from the chosen groups, times, and args are included.
 
+    This holds the whole summary in memory -- see write_summary() for large results dirs.
+    """
+    summary_rows = list(iter_summary_rows(results_path, max_workers, index_path, summary_filter))
     summary = DataFrame(summary_rows)
 
     if columns:
@@ -33,6 +53,690 @@ def summarize_results(results_path: Path, columns: list[str] = None, sort_rows_b
     return summary
 
 
+def iter_summary_rows(
+    results_path: Path,
+    max_workers: int = None,
+    index_path: Path = None,
+    summary_filter: "SummaryFilter" = None
+) -> Iterator[dict[str, Any]]:
+    """Yield summary rows one at a time, for all the execution records found under the given results_path.
+
+    The max_workers, index_path, and summary_filter are the same as for summarize_results().
+    """
+    record_paths = find_execution_records(results_path, summary_filter)
+    if index_path:
+        record_rows = summarize_with_index(
+            results_path, record_paths, index_path, max_workers, summary_filter=summary_filter)
+    else:
+        record_rows = filter_summaries(summarize_record_files(record_paths, max_workers), summary_filter)
+    for rows in record_rows:
+        yield from rows
+
+
+def iter_summary_tables(
+    results_path: Path,
+    max_workers: int = None,
+    index_path: Path = None,
+    summary_filter: "SummaryFilter" = None
+) -> Iterator[dict[str, list[dict[str, Any]]]]:
+    """Yield normalized summary tables, per execution record, for all the records found under the given results_path.
+
+    Each item is a dict from table name to the rows for one record, see summarize_execution_tables().
+    The max_workers, index_path, and summary_filter are the same as for summarize_results().
+    """
+    record_paths = find_execution_records(results_path, summary_filter)
+    if index_path:
+        yield from summarize_with_index(
+            results_path, record_paths, index_path, max_workers, summarize=summarize_record_file_tables, kind="tables",
+            summary_filter=summary_filter, record_args=summary_tables_args)
+    else:
+        record_tables = summarize_record_files(record_paths, max_workers, summarize=summarize_record_file_tables)
+        yield from filter_summaries(record_tables, summary_filter, summary_tables_args)
+
+
+def write_summary(
+    summary_rows: Iterable[dict[str, Any]],
+    out_file: Path,
+    columns: list[str] = None,
+    sort_rows_by: list[str] = None,
+    chunk_size: int = 10000,
+    summary_format: str = None
+) -> int:
+    """Write summary rows to a CSV, Parquet, or Feather file, holding at most chunk_size rows in memory at a time.
+
+    Rows from the given summary_rows, like from iter_summary_rows(), are spooled to temporary files
+    in chunks and, when sort_rows_by is given, sorted with an external merge sort (see :class:`SummarySpool`).
+
+    The summary_format may be "csv", "parquet", or "feather", or by default chosen from the out_file suffix
+    (see :attr:`summary_formats`).  Parquet and Feather require the optional ``pyarrow`` package.
+    These columnar formats also get numeric columns parsed as numbers, like ``step_exit_code``,
+    and categorical encoding of low-cardinality string columns, like ``file_role``.
+
+    Returns the number of rows written.
+    """
+    if columns:
+        sort_columns = [column for column in sort_rows_by or [] if column in columns]
+    else:
+        sort_columns = sort_rows_by or []
+
+    summary_format = choose_summary_format(out_file, summary_format)
+    with TemporaryDirectory(prefix="proceed_summary_") as spool_dir:
+        spool = SummarySpool(Path(spool_dir), sort_columns=sort_columns, chunk_size=chunk_size,
+                             parse_numbers=summary_format != "csv")
+        spool.add_rows(summary_rows)
+        return spool.write(out_file, columns, summary_format)
+
+
+def write_summary_tables(
+    summary_tables: Iterable[dict[str, list[dict[str, Any]]]],
+    out_file: Path,
+    columns: list[str] = None,
+    sort_rows_by: list[str] = None,
+    chunk_size: int = 10000,
+    summary_format: str = None
+) -> dict[str, Path]:
+    """Write normalized summary tables to separate CSV, Parquet, or Feather files, like write_summary().
+
+    The given summary_tables, like from iter_summary_tables(), are written to files named after the out_file
+    and each table, for example ``summary.csv`` becomes ``summary_pipelines.csv``, ``summary_steps.csv``,
+    ``summary_files.csv``, and ``summary_array_tasks.csv``.
+
+    The columns and sort_rows_by apply to each table where they occur,
+    and key columns (see :attr:`summary_table_keys`) are always kept so that tables can be joined.
+
+    Returns a dict from table name to the file that was written.
+    """
+    summary_format = choose_summary_format(out_file, summary_format)
+    with TemporaryDirectory(prefix="proceed_summary_") as spool_dir:
+        spools = {}
+        for table_name, key_columns in summary_table_keys.items():
+            if columns:
+                table_columns = key_columns + [column for column in columns if column not in key_columns]
+                sort_columns = [column for column in sort_rows_by or [] if column in table_columns]
+            else:
+                table_columns = None
+                sort_columns = sort_rows_by or []
+            table_dir = Path(spool_dir, table_name)
+            table_dir.mkdir()
+            spool = SummarySpool(table_dir, sort_columns=sort_columns, chunk_size=chunk_size,
+                                 parse_numbers=summary_format != "csv")
+            spools[table_name] = (spool, table_columns)
+
+        for record_tables in summary_tables:
+            for table_name, rows in record_tables.items():
+                spools[table_name][0].add_rows(rows)
+
+        table_files = {}
+        for table_name, (spool, table_columns) in spools.items():
+            table_file = summary_table_path(out_file, table_name)
+            spool.write(table_file, table_columns, summary_format)
+            table_files[table_name] = table_file
+        return table_files
+
+
+summary_table_keys = {
+    "pipelines": ["results_group", "results_id"],
+    "steps": ["results_group", "results_id", "step_name"],
+    "files": ["results_group", "results_id", "step_name"],
+    "array_tasks": ["results_group", "results_id", "step_name"],
+}
+"""Key columns for each normalized summary table.
+
+Steps join to pipelines by ``results_group`` and ``results_id``, and files and array tasks join to steps
+by these and ``step_name``.
+"""
+
+
+def summary_table_path(out_file: Path, table_name: str) -> Path:
+    """Choose a file for one normalized summary table, like summary.csv -> summary_steps.csv."""
+    out_file = Path(out_file)
+    return out_file.with_name(f"{out_file.stem}_{table_name}{out_file.suffix}")
+
+
+class SummarySpool():
+    """Spool summary rows to temporary files in chunks, noting all the columns and value types that occur.
+
+    This way, the rows can be written back out in chunks, and every chunk can be written with the same
+    columns, even if the first chunk doesn't have them all.
+
+    With sort_columns, each spooled chunk is sorted as it's written, and the sorted chunks are merged
+    when writing out -- an external merge sort.  Like pandas sort_values(), this sorts missing values
+    last and keeps rows with equal sort values in their original order.  To limit open files,
+    at most merge_fan_in chunks are merged at once, with extra passes through merged chunk files as needed.
+
+    With parse_numbers, numeric columns that the summary holds as strings, like ``step_exit_code``,
+    are parsed as numbers (see :attr:`summary_numeric_columns`).
+
+    The spool also collects distinct string values per column, up to category_limit, so that
+    low-cardinality columns can be written as categorical / dictionary-encoded columns.
+    Columns count as low-cardinality when they have at most category_limit distinct values,
+    and each value repeats at least twice, on average.
+    """
+
+    def __init__(
+        self,
+        spool_dir: Path,
+        sort_columns: list[str] = [],
+        chunk_size: int = 10000,
+        parse_numbers: bool = False,
+        category_limit: int = 1000,
+        merge_fan_in: int = 64
+    ):
+        self.spool_dir = spool_dir
+        self.sort_columns = sort_columns
+        self.sort_key = summary_sort_key(sort_columns)
+        self.chunk_size = chunk_size
+        self.merge_fan_in = max(2, merge_fan_in)
+        self.parse_numbers = parse_numbers
+        self.category_limit = category_limit
+
+        self.spool_paths = []
+        self.column_types = {}
+        self.column_values = {}
+        self.column_counts = {}
+        self.chunk = []
+
+    def add_rows(self, rows: Iterable[dict[str, Any]]):
+        for row in rows:
+            if self.parse_numbers:
+                row = parse_summary_numbers(row)
+            for column, value in row.items():
+                kinds = self.column_types.setdefault(column, set())
+                if not is_missing(value):
+                    kinds.add(type(value))
+                values = self.column_values.setdefault(column, set())
+                if values is not None and isinstance(value, str):
+                    values.add(value)
+                    self.column_counts[column] = self.column_counts.get(column, 0) + 1
+                    if len(values) > self.category_limit:
+                        self.column_values[column] = None
+            self.chunk.append(row)
+            if len(self.chunk) >= self.chunk_size:
+                self._spool_chunk()
+
+    def _spool_chunk(self):
+        if self.sort_columns:
+            self.chunk.sort(key=self.sort_key)
+        spool_path = Path(self.spool_dir, f"chunk_{len(self.spool_paths)}.pickle")
+        write_spooled_rows(self.chunk, spool_path)
+        self.spool_paths.append(spool_path)
+        self.chunk = []
+
+    def rows(self) -> Iterator[dict[str, Any]]:
+        """Read back all the spooled rows, in sorted order if there are sort_columns."""
+        if self.chunk:
+            self._spool_chunk()
+
+        if self.sort_columns:
+            self._merge_spooled_chunks()
+            spooled_chunks = [read_spooled_rows(spool_path) for spool_path in self.spool_paths]
+            return heapq.merge(*spooled_chunks, key=self.sort_key)
+        else:
+            spooled_chunks = [read_spooled_rows(spool_path) for spool_path in self.spool_paths]
+            return itertools.chain(*spooled_chunks)
+
+    def _merge_spooled_chunks(self):
+        """Merge runs of up to merge_fan_in sorted chunks into bigger chunks, until a final merge fits merge_fan_in."""
+        merge_pass = 0
+        while len(self.spool_paths) > self.merge_fan_in:
+            merged_paths = []
+            for group_paths in iter_chunks(self.spool_paths, self.merge_fan_in):
+                if len(group_paths) == 1:
+                    merged_paths.append(group_paths[0])
+                    continue
+                # Merging consecutive chunks in order keeps rows with equal sort values in their original order.
+                merged_path = Path(self.spool_dir, f"merge_{merge_pass}_{len(merged_paths)}.pickle")
+                group_chunks = [read_spooled_rows(spool_path) for spool_path in group_paths]
+                write_spooled_rows(heapq.merge(*group_chunks, key=self.sort_key), merged_path)
+                for spool_path in group_paths:
+                    spool_path.unlink()
+                merged_paths.append(merged_path)
+            self.spool_paths = merged_paths
+            merge_pass += 1
+
+    def write(self, out_file: Path, columns: list[str] = None, summary_format: str = None) -> int:
+        """Write all the spooled rows to a CSV, Parquet, or Feather file, keeping only the given columns that occur."""
+        out_file = Path(out_file)
+        summary_format = choose_summary_format(out_file, summary_format)
+        if columns:
+            out_columns = [column for column in columns if column in self.column_types]
+        else:
+            out_columns = list(self.column_types.keys())
+
+        chunks = iter_chunks(self.rows(), self.chunk_size)
+        if summary_format == "csv":
+            return write_csv_chunks(chunks, out_file, out_columns)
+        else:
+            return write_arrow_chunks(chunks, out_file, out_columns, self.column_types, self.categories(), summary_format)
+
+    def categories(self) -> dict[str, set[str]]:
+        """Get the distinct values of each low-cardinality string column."""
+        return {
+            column: values
+            for column, values in self.column_values.items()
+            if values and len(values) * 2 <= self.column_counts[column]
+        }
+
+
+summary_formats = {
+    "csv": [".csv"],
+    "parquet": [".parquet"],
+    "feather": [".feather", ".arrow"],
+}
+"""Supported summary file formats, and the file suffixes that imply each one."""
+
+
+summary_numeric_columns = {"step_exit_code", "step_log_size", "task_exit_code"}
+"""Summary columns that hold numbers as strings, which can be parsed as numbers (as can ``*_duration`` columns)."""
+
+
+def choose_summary_format(out_file: Path, summary_format: str = None) -> str:
+    """Check the given summary_format, or choose one based on the out_file suffix, defaulting to "csv"."""
+    if summary_format:
+        if summary_format not in summary_formats:
+            raise ValueError(f"Unknown summary format {summary_format!r}, expected one of {list(summary_formats.keys())}")
+        return summary_format
+
+    suffix = Path(out_file).suffix
+    for format_name, suffixes in summary_formats.items():
+        if suffix in suffixes:
+            return format_name
+    return "csv"
+
+
+def parse_summary_numbers(row: dict[str, Any]) -> dict[str, Any]:
+    """Parse numeric columns that the summary holds as strings, like step_exit_code "0" -> 0, or "None" -> None."""
+    parsed = {}
+    for column, value in row.items():
+        if isinstance(value, str) and (column in summary_numeric_columns or column.endswith("_duration")):
+            parsed[column] = parse_number(value)
+        else:
+            parsed[column] = value
+    return parsed
+
+
+def parse_number(value: str) -> int | float | str | None:
+    """Parse the given string as an int or float, or None if it's empty or "None", otherwise leave it as-is."""
+    if value == "" or value == "None":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def iter_chunks(items: Iterable[Any], chunk_size: int) -> Iterator[list[Any]]:
+    """Group items into lists of up to chunk_size items each."""
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, chunk_size)):
+        yield chunk
+
+
+def is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def write_spooled_rows(rows: Iterable[dict[str, Any]], spool_path: Path, batch_size: int = 256):
+    """Pickle rows to a file in small batches, so they can be read back a few at a time."""
+    with open(spool_path, "wb") as f:
+        for batch in iter_chunks(rows, batch_size):
+            pickle.dump(batch, f)
+
+
+def read_spooled_rows(spool_path: Path) -> Iterator[dict[str, Any]]:
+    """Read back rows from write_spooled_rows(), one batch at a time."""
+    with open(spool_path, "rb") as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+
+def summary_sort_key(sort_columns: list[str]) -> Callable[[dict[str, Any]], tuple]:
+    """Make a key function for sorting summary rows by the given columns, with missing values last."""
+    def sort_key(row: dict[str, Any]) -> tuple:
+        key = []
+        for column in sort_columns:
+            value = row.get(column)
+            if is_missing(value):
+                key.append((1, 0, ""))
+            elif isinstance(value, (int, float)):
+                key.append((0, 0, value))
+            else:
+                key.append((0, 1, str(value)))
+        return tuple(key)
+    return sort_key
+
+
+def write_csv_chunks(chunks: Iterator[list[dict[str, Any]]], out_file: Path, columns: list[str]) -> int:
+    row_count = 0
+    with open(out_file, "w", newline="") as f:
+        DataFrame(columns=columns).to_csv(f, index=False)
+        for chunk in chunks:
+            # Object dtype keeps ints as written, rather than converting to float when some values are missing.
+            DataFrame(chunk, columns=columns, dtype=object).to_csv(f, header=False, index=False)
+            row_count += len(chunk)
+    return row_count
+
+
+def summary_arrow_schema(
+    columns: list[str],
+    column_types: dict[str, set[type]],
+    categories: dict[str, set[str]]
+) -> tuple[Any, dict[str, Callable[[Any], Any]], dict[str, list[str]]]:
+    """Choose one Arrow type per summary column, along with any converters or dictionaries for values of each column.
+
+    Columns with only bools, ints, or numbers get bool, int64, or float64 types.
+    Other columns are written as strings, and low-cardinality string columns are dictionary-encoded,
+    which pandas reads back as categorical.  Each dictionary holds all the distinct values of its column,
+    so that all chunks of the summary can share the same dictionary.
+    """
+    # Lazy import so pyarrow is only required when actually used.
+    import pyarrow
+
+    fields = []
+    converters = {}
+    dictionaries = {}
+    for column in columns:
+        kinds = column_types[column]
+        if kinds and kinds <= {bool}:
+            fields.append(pyarrow.field(column, pyarrow.bool_()))
+        elif kinds and kinds <= {int}:
+            fields.append(pyarrow.field(column, pyarrow.int64()))
+        elif kinds and kinds <= {int, float}:
+            fields.append(pyarrow.field(column, pyarrow.float64()))
+            converters[column] = float
+        elif kinds == {str} and column in categories:
+            fields.append(pyarrow.field(column, pyarrow.dictionary(pyarrow.int32(), pyarrow.string())))
+            dictionaries[column] = sorted(categories[column])
+        else:
+            fields.append(pyarrow.field(column, pyarrow.string()))
+            converters[column] = str
+    return (pyarrow.schema(fields), converters, dictionaries)
+
+
+def write_arrow_chunks(
+    chunks: Iterator[list[dict[str, Any]]],
+    out_file: Path,
+    columns: list[str],
+    column_types: dict[str, set[type]],
+    categories: dict[str, set[str]],
+    summary_format: str = "parquet"
+) -> int:
+    """Write chunks of summary rows to a Parquet or Feather file, with the same schema for all chunks."""
+    # Lazy import so pyarrow is only required when actually used.
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    (schema, converters, dictionaries) = summary_arrow_schema(columns, column_types, categories)
+    dictionary_arrays = {column: pyarrow.array(values, pyarrow.string()) for column, values in dictionaries.items()}
+    dictionary_indexes = {column: {value: index for index, value in enumerate(values)} for column, values in dictionaries.items()}
+
+    if summary_format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(out_file, schema)
+    else:
+        # Feather version 2 is the Arrow IPC file format.
+        writer = pyarrow.ipc.new_file(out_file, schema)
+
+    row_count = 0
+    with writer:
+        for chunk in chunks:
+            arrays = []
+            for field in schema:
+                values = [row.get(field.name) for row in chunk]
+                if field.name in dictionary_indexes:
+                    indexes = dictionary_indexes[field.name]
+                    indices = pyarrow.array([None if is_missing(value) else indexes[value] for value in values], pyarrow.int32())
+                    arrays.append(pyarrow.DictionaryArray.from_arrays(indices, dictionary_arrays[field.name]))
+                else:
+                    convert = converters.get(field.name)
+                    values = [None if is_missing(value) else convert(value) if convert else value for value in values]
+                    arrays.append(pyarrow.array(values, field.type))
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            row_count += len(chunk)
+    return row_count
+
+
+def available_cpu_count() -> int:
+    """Count the CPUs this process is allowed to use, which may be fewer than the CPUs on the host."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class SummaryFilter():
+    """Choose which execution records to include in a summary.
+
+    :param groups: results group names to include, or None for all groups
+    :param since: include records from this time or later, as a datetime or ISO 8601 string
+    :param until: include records from before this time, as a datetime or ISO 8601 string
+    :param args: pipeline arg names and values that records must have, compared as strings
+
+    Record times come from the results_id, when it's a timestamp like the default ``20240131T123456UTC``.
+    Otherwise, record times come from the modification time of the results_id dir.
+    Times without a time zone are taken as UTC.
+
+    Groups and times are decided from directory names and metadata, without opening records.
+    Args are decided from the summary index, when available, otherwise by parsing each record.
+    """
+
+    def __init__(
+        self,
+        groups: list[str] = None,
+        since: datetime | str = None,
+        until: datetime | str = None,
+        args: dict[str, Any] = None
+    ):
+        self.groups = set(groups) if groups else None
+        self.since = parse_summary_time(since)
+        self.until = parse_summary_time(until)
+        self.args = {key: str(value) for key, value in args.items()} if args else None
+
+    def accepts_group(self, group: str) -> bool:
+        return self.groups is None or group in self.groups
+
+    def accepts_results_id(self, results_id: str, id_path: Path) -> bool:
+        if self.since is None and self.until is None:
+            return True
+        results_time = results_id_time(results_id, id_path)
+        if self.since is not None and results_time < self.since:
+            return False
+        if self.until is not None and results_time >= self.until:
+            return False
+        return True
+
+    def accepts_args(self, args: dict[str, Any]) -> bool:
+        if self.args is None:
+            return True
+        return all(key in args and str(args[key]) == value for key, value in self.args.items())
+
+
+def parse_summary_time(value: datetime | str) -> datetime:
+    """Parse an ISO 8601 string like "2024-01-31" or "2024-01-31T12:00:00", assuming UTC if no time zone is given."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def results_id_time(results_id: str, id_path: Path) -> datetime:
+    """Get the time of a results_id from its timestamp, like the default "20240131T123456UTC", or else its dir mtime."""
+    try:
+        return datetime.strptime(results_id, "%Y%m%dT%H%M%S%Z").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return datetime.fromtimestamp(id_path.stat().st_mtime, tz=timezone.utc)
+
+
+def summary_rows_args(rows: list[dict[str, Any]]) -> dict[str, Any]:
+    """Get pipeline args for one record from the "arg_" columns of its summary rows."""
+    if not rows:
+        return {}
+    return {column[len("arg_"):]: value for column, value in rows[0].items() if column.startswith("arg_")}
+
+
+def summary_tables_args(tables: dict[str, list[dict[str, Any]]]) -> dict[str, Any]:
+    """Get pipeline args for one record from its normalized "pipelines" summary table."""
+    return summary_rows_args(tables.get("pipelines", []))
+
+
+def filter_summaries(
+    summaries: Iterable[Any],
+    summary_filter: SummaryFilter = None,
+    record_args: Callable[[Any], dict[str, Any]] = summary_rows_args
+) -> Iterator[Any]:
+    """Keep only summaries of records whose args are accepted by the given summary_filter."""
+    for summary in summaries:
+        if summary_filter is None or summary_filter.accepts_args(record_args(summary)):
+            yield summary
+
+
+def find_execution_records(results_path: Path, summary_filter: SummaryFilter = None) -> list[tuple[str, str, Path]]:
+    """Find execution records like results_path/group/id/execution_record.yaml.
+
+    With a summary_filter, only find records from the chosen groups and times.
+
+    Returns a list of (group, results_id, yaml_file) tuples, sorted by group and results_id.
+    """
+    record_paths = []
+    group_paths = sorted(path for path in results_path.iterdir() if path.is_dir())
+    for group_path in group_paths:
+        if summary_filter and not summary_filter.accepts_group(group_path.stem):
+            continue
+        id_paths = sorted(path for path in group_path.iterdir() if path.is_dir())
+        for id_path in id_paths:
+            if summary_filter and not summary_filter.accepts_results_id(id_path.stem, id_path):
+                continue
+            yaml_file = Path(id_path, "execution_record.yaml")
+            if yaml_file.is_file():
+                record_paths.append((group_path.stem, id_path.stem, yaml_file))
+    return record_paths
+
+
+def summarize_record_file(record_path: tuple[str, str, Path]) -> list[dict[str, str]]:
+    """Read and summarize one execution record, as found by find_execution_records().
+
+    This is a top-level function so that it can be sent to worker processes.
+    """
+    (group, results_id, yaml_file) = record_path
+    execution_record = safe_read_execution_record(yaml_file)
+    if not execution_record:
+        return []
+    return summarize_execution(results_id, group, execution_record)
+
+
+def summarize_record_file_tables(record_path: tuple[str, str, Path]) -> dict[str, list[dict[str, Any]]]:
+    """Like summarize_record_file(), but return normalized tables from summarize_execution_tables()."""
+    (group, results_id, yaml_file) = record_path
+    execution_record = safe_read_execution_record(yaml_file)
+    if not execution_record:
+        return {}
+    return summarize_execution_tables(results_id, group, execution_record)
+
+
+def summarize_record_files(
+    record_paths: list[tuple[str, str, Path]],
+    max_workers: int = None,
+    summarize: Callable[[tuple[str, str, Path]], Any] = summarize_record_file,
+    max_chunk_size: int = 64,
+    max_pending: int = None
+) -> Iterator[Any]:
+    """Summarize each of the given records, in parallel, yielding the summary per record in the given order.
+
+    Records go to workers in chunks of up to max_chunk_size, with at most max_pending chunks in flight
+    (default: twice max_workers), so summaries don't pile up when the consumer is slower than the workers.
+    """
+    if max_workers is None:
+        max_workers = available_cpu_count()
+
+    if max_workers <= 1 or len(record_paths) <= 1:
+        yield from map(summarize, record_paths)
+        return
+
+    if max_pending is None:
+        max_pending = max_workers * 2
+
+    # Send records to workers in chunks, to amortize inter-process overhead across small records.
+    chunk_size = max(1, min(len(record_paths) // (max_workers * 4), max_chunk_size))
+    chunks = iter_chunks(record_paths, chunk_size)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque(
+            executor.submit(summarize_chunk, summarize, chunk)
+            for chunk in itertools.islice(chunks, max(1, max_pending))
+        )
+        try:
+            while pending:
+                summaries = pending.popleft().result()
+                # Refill the window before yielding, so workers keep busy while the consumer works.
+                next_chunk = next(chunks, None)
+                if next_chunk is not None:
+                    pending.append(executor.submit(summarize_chunk, summarize, next_chunk))
+                yield from summaries
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def summarize_chunk(summarize: Callable[[Any], Any], items: list[Any]) -> list[Any]:
+    """Summarize a chunk of items in one worker call."""
+    return [summarize(item) for item in items]
+
+
+def summarize_with_index(
+    results_path: Path,
+    record_paths: list[tuple[str, str, Path]],
+    index_path: Path,
+    max_workers: int = None,
+    summarize: Callable[[tuple[str, str, Path]], Any] = summarize_record_file,
+    kind: str = "rows",
+    summary_filter: SummaryFilter = None,
+    record_args: Callable[[Any], dict[str, Any]] = summary_rows_args
+) -> Iterator[Any]:
+    """Like summarize_record_files(), but reuse summaries from a :class:`SummaryIndex` for unchanged records.
+
+    The index also records the args of each record, as found by record_args(),
+    so that unchanged records can be filtered by args without loading their summaries.
+    """
+    with SummaryIndex(index_path, kind=kind) as index:
+        record_keys = [yaml_file.relative_to(results_path).as_posix() for (_, _, yaml_file) in record_paths]
+        record_stats = [yaml_file.stat() for (_, _, yaml_file) in record_paths]
+        is_current = [
+            index.is_current(record_key, record_stat.st_mtime_ns, record_stat.st_size)
+            for record_key, record_stat in zip(record_keys, record_stats)
+        ]
+
+        changed_paths = [record_path for record_path, current in zip(record_paths, is_current) if not current]
+        changed_summaries = summarize_record_files(changed_paths, max_workers, summarize)
+        for record_key, record_stat, current in zip(record_keys, record_stats, is_current):
+            if current:
+                args = index.cached_args(record_key)
+                if summary_filter and args is not None and not summary_filter.accepts_args(args):
+                    continue
+                summary = index.cached_rows(record_key, record_stat.st_mtime_ns, record_stat.st_size)
+                if args is None:
+                    args = record_args(summary)
+            else:
+                summary = next(changed_summaries)
+                args = record_args(summary)
+                summary = index.store_rows(record_key, record_stat.st_mtime_ns, record_stat.st_size, summary, args)
+
+            if summary_filter is None or summary_filter.accepts_args(args):
+                yield summary
+
+        # Filtered summaries don't see all the records, so leave pruning to the next unfiltered summary.
+        if summary_filter is None:
+            index.prune(set(record_keys))
+
+
 def safe_read_execution_record(yaml_file: Path) -> ExecutionRecord:
     try:
         with open(yaml_file) as f:
@@ -52,6 +756,47 @@ def summarize_execution(results_id: str, group: str, execution_record: Execution
     return combined_summary
 
 
+def summarize_execution_tables(
+    results_id: str,
+    group: str,
+    execution_record: ExecutionRecord
+) -> dict[str, list[dict[str, Any]]]:
+    """Summarize an execution record as normalized "pipelines", "steps", "files", and "array_tasks" tables.
+
+    Unlike summarize_execution(), pipeline and step columns are not repeated for each file.
+    Instead, rows in each table start with key columns (see :attr:`summary_table_keys`) for joining the tables.
+    Array tasks, from steps with :attr:`Step.array`, only appear in these tables, with one row per task.
+    """
+    pipeline_summary = summarize_pipeline(results_id, group, execution_record.amended, execution_record.timing)
+    pipeline_keys = {"results_group": group, "results_id": results_id}
+
+    step_rows = []
+    file_rows = []
+    task_rows = []
+    for step, result in zip(execution_record.amended.steps, execution_record.step_results):
+        (step_summary, file_summaries, custom_summary) = summarize_step_parts(step, result)
+        step_keys = {**pipeline_keys, "step_name": step.name}
+        step_rows.append({**step_keys, **step_summary, **custom_summary})
+        file_rows.extend({**step_keys, **file_summary} for file_summary in file_summaries)
+        task_rows.extend({**step_keys, **summarize_array_task(task)} for task in result.array_tasks)
+
+    return {
+        "pipelines": [{**pipeline_keys, **pipeline_summary}],
+        "steps": step_rows,
+        "files": file_rows,
+        "array_tasks": task_rows,
+    }
+
+
+def summarize_array_task(task: ArrayTaskResult) -> dict[str, Any]:
+    return {
+        "task_id": task.task_id,
+        "task_exit_code": task.exit_code,
+        "task_state": task.state,
+        "task_log_file": task.log_file,
+    }
+
+
 def summarize_pipeline(results_id: str, group: str, pipeline: Pipeline, timing: Timing) -> dict[str, str]:
     top_level_summary = {
         "proceed_version": pipeline.version,
@@ -70,18 +815,39 @@ def summarize_pipeline(results_id: str, group: str, pipeline: Pipeline, timing:
 
 
 def summarize_step_and_result(step: Step, result: StepResult) -> list[dict[str, Any]]:
+    (step_summary, file_summaries, custom_summary) = summarize_step_parts(step, result)
+    combined_summary = [{**step_summary, **file_summary, **custom_summary} for file_summary in file_summaries]
+    return combined_summary
+
+
+def summarize_step_parts(
+    step: Step,
+    result: StepResult
+) -> tuple[dict[str, Any], list[dict[str, str]], dict[str, Any]]:
+    """Summarize a step and its result as separate parts: step columns, one dict per file, and custom columns."""
     step_summary = {f"step_{key}": str(value) for key, value in step.to_dict().items()}
 
-    flattened_step_attributes = {"timing", "log_file", "files_done", "files_in", "files_out", "files_summary"}
+    flattened_step_attributes = {
+        "timing", "log_file", "log_digest", "files_done", "files_in", "files_out", "files_summary", "custom_columns",
+        "slurm_accounting", "array_tasks"
+    }
     result_summary = {f"step_{key}": str(value) for key, value in result.to_dict().items() if key not in flattened_step_attributes}
 
     result_summary["step_start"] = result.timing.start
     result_summary["step_finish"] = result.timing.finish
     result_summary["step_duration"] = result.timing.duration
 
+    if result.slurm_accounting:
+        slurm_summary = {f"step_slurm_{key}": value for key, value in result.slurm_accounting.to_dict().items()}
+        result_summary.update(slurm_summary)
+
     if result.log_file:
         log_path = Path(result.log_file)
-        log_digest = hash_contents(log_path)
+        if result.log_digest:
+            log_digest = result.log_digest
+        else:
+            # Older records don't have the log digest, so we have to read the whole log.
+            log_digest = hash_contents(log_path)
         log_file = file_summary(volume=log_path.parent.as_posix(), path=log_path.name, digest=log_digest, file_role="log")
     else:
         log_file = file_summary(volume="", path="", digest="", file_role="log")
@@ -95,29 +861,12 @@ def summarize_step_and_result(step: Step, result: StepResult) -> list[dict[str,
 
     custom_summary = {}
     for summary_file in summary_files:
-        custom_columns = collect_custom_columns(summary_file["file_volume"], summary_file["file_path"])
+        parsed_content = result.custom_columns.get(summary_file["file_digest"])
+        if parsed_content is None:
+            # Older records don't have parsed custom columns, so we have to read the file.
+            custom_columns = collect_custom_columns(summary_file["file_volume"], summary_file["file_path"])
+        else:
+            custom_columns = custom_columns_for_file(summary_file["file_path"], parsed_content)
         custom_summary.update(custom_columns)
 
-    combined_summary = [{**step_summary, **result_summary, **file_summary, **custom_summary} for file_summary in all_files]
-    return combined_summary
-
-
-def collect_custom_columns(file_volume: str, file_path: str) -> dict[str, str]:
-    path = Path(file_volume, file_path)
-    if not path.is_file() or not path.exists():
-        return {}
-
-    with open(path) as f:
-        content = f.read()
-
-    try:
-        parsed = yaml.safe_load(content)
-        if parsed and isinstance(parsed, dict):
-            return parsed
-
-        logging.info(f"Treating non-dictionary YAML as plain text: {path.as_posix()}")
-
-    except yaml.parser.ParserError:
-        logging.info(f"Treating non-YAML file as plain text: {path.as_posix()}")
-
-    return {path.stem: content.strip()}
+    return ({**step_summary, **result_summary}, all_files, custom_summary)
@@ -5,11 +5,11 @@ from pathlib import Path
 from datetime import datetime, timezone
 from argparse import ArgumentParser
 from typing import Optional, Sequence
-from proceed.model import Pipeline
+from proceed.model import ExecutionRecord, Pipeline
 from proceed.config_options import ConfigOptions, resolve_config_options
 from proceed.run_recorder import RunRecorder
-from proceed.runner_protocol import run_pipeline, make_runner, discover_runner
-from proceed.aggregator import summarize_results
+from proceed.runner_protocol import run_pipeline, submit_pipeline, finalize_pipeline, make_runner, discover_runner
+from proceed.aggregator import SummaryFilter, iter_summary_rows, iter_summary_tables, write_summary, write_summary_tables
 from proceed.__about__ import __version__ as proceed_version
 
 version_string = f"Proceed {proceed_version}"
@@ -74,17 +74,47 @@ def run(spec: str, config_options: ConfigOptions) -> int:
     run_recorder = RunRecorder(execution_path, config_options=config_options)
 
     runner_name = config_options.runner.value
+    runner_options = config_options.runner_options.value
     if runner_name:
-        logging.info(f"Using runner: {runner_name}")
-        runner = make_runner(runner_name)
+        # Steps that name this same runner share it, so it also takes any step runner options given for it.
+        runner_options = {**config_options.step_runner_options.value.get(runner_name, {}), **runner_options}
+        logging.info(f"Using runner: {runner_name} with options {runner_options}")
+        runner = make_runner(runner_name, **runner_options)
     else:
         logging.info("No runner specified, attempting to detect available runners.")
-        runner = discover_runner()
+        runner = discover_runner(runner_options=runner_options)
 
     if not runner:
         logging.error("Unable to create a backend runner!")
         return -2
 
+    if config_options.detach.value:
+        if not hasattr(runner, "submit_step"):
+            logging.error(f"Runner {type(runner).__name__} doesn't support --detach, try --runner slurm.")
+            return -2
+
+        if config_options.log_compression.value:
+            # Detached step jobs write their own logs, so Proceed never gets to compress them.
+            logging.error("--log-compression is not supported with --detach.")
+            return -2
+
+        logging.info(f"Submitting pipeline with args: {config_options.args.value}")
+        finalize_command = [
+            sys.executable, "-m", "proceed", "finalize", run_recorder.record_path.absolute().as_posix(),
+            "--custom-options-file", effective_options_path.absolute().as_posix()
+        ]
+        submit_pipeline(
+            original=pipeline,
+            execution_path=execution_path,
+            run_recorder=run_recorder,
+            runner=runner,
+            args=config_options.args.value,
+            force_rerun=config_options.force_rerun.value,
+            step_names=config_options.step_names.value,
+            finalize_command=finalize_command)
+        logging.info(f"Submitted pipeline, a finalizer job will write {run_recorder.record_path.as_posix()}")
+        return 0
+
     logging.info(f"Running pipeline with args: {config_options.args.value}")
     pipeline_result = run_pipeline(
         original=pipeline,
@@ -93,7 +123,50 @@ def run(spec: str, config_options: ConfigOptions) -> int:
         runner=runner,
         args=config_options.args.value,
         force_rerun=config_options.force_rerun.value,
-        step_names=config_options.step_names.value)
+        step_names=config_options.step_names.value,
+        log_compression=config_options.log_compression.value,
+        step_runners={runner_name: runner} if runner_name else {},
+        runner_options=config_options.step_runner_options.value)
+
+    error_count = sum((not not step_result.exit_code) for step_result in pipeline_result.step_results)
+    if error_count:
+        logging.error(f"{error_count} step(s) had nonzero exit codes:")
+        for step_result in pipeline_result.step_results:
+            logging.error(f"{step_result.name} exit code: {step_result.exit_code}")
+        return error_count
+    else:
+        logging.info(f"Completed {len(pipeline_result.step_results)} steps successfully.")
+        return 0
+
+
+def finalize(record: str, config_options: ConfigOptions) -> int:
+    """Complete the execution record of a detached pipeline for "proceed finalize record ..."""
+
+    if not record:
+        logging.error("You must provide an execution record to the finalize operation.")
+        return -1
+
+    record_path = Path(record)
+    execution_path = record_path.parent
+
+    # Log to the same output path as the submitting "proceed run --detach".
+    set_up_logging(Path(execution_path, "proceed.log"))
+
+    logging.info(f"Parsing submitted execution record from: {record}")
+    with open(record_path) as f:
+        submitted = ExecutionRecord.from_yaml(f.read())
+
+    run_recorder = RunRecorder(execution_path, execution_record_name=record_path.name, config_options=config_options)
+
+    runner_name = config_options.runner.value or "slurm"
+    runner_options = config_options.runner_options.value
+    logging.info(f"Using runner: {runner_name} with options {runner_options}")
+    runner = make_runner(runner_name, **runner_options)
+    if not hasattr(runner, "job_details"):
+        logging.error(f"Runner {type(runner).__name__} can't finalize detached pipelines.")
+        return -2
+
+    pipeline_result = finalize_pipeline(submitted, run_recorder, runner)
 
     error_count = sum((not not step_result.exit_code) for step_result in pipeline_result.step_results)
     if error_count:
@@ -113,13 +186,47 @@ def summarize(config_options: ConfigOptions) -> int:
     results_path = Path(config_options.results_dir.value)
     logging.info(f"Summarizing results from {results_path.as_posix()}")
 
-    summary = summarize_results(results_path, columns=config_options.summary_columns.value,
-                                sort_rows_by=config_options.summary_sort_rows_by.value)
+    # Choose where to keep summary rows for unchanged execution records.
+    if config_options.summary_index_file.value:
+        index_path = Path(results_path, config_options.summary_index_file.value)
+        logging.info(f"Using summary index {index_path.as_posix()}")
+    else:
+        index_path = None
+
+    # Choose which results to include.
+    if (config_options.summary_groups.value or config_options.summary_since.value
+            or config_options.summary_until.value or config_options.summary_args.value):
+        summary_filter = SummaryFilter(
+            groups=config_options.summary_groups.value,
+            since=config_options.summary_since.value,
+            until=config_options.summary_until.value,
+            args=config_options.summary_args.value
+        )
+        logging.info(f"Filtering results by groups {config_options.summary_groups.value}, "
+                     f"since {config_options.summary_since.value}, until {config_options.summary_until.value}, "
+                     f"and args {config_options.summary_args.value}")
+    else:
+        summary_filter = None
 
     # Choose where to write the summary of results.
     out_file = Path(config_options.summary_file.value)
-    logging.info(f"Writing summary to {out_file.as_posix()}")
-    summary.to_csv(out_file)
+
+    if config_options.summary_normalized.value:
+        summary_tables = iter_summary_tables(results_path, max_workers=config_options.summary_workers.value,
+                                             index_path=index_path, summary_filter=summary_filter)
+        table_files = write_summary_tables(summary_tables, out_file, columns=config_options.summary_columns.value,
+                                           sort_rows_by=config_options.summary_sort_rows_by.value,
+                                           summary_format=config_options.summary_format.value)
+        for table_name, table_file in table_files.items():
+            logging.info(f"Wrote {table_name} summary table to {table_file.as_posix()}")
+    else:
+        summary_rows = iter_summary_rows(results_path, max_workers=config_options.summary_workers.value,
+                                         index_path=index_path, summary_filter=summary_filter)
+        logging.info(f"Writing summary to {out_file.as_posix()}")
+        row_count = write_summary(summary_rows, out_file, columns=config_options.summary_columns.value,
+                                  sort_rows_by=config_options.summary_sort_rows_by.value,
+                                  summary_format=config_options.summary_format.value)
+        logging.info(f"Wrote {row_count} summary rows.")
 
     return 0
 
@@ -128,12 +235,12 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
     parser = ArgumentParser(description="Declarative file processing with YAML and containers.")
     parser.add_argument("operation",
                         type=str,
-                        choices=["run", "summarize"],
-                        help="operation to perform: run a pipeline or summarize results from multiple runs"),
+                        choices=["run", "summarize", "finalize"],
+                        help="operation to perform: run a pipeline, summarize results from multiple runs, or finalize a detached run"),
     parser.add_argument("spec",
                         type=str,
                         nargs="?",
-                        help="YAML file with pipeline specification to run")
+                        help="YAML file with pipeline specification to run, or execution record to finalize")
     parser.add_argument("--version", "-v", action="version", version=version_string)
 
     default_config_options = ConfigOptions()
@@ -157,6 +264,8 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
             exit_code = run(cli_args.spec, config_options)
         case "summarize":
             exit_code = summarize(config_options)
+        case "finalize":
+            exit_code = finalize(cli_args.spec, config_options)
         case _:  # pragma: no cover
             # We don't expect this to happen -- argparse should error before we get here.
             logging.error(f"Unsupported operation: {cli_args.operation}")
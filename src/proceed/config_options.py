@@ -28,6 +28,26 @@ class ConvertingKeyValuePairsAction(Action):
         setattr(namespace, self.dest, key_value_pairs)
 
 
+def group_key_value_pairs(key_value_pairs: dict[str, Any], separator: str = ".") -> dict[str, dict[str, Any]]:
+    """Group keys like "group.key" into nested dicts like {"group": {"key": ...}}."""
+    groups = {}
+    for (grouped_key, value) in key_value_pairs.items():
+        (group, found, key) = grouped_key.partition(separator)
+        if not (group and found and key):
+            raise ValueError(f"expected a key like group{separator}key, got {grouped_key!r}")
+        groups.setdefault(group, {})[key] = value
+    return groups
+
+
+class GroupedKeyValuePairsAction(Action):
+    def __call__(self, parser, namespace, values, option_string=None):
+        key_value_pairs = parse_key_value_pairs(values, convert_values=True)
+        try:
+            setattr(namespace, self.dest, group_key_value_pairs(key_value_pairs))
+        except ValueError as e:
+            parser.error(f"{option_string}: {e}")
+
+
 @dataclass
 class ConfigOption():
     value: Any = None
@@ -139,6 +159,13 @@ class ConfigOptions():
         cli_help="output file to to receive summary of results from multiple runs",
     ))
 
+    summary_format: ConfigOption = field(default_factory=lambda: ConfigOption(
+        cli_long_name="--summary-format",
+        cli_short_name="-t",
+        cli_help="file format for the summary: csv, parquet, or feather (parquet and feather require the pyarrow package)",
+        cli_help_default="based on summary file suffix, or csv",
+    ))
+
     summary_sort_rows_by: ConfigOption = field(default_factory=lambda: ConfigOption(
         value=["step_start", "file_path"],
         cli_long_name="--summary-sort-rows-by",
@@ -156,13 +183,105 @@ class ConfigOptions():
         cli_help_default="all columns",
     ))
 
+    summary_groups: ConfigOption = field(default_factory=lambda: ConfigOption(
+        cli_long_name="--summary-groups",
+        cli_short_name="-G",
+        cli_nargs="+",
+        cli_help="results group names to include in the summary",
+        cli_help_default="all groups",
+    ))
+
+    summary_since: ConfigOption = field(default_factory=lambda: ConfigOption(
+        cli_long_name="--summary-since",
+        cli_short_name="-S",
+        cli_help="include results from this UTC date or time or later, like 2024-01-31 or 2024-01-31T12:00:00, based on results id timestamps or results dir modification times",
+        cli_help_default="no earliest time",
+    ))
+
+    summary_until: ConfigOption = field(default_factory=lambda: ConfigOption(
+        cli_long_name="--summary-until",
+        cli_short_name="-U",
+        cli_help="include results from before this UTC date or time, like --summary-since",
+        cli_help_default="no latest time",
+    ))
+
+    summary_args: ConfigOption = field(default_factory=lambda: ConfigOption(
+        value={},
+        cli_long_name="--summary-args",
+        cli_short_name="-A",
+        cli_nargs="+",
+        cli_action=KeyValuePairsAction,
+        cli_help="one or more arg=value assignments that results must have been run with to be included in the summary",
+        cli_help_default="no arg filters",
+    ))
+
+    summary_workers: ConfigOption = field(default_factory=lambda: ConfigOption(
+        cli_long_name="--summary-workers",
+        cli_short_name="-w",
+        cli_type=int,
+        cli_help="number of worker processes to use for reading execution records",
+        cli_help_default="all available CPUs",
+    ))
+
+    summary_index_file: ConfigOption = field(default_factory=lambda: ConfigOption(
+        cli_long_name="--summary-index-file",
+        cli_short_name="-x",
+        cli_help="file, relative to the results dir, for reusing summary rows of unchanged execution records, for example summary_index.sqlite",
+        cli_help_default="no index, parse all records",
+    ))
+
+    summary_normalized: ConfigOption = field(default_factory=lambda: ConfigOption(
+        value=False,
+        cli_long_name="--summary-normalized",
+        cli_short_name="-N",
+        cli_action="store_true",
+        cli_type=None,
+        cli_help="write separate pipelines, steps, and files summary tables, joined by key columns, instead of one wide summary",
+    ))
+
     runner: ConfigOption = field(default_factory=lambda: ConfigOption(
         cli_long_name="--runner",
         cli_short_name="-r",
-        cli_help="backend to use for executing pipeline steps: docker or slurm",
+        cli_help="backend to use for executing pipeline steps: docker, slurm, or local (subprocesses without containers)",
         cli_help_default="detect available backends (prefer docker over slurm)",
     ))
 
+    runner_options: ConfigOption = field(default_factory=lambda: ConfigOption(
+        value={},
+        cli_long_name="--runner-options",
+        cli_short_name="-R",
+        cli_nargs="+",
+        cli_action=ConvertingKeyValuePairsAction,
+        cli_help="one or more key=value assignments to pass as keyword args to the runner, for example: -R max_pool_size=20",
+        cli_help_default="no runner options",
+    ))
+
+    step_runner_options: ConfigOption = field(default_factory=lambda: ConfigOption(
+        value={},
+        cli_long_name="--step-runner-options",
+        cli_short_name="-O",
+        cli_nargs="+",
+        cli_action=GroupedKeyValuePairsAction,
+        cli_help="one or more runner.key=value assignments to pass as keyword args to runners named by a step's runner, for example: -O slurm.image_cache_dir=/scratch/images local.log_echo=none",
+        cli_help_default="no step runner options",
+    ))
+
+    detach: ConfigOption = field(default_factory=lambda: ConfigOption(
+        value=False,
+        cli_long_name="--detach",
+        cli_short_name="-D",
+        cli_action="store_true",
+        cli_type=None,
+        cli_help="submit steps as a chain of batch jobs and exit without waiting, then finalize the execution record in a batch job (slurm runner only)",
+    ))
+
+    log_compression: ConfigOption = field(default_factory=lambda: ConfigOption(
+        cli_long_name="--log-compression",
+        cli_short_name="-z",
+        cli_help="how to compress step log files: gzip or zstd (zstd requires the zstandard package)",
+        cli_help_default="no compression",
+    ))
+
     yaml_skip_empty: ConfigOption = field(default_factory=lambda: ConfigOption(
         value=True,
         cli_long_name="--yaml-skip-empty",
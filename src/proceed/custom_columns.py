@@ -0,0 +1,58 @@
+import logging
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+
+def collect_custom_columns(file_volume: str, file_path: str) -> dict[str, str]:
+    path = Path(file_volume, file_path)
+    parsed_content = read_custom_columns(path)
+    if parsed_content is None:
+        return {}
+    return custom_columns_for_file(file_path, parsed_content)
+
+
+def collect_files_custom_columns(files_summary: dict[str, dict[str, str]]) -> dict[str, Any]:
+    """Read and parse each of the given summary files, returning parsed content keyed by file digest.
+
+    This is how :attr:`StepResult.custom_columns` gets recorded when a step runs.
+    Files that can't be read here, like files that are only visible to a remote runner, are omitted.
+    """
+    custom_columns = {}
+    for volume, file_info in files_summary.items():
+        for path, digest in file_info.items():
+            if digest in custom_columns:
+                continue
+            parsed_content = read_custom_columns(Path(volume, path))
+            if parsed_content is not None:
+                custom_columns[digest] = parsed_content
+    return custom_columns
+
+
+def read_custom_columns(path: Path) -> dict[str, Any] | str:
+    """Read and parse one summary file, or return None if there's no such file."""
+    if not path.is_file() or not path.exists():
+        return None
+
+    with open(path) as f:
+        content = f.read()
+
+    try:
+        parsed = yaml.safe_load(content)
+        if parsed and isinstance(parsed, dict):
+            return parsed
+
+        logging.info(f"Treating non-dictionary YAML as plain text: {path.as_posix()}")
+
+    except yaml.YAMLError:
+        logging.info(f"Treating non-YAML file as plain text: {path.as_posix()}")
+
+    return content.strip()
+
+
+def custom_columns_for_file(file_path: str, parsed_content: dict[str, Any] | str) -> dict[str, Any]:
+    """Convert parsed summary file content to custom columns -- plain text is keyed by the file name."""
+    if isinstance(parsed_content, dict):
+        return parsed_content
+    return {Path(file_path).stem: parsed_content}
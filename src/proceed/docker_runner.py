@@ -1,4 +1,8 @@
 import logging
+import time
+import threading
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union, Any
 from pathlib import Path
 from os import getuid, getgid
@@ -6,10 +10,11 @@ from grp import getgrnam
 
 import docker
 from docker.types import DeviceRequest
-from docker.errors import DockerException, APIError
+from docker.errors import DockerException, APIError, ImageNotFound
 
-from proceed.model import Step
+from proceed.model import ImagePull, Step
 from proceed.runner_protocol import apply_step_X11
+from proceed.step_logs import StepLogWriter, open_log, stream_log_path
 
 
 def resolve_user(user: str) -> str:
@@ -52,12 +57,254 @@ def normalize_volumes(
     return normalized
 
 
+class ContainerEventMonitor:
+    """Track container exits for many containers at once, via one Docker events stream.
+
+    One background thread consumes the Docker events stream, filtered to "die" events for
+    containers with the given labels, and dispatches exit codes to threads waiting in :meth:`wait_for_exit`.
+    This replaces one blocking ``container.wait()`` per container.
+
+    If the events stream fails, waiting threads get ``None`` and should fall back to ``container.wait()``.
+    """
+
+    def __init__(self, client: docker.DockerClient, labels: dict[str, str]):
+        self.client = client
+        self.labels = labels
+
+        self._exit_codes = {}
+        self._waiters = {}
+        self._lock = threading.Lock()
+        self._stream = None
+        self._thread = None
+        self._failed = False
+
+    def start(self):
+        """Subscribe to the events stream, then consume it in a background thread."""
+        label_filters = [f"{key}={value}" for key, value in self.labels.items()]
+        filters = {"type": "container", "event": "die", "label": label_filters}
+
+        # Subscribe before returning, so that no container started after this can be missed.
+        self._stream = self.client.events(decode=True, filters=filters)
+        self._thread = threading.Thread(target=self._consume_events, name="proceed-docker-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Close the events stream and release any waiting threads."""
+        if self._stream is not None:
+            self._stream.close()
+        self._fail_waiters()
+
+    def _consume_events(self):
+        try:
+            for event in self._stream:
+                actor = event.get("Actor", {})
+                container_id = actor.get("ID", event.get("id"))
+                exit_code = int(actor.get("Attributes", {}).get("exitCode", -1))
+                with self._lock:
+                    self._exit_codes[container_id] = exit_code
+                    waiter = self._waiters.get(container_id)
+                if waiter is not None:
+                    waiter.set()
+        except Exception:
+            logging.warning("Docker events stream failed, falling back to waiting on each container.", exc_info=True)
+        self._fail_waiters()
+
+    def _fail_waiters(self):
+        with self._lock:
+            self._failed = True
+            waiters = list(self._waiters.values())
+        for waiter in waiters:
+            waiter.set()
+
+    def wait_for_exit(self, container_id: str, timeout: float = None) -> int | None:
+        """Block until the given container dies and return its exit code, or None if the events stream failed."""
+        with self._lock:
+            if container_id in self._exit_codes:
+                return self._exit_codes.pop(container_id)
+            if self._failed:
+                return None
+            waiter = threading.Event()
+            self._waiters[container_id] = waiter
+
+        waiter.wait(timeout)
+
+        with self._lock:
+            del self._waiters[container_id]
+            return self._exit_codes.pop(container_id, None)
+
+
+def _close_client(client: docker.DockerClient):
+    try:
+        client.close()
+    except Exception:  # pragma: no cover
+        logging.warning("Error closing Docker client.", exc_info=True)
+
+
 class DockerRunner:
-    """Execute pipeline steps via Docker Engine."""
+    """Execute pipeline steps via Docker Engine.
+
+    Each DockerRunner owns one long-lived Docker client, shared by all steps and attempts.
+    The client's connection pool is bounded by ``max_pool_size``, so many concurrent step
+    executions can share the client without opening a new HTTP connection pool each time.
+    The client is health-checked with a ping at most every ``health_check_interval`` seconds,
+    and replaced if the ping fails or if a step attempt fails in a way that will be retried.
+    A replaced client stays open until the steps still using it are done with it.
+
+    With ``supervise_with_events``, container exits are tracked by one shared :class:`ContainerEventMonitor`
+    instead of one blocking ``container.wait()`` and one log-streaming connection per container.
+    In this mode step logs are collected after each container exits.
+
+    Step logs are written as raw, buffered bytes.  The ``log_echo`` policy and ``log_echo_limit``
+    choose which log lines are also echoed to the Proceed log (see :class:`StepLogWriter`).
+
+    With ``log_streams="separate"``, container stdout and stderr go to separate files next to the step log,
+    recorded as :attr:`StepResult.stdout_file` and :attr:`StepResult.stderr_file`.
+    With ``log_timestamps``, each line is prefixed with the timestamp that Docker recorded for it.
+    """
+
+    def __init__(
+        self,
+        client_kwargs: dict[str, Any] = {},
+        max_attempts: int = 3,
+        max_pool_size: int = 10,
+        health_check_interval: float = 30.0,
+        supervise_with_events: bool = False,
+        log_echo: str = "all",
+        log_echo_limit: int = None,
+        log_streams: str = "combined",
+        log_timestamps: bool = False
+    ):
+        if log_streams not in {"combined", "separate"}:
+            raise ValueError(f"Unknown log_streams {log_streams!r}, expected 'combined' or 'separate'")
 
-    def __init__(self, client_kwargs: dict[str, Any] = {}, max_attempts: int = 3):
         self.client_kwargs = client_kwargs
         self.max_attempts = max_attempts
+        self.max_pool_size = max_pool_size
+        self.health_check_interval = health_check_interval
+        self.supervise_with_events = supervise_with_events
+        self.log_echo = log_echo
+        self.log_echo_limit = log_echo_limit
+        self.log_streams = log_streams
+        self.log_timestamps = log_timestamps
+
+        self._client = None
+        self._client_checked_at = None
+        self._client_users = {}
+        self._client_lock = threading.Lock()
+
+        self.container_labels = {"proceed.runner": uuid4().hex}
+        self._event_monitor = None
+        self._event_monitor_lock = threading.Lock()
+
+    def client(self) -> docker.DockerClient:
+        """Get the shared Docker client, creating or reconnecting it as needed."""
+        with self._client_lock:
+            return self._current_client()
+
+    def _current_client(self) -> docker.DockerClient:
+        if self._client is not None and self._client_is_stale():
+            try:
+                self._client.ping()
+                self._client_checked_at = time.monotonic()
+            except Exception:
+                logging.warning("Docker client failed health check, reconnecting.", exc_info=True)
+                self._retire_client()
+
+        if self._client is None:
+            client_kwargs = {"max_pool_size": self.max_pool_size, **self.client_kwargs}
+            self._client = docker.from_env(**client_kwargs)
+            self._client_checked_at = time.monotonic()
+
+        return self._client
+
+    def _client_is_stale(self) -> bool:
+        return time.monotonic() - self._client_checked_at > self.health_check_interval
+
+    def _acquire_client(self) -> docker.DockerClient:
+        """Get the shared Docker client and count this caller as using it, until :meth:`_release_client`."""
+        with self._client_lock:
+            client = self._current_client()
+            self._client_users[client] = self._client_users.get(client, 0) + 1
+            return client
+
+    def _release_client(self, client: docker.DockerClient):
+        """Stop using the given client, and close it if it was replaced and this was its last user."""
+        with self._client_lock:
+            self._client_users[client] -= 1
+            if self._client_users[client] > 0:
+                return
+            del self._client_users[client]
+            if client is not self._client:
+                _close_client(client)
+
+    def _retire_client(self):
+        """Stop handing out the current client, and close it unless it's still in use."""
+        if self._client is not None and self._client not in self._client_users:
+            _close_client(self._client)
+        self._client = None
+        self._client_checked_at = None
+
+    def reset_client(self, client: docker.DockerClient = None):
+        """Discard the shared Docker client so the next use reconnects.
+
+        With a client, only discard it if it's still the shared one, so that when concurrent steps
+        fail with the same client they don't also discard the replacement.
+        A discarded client that other steps are still using is closed once they're done with it.
+        """
+        with self._client_lock:
+            if client is None or client is self._client:
+                self._retire_client()
+
+    def close(self):
+        """Release the shared Docker client, its connection pool, and any events stream.
+
+        The runner can still be used after closing, it reconnects as needed.
+        """
+        with self._event_monitor_lock:
+            self._stop_event_monitor()
+        self.reset_client()
+
+    def _stop_event_monitor(self):
+        if self._event_monitor is not None:
+            self._event_monitor.stop()
+            _close_client(self._event_monitor.client)
+            self._event_monitor = None
+
+    def event_monitor(self) -> ContainerEventMonitor:
+        """Get the shared container event monitor, starting it as needed."""
+        with self._event_monitor_lock:
+            if self._event_monitor is None or self._event_monitor._failed:
+                self._stop_event_monitor()
+                # The events stream holds a connection open indefinitely, so give it a dedicated client.
+                monitor_client = docker.from_env(**self.client_kwargs)
+                self._event_monitor = ContainerEventMonitor(monitor_client, self.container_labels)
+                self._event_monitor.start()
+            return self._event_monitor
+
+    def prefetch_image(self, image: str) -> ImagePull:
+        """Make sure the given image is present locally, pulling it if necessary."""
+        try:
+            client = self._acquire_client()
+            try:
+                local_image = client.images.get(image)
+                pulled = False
+                logging.info(f"Image '{image}': already present locally.")
+            except ImageNotFound:
+                logging.info(f"Image '{image}': not present locally, pulling.")
+                local_image = client.images.pull(image)
+                pulled = True
+            finally:
+                self._release_client(client)
+
+            repo_digests = local_image.attrs.get("RepoDigests") or []
+            digest = repo_digests[0] if repo_digests else None
+            return ImagePull(image=image, image_id=local_image.id, digest=digest, pulled=pulled)
+
+        except APIError as api_error:
+            return ImagePull(image=image, error=f"APIError: {api_error.explanation}")
+
+        except DockerException as docker_exception:
+            return ImagePull(image=image, error=f"{type(docker_exception).__name__}: {docker_exception.args}")
 
     def run_container(
         self,
@@ -71,9 +318,13 @@ class DockerRunner:
 
         apply_step_X11(step)
 
+        if step.array:
+            logging.warning(f"Step '{step.name}': 'array' is ignored by Docker runner, running the step once.")
+
         retried_exception = None
         attempts = 0
         while attempts < self.max_attempts:
+            client = None
             try:
                 device_requests = []
                 if step.gpus:
@@ -101,7 +352,10 @@ class DockerRunner:
                 if step.privileged:
                     logging.warning(f"Container '{step.name}' using privileged mode.  Only use this for troubleshooting!")
 
-                client = docker.from_env(**self.client_kwargs)
+                client = self._acquire_client()
+                if self.supervise_with_events:
+                    event_monitor = self.event_monitor()
+
                 if isinstance(step.command, list):
                     command = [str(arg) for arg in step.command]
                 else:
@@ -141,24 +395,25 @@ class DockerRunner:
                     user=container_user,
                     shm_size=step.shm_size,
                     privileged=step.privileged,
+                    labels=self.container_labels,
                     **network_kwargs,
                 )
                 logging.info(f"Container '{step.name}': waiting for process to complete.")
 
-                step_log_stream = container.logs(stdout=True, stderr=True, stream=True)
-                with open(log_path, 'w') as f:
-                    for log_entry in step_log_stream:
-                        log = log_entry.decode("utf-8")
-                        f.write(log)
-                        logging.info(f"Step '{step.name}': {log.strip()}")
+                if self.supervise_with_events:
+                    exit_code = event_monitor.wait_for_exit(container.id)
+                    if exit_code is None:
+                        exit_code = container.wait()['StatusCode']
+                    step_details = self._write_container_logs(step, container, log_path)
+                else:
+                    step_details = self._write_container_logs(step, container, log_path)
+                    exit_code = container.wait()['StatusCode']
 
-                run_results = container.wait()
-                exit_code = run_results['StatusCode']
                 logging.info(f"Container '{step.name}': process completed with exit code {exit_code}")
 
                 container.remove()
 
-                return (container.image.id, exit_code, None)
+                return (container.image.id, exit_code, None, step_details)
 
             except APIError as api_error:
                 if api_error.is_client_error():
@@ -168,6 +423,7 @@ class DockerRunner:
                 else:
                     logging.error(f"Container had a Docker server error, will retry.", exc_info=True)
                     retried_exception = api_error
+                    self.reset_client(client)
 
             except DockerException as docker_exception:
                 logging.error(f"Container had a Docker error.", exc_info=True)
@@ -180,10 +436,15 @@ class DockerRunner:
                 # Some of these seem to be transient, so we can retry them.
                 logging.error(f"Container had an unexpected, non-Docker error, will retry", exc_info=True)
                 retried_exception = unexpected_exception
+                self.reset_client(client)
+
+            finally:
+                if client is not None:
+                    self._release_client(client)
 
             attempts += 1
             retry_log_message = f"Container attempts/retries at {attempts} out of {self.max_attempts}.\n"
-            with open(log_path, 'a') as f:
+            with open_log(log_path, 'at') as f:
                 f.write(retry_log_message)
             logging.info(retry_log_message.strip())
 
@@ -193,3 +454,33 @@ class DockerRunner:
         else:
             error_message = f"{type(retried_exception).__name__}: {retried_exception.args}\n"
         return (None, -1, error_message)
+
+    def _write_container_logs(self, step: Step, container: Any, log_path: Path) -> dict[str, str]:
+        """Stream container logs to the step log file(s), until the container exits.
+
+        Returns a dict of any separate stdout_file and stderr_file that were written,
+        or the log_digest and log_size of the combined log file.
+        """
+        if self.log_streams == "combined":
+            return self._write_container_stream(step, container, log_path, stdout=True, stderr=True)
+
+        # The step log itself will only receive messages from Proceed, like errors and retries.
+        with open_log(log_path, "wb"):
+            pass
+
+        stdout_path = stream_log_path(log_path, "stdout")
+        stderr_path = stream_log_path(log_path, "stderr")
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            stdout_future = executor.submit(self._write_container_stream, step, container, stdout_path, True, False)
+            self._write_container_stream(step, container, stderr_path, False, True)
+            stdout_future.result()
+
+        return {"stdout_file": stdout_path.as_posix(), "stderr_file": stderr_path.as_posix()}
+
+    def _write_container_stream(self, step: Step, container: Any, log_path: Path, stdout: bool, stderr: bool) -> dict[str, Any]:
+        """Stream one or both container output streams to the given log file, return its log_digest and log_size."""
+        step_log_stream = container.logs(stdout=stdout, stderr=stderr, stream=True, timestamps=self.log_timestamps)
+        with StepLogWriter(log_path, step.name, echo=self.log_echo, limit=self.log_echo_limit) as log_writer:
+            for log_entry in step_log_stream:
+                log_writer.write(log_entry)
+        return log_writer.log_details()
@@ -1,6 +1,10 @@
+import sys
+import json
 import logging
 import hashlib
+from argparse import ArgumentParser
 from pathlib import Path
+from typing import Optional, Sequence
 
 
 def match_patterns_in_dirs(dirs: list[str], glob_patterns: list[str]) -> dict[str, dict[str, str]]:
@@ -50,3 +54,22 @@ def file_summary(volume: str = "", path: str = "", digest: str = "", **kwargs) -
         'file_digest': digest,
         **kwargs
     }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Match and hash files, printing the matches as JSON, for "python -m proceed.file_matching ..."
+
+    This lets runners hash files on the host where the files are local, like a Slurm compute node.
+    """
+    parser = ArgumentParser(description="Match files in dirs and print their content digests as JSON.")
+    parser.add_argument("--dirs", nargs="+", required=True, help="dirs to search")
+    parser.add_argument("--patterns", nargs="+", required=True, help="glob patterns to search for in each dir")
+    cli_args = parser.parse_args(argv)
+
+    matches = match_patterns_in_dirs(cli_args.dirs, cli_args.patterns)
+    print(json.dumps(matches))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import logging
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Union
+
+from proceed.model import Step
+from proceed.file_matching import hash_contents
+from proceed.step_logs import copy_process_stream, copy_process_streams
+
+
+def path_rewrites(volumes: dict[str, Union[str, dict[str, str]]]) -> list[tuple[str, str]]:
+    """Convert a volumes dict to (container_abs, host_abs) pairs, longest container paths first."""
+    rewrites = []
+    for host_path, volume in volumes.items():
+        host_abs = Path(host_path).absolute().as_posix()
+        bind = volume if isinstance(volume, str) else volume["bind"]
+        container_abs = Path(bind).absolute().as_posix()
+        rewrites.append((container_abs, host_abs))
+    return sorted(rewrites, key=lambda rewrite: len(rewrite[0]), reverse=True)
+
+
+def rewrite_paths(value: Any, rewrites: list[tuple[str, str]]) -> Any:
+    """Replace container paths with corresponding host paths, wherever they occur in the given string(s).
+
+    Lists are rewritten element by element, and dicts are rewritten value by value.
+
+    Container paths are only replaced when they appear as whole path prefixes,
+    so ``/work`` is rewritten in ``/work/file.txt`` and ``--out=/work`` but not in ``/workspace``.
+    """
+    if isinstance(value, list):
+        return [rewrite_paths(e, rewrites) for e in value]
+    elif isinstance(value, dict):
+        return {k: rewrite_paths(v, rewrites) for k, v in value.items()}
+    elif not isinstance(value, str):
+        return value
+
+    for container_abs, host_abs in rewrites:
+        if container_abs == "/":
+            # Everything is under /, so rewriting it would be ambiguous.
+            continue
+        pattern = r"(?<![\w./-])" + re.escape(container_abs) + r"(?=/|[^\w.-]|$)"
+        value = re.sub(pattern, lambda match: host_abs, value)
+    return value
+
+
+class LocalRunner:
+    """Execute pipeline steps as local subprocesses, without containers.
+
+    This is intended for fast development and testing of pipelines, where container startup
+    would dominate the time spent per step.
+
+    Since there's no container, :attr:`Step.image` is not used.  Instead, the step's
+    :attr:`Step.command` runs directly on the host and :attr:`StepResult.image_id` records the
+    identity of the executable that ran, as its resolved path and content digest.
+
+    :attr:`Step.volumes` are not mounted.  Instead, container paths that appear in the step's
+    :attr:`Step.command`, :attr:`Step.environment` values, and :attr:`Step.working_dir` are
+    rewritten to the corresponding host paths.  Volume modes like ``ro`` are not enforced.
+
+    Step logs are handled like :class:`SlurmRunner` step logs, with the same
+    ``log_echo``, ``log_echo_limit``, ``log_streams``, and ``log_timestamps`` options.
+    """
+
+    def __init__(
+        self,
+        inherit_environment: bool = True,
+        log_echo: str = "all",
+        log_echo_limit: int = None,
+        log_streams: str = "combined",
+        log_timestamps: bool = False
+    ):
+        if log_streams not in {"combined", "separate"}:
+            raise ValueError(f"Unknown log_streams {log_streams!r}, expected 'combined' or 'separate'")
+
+        self.inherit_environment = inherit_environment
+        self.log_echo = log_echo
+        self.log_echo_limit = log_echo_limit
+        self.log_streams = log_streams
+        self.log_timestamps = log_timestamps
+
+        self._identities = {}
+        self._identities_lock = threading.Lock()
+
+    def run_container(
+        self,
+        step: Step,
+        log_path: Path,
+    ) -> tuple[str | None, int, str | None]:
+        """Run one step as a local subprocess.
+
+        Returns (image_id, exit_code, error_message, step_details). On success error_message is None.
+        The image_id identifies the executable that ran, like ``/usr/bin/echo@sha256:...``.
+        """
+        self._warn_unsupported_fields(step)
+
+        if not step.command:
+            error_message = "ValueError: LocalRunner requires a step command (there's no image entrypoint to fall back on)\n"
+            return (None, -1, error_message)
+
+        rewrites = path_rewrites(step.volumes)
+        if isinstance(step.command, list):
+            command = [str(arg) for arg in step.command]
+        else:
+            command = shlex.split(step.command)
+        command = rewrite_paths(command, rewrites)
+
+        if self.inherit_environment:
+            environment = {**os.environ, **rewrite_paths(step.environment, rewrites)}
+        else:
+            environment = rewrite_paths(step.environment, rewrites)
+        environment = {key: str(value) for key, value in environment.items()}
+
+        working_dir = rewrite_paths(step.working_dir, rewrites)
+        logging.info(f"Step '{step.name}': running local command {command} in {working_dir or os.getcwd()}")
+
+        try:
+            executable = shutil.which(command[0], path=environment.get("PATH"))
+            if executable is None:
+                raise FileNotFoundError(f"{command[0]}: executable file not found in PATH")
+            image_id = self.executable_identity(executable)
+
+            log_writer_kwargs = {"echo": self.log_echo, "limit": self.log_echo_limit, "timestamps": self.log_timestamps}
+            if self.log_streams == "combined":
+                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                           env=environment, cwd=working_dir)
+                step_details = copy_process_stream(process.stdout, log_path, step.name, **log_writer_kwargs)
+            else:
+                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                           env=environment, cwd=working_dir)
+                step_details = copy_process_streams(process, log_path, step.name, **log_writer_kwargs)
+
+            exit_code = process.wait()
+            logging.info(f"Step '{step.name}': completed with exit code {exit_code}.")
+            return (image_id, exit_code, None, step_details)
+
+        except Exception as e:
+            error_message = f"{type(e).__name__}: {e.args}\n"
+            logging.error(f"Step '{step.name}': {error_message}", exc_info=True)
+            return (None, -1, error_message)
+
+    def executable_identity(self, executable: str) -> str:
+        """Identify the given executable by its resolved path and content digest, cached per file version."""
+        resolved = Path(executable).resolve()
+        stat = resolved.stat()
+        cache_key = (resolved.as_posix(), stat.st_mtime_ns, stat.st_size)
+        with self._identities_lock:
+            if cache_key not in self._identities:
+                self._identities[cache_key] = f"{resolved.as_posix()}@{hash_contents(resolved)}"
+            return self._identities[cache_key]
+
+    def _warn_unsupported_fields(self, step: Step) -> None:
+        """Warn about Step fields that have no equivalent for a local subprocess."""
+        unsupported_fields = {
+            "gpus": step.gpus,
+            "mac_address": step.mac_address,
+            "network_mode": step.network_mode,
+            "privileged": step.privileged,
+            "shm_size": step.shm_size,
+            "user": step.user,
+            "X11": step.X11,
+            "array": step.array
+        }
+        for field_name, value in unsupported_fields.items():
+            if value:
+                logging.warning(f"Step '{step.name}': '{field_name}' is ignored by local runner.")
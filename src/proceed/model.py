@@ -391,6 +391,69 @@ class Step(YamlData):
             X11: True
     """
 
+    array: str = None
+    """Slurm `job array <https://slurm.schedmd.com/job_array.html>`_ index spec for fanning out the step into many tasks.
+
+    When :attr:`array` is given, the Slurm runner submits the step as one ``sbatch --array`` job
+    instead of running it with ``srun``.
+    Each task runs the same :attr:`command` and can use the ``SLURM_ARRAY_TASK_ID`` environment
+    variable to choose its own shard of work.
+    Per-task exit codes and log files are recorded in :attr:`StepResult.array_tasks`.
+
+    The spec can be a range, a list, and/or a limit on simultaneous tasks, as for ``sbatch --array``.
+    Other runners ignore :attr:`array` and run the step once.
+
+    .. code-block:: yaml
+
+        steps:
+          - name: fan out
+            image: ubuntu
+            array: 0-4999%100
+            command: [/bin/sh, -c, "process-shard $$SLURM_ARRAY_TASK_ID"]
+    """
+
+    slurm: dict[str, str | int | bool] = field(default_factory=dict)
+    """Slurm resource requests for the step, like ``cpus_per_task``, ``mem``, ``time``, ``partition``, and ``nodes``.
+
+    Each key-value pair becomes a Slurm option for the step's job, where underscores in the key become dashes.
+    For example ``cpus_per_task: 4`` becomes ``--cpus-per-task=4``.
+    A value of ``true`` becomes a flag with no value, like ``--exclusive``.
+    Accurate requests help the Slurm scheduler fit steps into available resources, including backfill.
+
+    Step :attr:`slurm` options are merged with options from the :attr:`Pipeline.prototype`, with the step taking precedence.
+    Other runners ignore :attr:`slurm`.
+
+    .. code-block:: yaml
+
+        steps:
+          - name: right-sized
+            slurm:
+              cpus_per_task: 4
+              mem: 16G
+              time: "02:00:00"
+              partition: short
+              nodes: 1
+    """
+
+    runner: str = None
+    """Name of the runner to use for this step, like ``docker``, ``slurm``, or ``local``.
+
+    By default steps use the runner chosen for the whole pipeline, for example with ``proceed run --runner``.
+    Steps that name a different :attr:`runner` use that one instead, with its default options.
+    This allows hybrid pipelines, for example with heavy steps on Slurm and light summary steps in local Docker.
+
+    .. code-block:: yaml
+
+        prototype:
+          runner: slurm
+        steps:
+          - name: heavy
+            image: ubuntu
+          - name: summary
+            image: ubuntu
+            runner: docker
+    """
+
     def _with_args_applied(self, args: dict[str, str]) -> Self:
         """Construct a new Step, the result of applying given args to string fields of this Step."""
         return Step(
@@ -412,7 +475,10 @@ class Step(YamlData):
             user=apply_args(self.user, args),
             shm_size=apply_args(self.shm_size, args),
             privileged=self.parse_yaml_string(apply_args(self.privileged, args)),
-            X11=self.parse_yaml_string(apply_args(self.X11, args))
+            X11=self.parse_yaml_string(apply_args(self.X11, args)),
+            array=apply_args(self.array, args),
+            slurm=apply_args(self.slurm, args),
+            runner=apply_args(self.runner, args)
         )
 
     def _with_prototype_applied(self, prototype: Self) -> Self:
@@ -439,7 +505,10 @@ class Step(YamlData):
             user=self.user or prototype.user,
             shm_size=self.shm_size or prototype.shm_size,
             privileged=self.privileged or prototype.privileged,
-            X11=self.X11 or prototype.X11
+            X11=self.X11 or prototype.X11,
+            array=self.array or prototype.array,
+            slurm={**prototype.slurm, **self.slurm},
+            runner=self.runner or prototype.runner
         )
 
 
@@ -466,6 +535,64 @@ class Timing(YamlData):
         return self.start is not None and self.finish is not None and self.duration > 0
 
 
+@dataclass
+class ArrayTaskResult(YamlData):
+    """Records what happened when one task of a :attr:`Step.array` ran."""
+
+    task_id: str = None
+    """The Slurm array task id, as in ``SLURM_ARRAY_TASK_ID``."""
+
+    exit_code: int = None
+    """The exit code of the task.
+
+    Exit code ``0`` is interpreted as success, nonzero as failure.
+    """
+
+    state: str = None
+    """The final Slurm job state of the task, like ``COMPLETED``, ``FAILED``, or ``TIMEOUT``."""
+
+    log_file: str = None
+    """The host path to the log file with the task's console output (stdout and stderr)."""
+
+
+@dataclass
+class SlurmAccounting(YamlData):
+    """Records Slurm accounting data from ``sacct`` about the job that ran a :class:`Step`.
+
+    Comparing these with :attr:`Step.slurm` resource requests shows how efficiently steps use what they ask for.
+    """
+
+    job_id: str = None
+    """The Slurm job id."""
+
+    step_ids: list[str] = field(default_factory=list)
+    """The Slurm job step ids within the job, like ``123.0`` or ``123.batch``."""
+
+    state: str = None
+    """The final Slurm job state, like ``COMPLETED``, ``FAILED``, or ``TIMEOUT``."""
+
+    node_list: str = None
+    """The node or nodes where the job ran, in Slurm hostlist format like ``node[01-04]``."""
+
+    alloc_cpus: int = None
+    """The number of CPUs allocated to the job."""
+
+    req_mem: str = None
+    """The memory requested for the job, as reported by Slurm, like ``16G``."""
+
+    elapsed: float = None
+    """Wall clock time the job ran, in seconds."""
+
+    total_cpu: float = None
+    """CPU time used by the job, user plus system, summed over all tasks, in seconds."""
+
+    max_rss: int = None
+    """Largest resident set size of any task in the job, in bytes."""
+
+    queue_wait: float = None
+    """Time the job waited in the queue between submission and start, in seconds."""
+
+
 @dataclass
 class StepResult(YamlData):
     """Records what happened when a :class:`Step` ran."""
@@ -491,6 +618,36 @@ class StepResult(YamlData):
     log_file: str = None
     """The host path to the log file with step console output (stdout and stderr)."""
 
+    stdout_file: str = None
+    """The host path to the log file with step stdout only, when capturing stdout and stderr separately.
+
+    When stdout and stderr are captured separately, :attr:`log_file` only receives messages from
+    Proceed itself, like errors and retries.
+    If timestamps are captured, each line starts with an
+    `RFC 3339 <https://www.rfc-editor.org/rfc/rfc3339>`_ UTC timestamp like ``2024-01-31T12:34:56.123456789Z``.
+    """
+
+    stderr_file: str = None
+    """The host path to the log file with step stderr only, when capturing stdout and stderr separately.
+
+    See :attr:`stdout_file`.
+    """
+
+    log_digest: str = field(compare=False, default=None)
+    """Content hash digest of the :attr:`log_file`, recorded when the step ran.
+
+    This is the digest of the log file as written, after any compression, like ``sha256:1a2b3c...``.
+    """
+
+    log_size: int = field(compare=False, default=None)
+    """Size in bytes of the :attr:`log_file`, recorded along with :attr:`log_digest`."""
+
+    job_id: str = None
+    """The Slurm job id of the step, when the step ran with the Slurm runner."""
+
+    slurm_accounting: SlurmAccounting = field(compare=False, default=None)
+    """Slurm accounting data about the step's job, when the step ran with the Slurm runner and ``sacct`` is available."""
+
     timing: Timing = field(compare=False, default=None)
     """Start datetime, finish datetime, and duration for the step's container process."""
 
@@ -601,6 +758,35 @@ class StepResult(YamlData):
     Other
     Other matching files will be teated as plaintext.
     The file name will be taken as one key, and the file text content be taken as the corresponding value.
+
+    The parsed content of each file is recorded in :attr:`custom_columns` when the step runs.
+    """
+
+    custom_columns: dict[str, Any] = field(default_factory=dict)
+    """Parsed content of the :attr:`files_summary`, recorded when the step ran.
+
+    This is a key-value mapping from file content hash digests to parsed content.
+    For YAML files, the parsed content is the top-level key-value mapping.
+    For other files, the parsed content is the file text, to be keyed by file name.
+
+    .. code-block:: yaml
+
+        step_results:
+          - name: custom columns example
+            files_summary:
+              /host/volume: {summary.yaml: 'sha256:5f386141...', note.txt: 'sha256:93d4e5c7...'}
+            custom_columns:
+              'sha256:5f386141...': {accuracy: 0.9, subjects: 12}
+              'sha256:93d4e5c7...': some notes
+
+    With :attr:`custom_columns`, summaries don't need to read the summary files again.
+    """
+
+    array_tasks: list[ArrayTaskResult] = field(default_factory=list)
+    """List of :class:`ArrayTaskResult`, one for each task when the step ran as a :attr:`Step.array`.
+
+    When a step runs as an array, the step's own :attr:`exit_code` is ``0`` if all tasks succeeded,
+    otherwise the first nonzero task exit code.
     """
 
     skipped: bool = False
@@ -837,6 +1023,33 @@ class Pipeline(YamlData):
         )
 
 
+@dataclass
+class ImagePull(YamlData):
+    """Records how a :attr:`Step.image` was pulled or verified before a :class:`Pipeline` started running."""
+
+    image: str = None
+    """The :attr:`Step.image` tag or id, as given."""
+
+    image_id: str = None
+    """The unique id that the :attr:`image` resolved to, or ``None`` if it couldn't be resolved."""
+
+    digest: str = None
+    """The registry digest of the :attr:`image`, if known.
+
+    This is a content-addressable reference like ``alpine@sha256:c5b1261d...``
+    that identifies the exact image that was pulled, independent of mutable tags.
+    """
+
+    pulled: bool = False
+    """Whether the :attr:`image` had to be pulled (``True``) or was already present locally (``False``)."""
+
+    error: str = None
+    """Error message if the :attr:`image` could not be pulled or verified, otherwise ``None``."""
+
+    timing: Timing = field(compare=False, default=None)
+    """Start datetime, finish datetime, and duration for pulling or verifying the :attr:`image`."""
+
+
 @dataclass
 class ExecutionRecord(YamlData):
     """Auditable record of what happened when a :class:`Pipeline` was amended and executed."""
@@ -853,6 +1066,13 @@ class ExecutionRecord(YamlData):
     timing: Timing = field(compare=False, default=None)
     """Start datetime, finish datetime, and duration for the entire pipeline execution."""
 
+    image_pulls: list[ImagePull] = field(compare=False, default_factory=list)
+    """List of :class:`ImagePull`, one for each distinct :attr:`Step.image` prefetched before the first step.
+
+    Images are pulled or verified concurrently when the pipeline starts,
+    so that steps don't block on pulls one at a time in the middle of the pipeline.
+    """
+
     step_results: list[StepResult] = field(default_factory=list)
     """List of :class:`StepResult` from runnung the :attr:`Pipeline.steps`
 
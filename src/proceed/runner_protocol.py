@@ -1,18 +1,42 @@
 import logging
 import shutil
 from os import environ
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Protocol, runtime_checkable
+from typing import Any, Callable, Protocol, runtime_checkable
 
-from proceed.model import Pipeline, ExecutionRecord, Step, StepResult, Timing
+from proceed.model import Pipeline, ExecutionRecord, ImagePull, Step, StepResult, Timing
 from proceed.run_recorder import RunRecorder
 from proceed.file_matching import count_matches, match_patterns_in_dirs
+from proceed.step_logs import log_file_details, log_file_name, open_log
+from proceed.custom_columns import collect_files_custom_columns
 
 
 @runtime_checkable
 class Runner(Protocol):
-    """Protocol that all proceed execution backends must implement."""
+    """Protocol that all proceed execution backends must implement.
+
+    Runners may also implement an optional ``prefetch_image(image: str) -> ImagePull | None``
+    method to pull or verify a step image ahead of time.
+    Returning ``None`` means the runner has nothing to prefetch for that image.
+
+    Runners may also implement an optional ``match_patterns_in_dirs(dirs, glob_patterns, step)`` method
+    to match and hash step files somewhere other than the local host, like a Slurm compute node.
+
+    Runners may also implement optional ``begin_pipeline(steps: list[Step])`` and ``end_pipeline()`` methods,
+    which :func:`run_pipeline` calls before the first step and after the last step,
+    for example to hold one Slurm allocation for the whole pipeline.
+    Likewise, :func:`run_step` calls optional ``begin_step(step: Step)`` and ``end_step(step: Step)`` methods
+    before checking and running each step and after its files are matched.
+
+    Runners may also implement an optional ``close()`` method to release clients and connections,
+    which :func:`run_pipeline` calls when the pipeline is done, like :meth:`DockerRunner.close`.
+    Runners should still be usable after ``close()``, reconnecting as needed.
+
+    Runners that support detached pipelines (see :func:`submit_pipeline`) also implement
+    ``submit_step()``, ``submit_finalizer()``, and ``job_details()``, like :class:`SlurmRunner`.
+    """
 
     def run_container(
         self,
@@ -25,6 +49,9 @@ class Runner(Protocol):
             image_id: identifier for the image that ran, or None on error
             exit_code: process exit code, or -1 on error
             error_message: formatted error string on failure, or None on success
+            step_details: (optional 4th element) dict of additional :class:`StepResult` attributes,
+                like ``stdout_file`` and ``stderr_file``, or ``log_digest`` and ``log_size``
+                if the runner hashed the step log while writing it
         """
         ...
 
@@ -88,26 +115,25 @@ def apply_step_X11(
     return step
 
 
-def run_step(
-    step: Step,
-    log_path: Path,
-    runner: Runner,
-    force_rerun: bool = False,
-) -> StepResult:
-    """Run one step using the given runner and return its result."""
-    logging.info(f"Step '{step.name}': starting.")
-
-    start = datetime.now(timezone.utc)
-    start_iso = start.isoformat(sep="T")
-
-    # Create volume dirs on the host as the current user before the container tries to mount them.
-    volume_dirs = step.volumes.keys()
-    for volume_dir in volume_dirs:
+def create_volume_dirs(step: Step):
+    """Create volume dirs on the host as the current user before the container tries to mount them."""
+    for volume_dir in step.volumes.keys():
         volume_path = Path(volume_dir)
         if not volume_path.exists():
             logging.info(f"Step '{step.name}': creating host directory: {volume_path}")
             volume_path.mkdir(parents=True, exist_ok=True)
 
+
+def check_step_done(
+    step: Step,
+    start_iso: str,
+    force_rerun: bool = False,
+    match_files: Callable[[list[str], list[str]], dict[str, dict[str, str]]] = match_patterns_in_dirs,
+) -> tuple[StepResult | None, dict[str, dict[str, str]]]:
+    """Check whether the step is already done, based on its progress .done file and done files.
+
+    Returns a skipped StepResult if the step should be skipped, otherwise None, along with any done files found.
+    """
     if step.progress_file is not None:
         progress_done_file = Path(step.progress_file + ".done")
         if progress_done_file.exists():
@@ -116,83 +142,221 @@ def run_step(
                 logging.info(f"Step '{step.name}': executing despite .done file because force_rerun is {force_rerun}.")
             else:
                 logging.info(f"Step '{step.name}': skipping execution because .done file found {progress_done_file}.")
-                return StepResult(
+                skipped_result = StepResult(
                     name=step.name,
                     skipped=True,
                     progress_done_file=progress_done_file.as_posix(),
                     timing=Timing(start_iso)
                 )
+                return (skipped_result, {})
 
-    files_done = match_patterns_in_dirs(volume_dirs, step.match_done)
+    files_done = match_files(step.volumes.keys(), step.match_done)
     if files_done:
         logging.info(f"Step '{step.name}': found {count_matches(files_done)} done files.")
         if force_rerun:
             logging.info(f"Step '{step.name}': executing despite done files because force_rerun is {force_rerun}.")
         else:
             logging.info(f"Step '{step.name}': skipping execution because done files were found.")
-            return StepResult(
+            skipped_result = StepResult(
                 name=step.name,
                 skipped=True,
                 files_done=files_done,
                 timing=Timing(start_iso)
             )
+            return (skipped_result, files_done)
+
+    return (None, files_done)
 
+
+def start_progress_file(step: Step, start_iso: str):
+    """Create the step's progress file, if any, when starting the step."""
     if step.progress_file is not None:
         progress_file = Path(step.progress_file)
         progress_file.parent.mkdir(parents=True, exist_ok=True)
         with open(progress_file, "w") as f:
             f.write(f"{start_iso} Starting step {step.name}\n")
 
-    files_in = match_patterns_in_dirs(volume_dirs, step.match_in)
-    logging.info(f"Step '{step.name}': found {count_matches(files_in)} input files.")
-
-    (image_id, exit_code, error_message) = runner.run_container(step, log_path)
-    finish = datetime.now(timezone.utc)
-    finish_iso = finish.isoformat(sep="T")
-
-    if error_message is not None:
-        with open(log_path, 'a') as f:
-            f.write(error_message)
-        logging.error(f"Step '{step.name}': error (see stack trace above) {error_message}")
-        return StepResult(
-            name=step.name,
-            log_file=log_path.as_posix(),
-            timing=Timing(start_iso),
-            exit_code=exit_code
-        )
-
-    files_out = match_patterns_in_dirs(volume_dirs, step.match_out)
-    logging.info(f"Step '{step.name}': found {count_matches(files_out)} output files.")
-
-    files_summary = match_patterns_in_dirs(volume_dirs, step.match_summary)
-    logging.info(f"Step '{step.name}': found {count_matches(files_summary)} summary files.")
 
+def finish_progress_file(step: Step, exit_code: int, finish_iso: str):
+    """Update the step's progress file, if any, and rename it to .done if the step succeeded."""
     if step.progress_file is not None:
         progress_file = Path(step.progress_file)
+        progress_done_file = Path(step.progress_file + ".done")
         if exit_code == 0:
             with open(progress_file, "a") as f:
                 f.write(f"{finish_iso} exit code {exit_code}\n")
                 f.write(f"{finish_iso} completed step {step.name}\n")
-            progress_file.rename(step.progress_file + ".done")
+            progress_file.rename(progress_done_file)
             logging.info(f"Step '{step.name}': renamed {progress_file} to {progress_done_file}.")
         else:
             with open(progress_file, "a") as f:
                 f.write(f"{finish_iso} exit code {exit_code}\n")
                 f.write(f"{finish_iso} error in step {step.name}\n")
 
-    logging.info(f"Step '{step.name}': finished.")
+
+def step_file_matcher(step: Step, runner: Runner) -> Callable[[list[str], list[str]], dict[str, dict[str, str]]]:
+    """Choose how to match and hash files for the given step: with the runner, if it can, otherwise locally."""
+    runner_match_files = getattr(runner, "match_patterns_in_dirs", None)
+    if runner_match_files is None:
+        return match_patterns_in_dirs
+    return lambda dirs, glob_patterns: runner_match_files(dirs, glob_patterns, step)
+
+
+def run_step(
+    step: Step,
+    log_path: Path,
+    runner: Runner,
+    force_rerun: bool = False,
+) -> StepResult:
+    """Run one step using the given runner and return its result."""
+    logging.info(f"Step '{step.name}': starting.")
+
+    start = datetime.now(timezone.utc)
+    start_iso = start.isoformat(sep="T")
+
+    # Runners may prepare for each step, for example by getting a Slurm allocation for the step's jobs.
+    if hasattr(runner, "begin_step"):
+        runner.begin_step(step)
+    try:
+        create_volume_dirs(step)
+        volume_dirs = step.volumes.keys()
+
+        # Runners may match and hash files where the files are local, otherwise do it here.
+        match_files = step_file_matcher(step, runner)
+
+        (skipped_result, files_done) = check_step_done(step, start_iso, force_rerun, match_files)
+        if skipped_result:
+            return skipped_result
+
+        start_progress_file(step, start_iso)
+
+        files_in = match_files(volume_dirs, step.match_in)
+        logging.info(f"Step '{step.name}': found {count_matches(files_in)} input files.")
+
+        (image_id, exit_code, error_message, *optional_details) = runner.run_container(step, log_path)
+        step_details = optional_details[0] if optional_details else {}
+        finish = datetime.now(timezone.utc)
+        finish_iso = finish.isoformat(sep="T")
+
+        if error_message is not None:
+            with open_log(log_path, 'at') as f:
+                f.write(error_message)
+            logging.error(f"Step '{step.name}': error (see stack trace above) {error_message}")
+            return StepResult(
+                name=step.name,
+                log_file=log_path.as_posix(),
+                timing=Timing(start_iso),
+                exit_code=exit_code,
+                **log_file_details(log_path)
+            )
+
+        # Runners may hash the log as they write it, otherwise do it here, once, so summaries don't have to.
+        if "log_digest" not in step_details:
+            step_details = {**step_details, **log_file_details(log_path)}
+
+        files_out = match_files(volume_dirs, step.match_out)
+        logging.info(f"Step '{step.name}': found {count_matches(files_out)} output files.")
+
+        files_summary = match_files(volume_dirs, step.match_summary)
+        logging.info(f"Step '{step.name}': found {count_matches(files_summary)} summary files.")
+        custom_columns = collect_files_custom_columns(files_summary)
+
+        finish_progress_file(step, exit_code, finish_iso)
+
+        logging.info(f"Step '{step.name}': finished.")
+        duration = finish - start
+        return StepResult(
+            name=step.name,
+            image_id=image_id,
+            exit_code=exit_code,
+            log_file=log_path.as_posix(),
+            files_done=files_done,
+            files_in=files_in,
+            files_out=files_out,
+            files_summary=files_summary,
+            custom_columns=custom_columns,
+            timing=Timing(start.isoformat(sep="T"), finish.isoformat(sep="T"), duration.total_seconds()),
+            **step_details
+        )
+    finally:
+        if hasattr(runner, "end_step"):
+            runner.end_step(step)
+
+
+def prefetch_image(image: str, runner: Runner) -> ImagePull | None:
+    """Pull or verify one image using the given runner, and record how long it took."""
+    start = datetime.now(timezone.utc)
+    try:
+        image_pull = runner.prefetch_image(image)
+    except Exception as e:
+        logging.error(f"Image '{image}': unexpected error during prefetch.", exc_info=True)
+        image_pull = ImagePull(image=image, error=f"{type(e).__name__}: {e.args}")
+
+    if image_pull is None:
+        return None
+
+    finish = datetime.now(timezone.utc)
     duration = finish - start
-    return StepResult(
-        name=step.name,
-        image_id=image_id,
-        exit_code=exit_code,
-        log_file=log_path.as_posix(),
-        files_done=files_done,
-        files_in=files_in,
-        files_out=files_out,
-        files_summary=files_summary,
-        timing=Timing(start.isoformat(sep="T"), finish.isoformat(sep="T"), duration.total_seconds()),
-    )
+    image_pull.timing = Timing(start.isoformat(sep="T"), finish.isoformat(sep="T"), duration.total_seconds())
+    if image_pull.error:
+        logging.warning(f"Image '{image}': prefetch failed: {image_pull.error}")
+    else:
+        logging.info(f"Image '{image}': resolved to {image_pull.image_id} in {duration.total_seconds()} seconds.")
+    return image_pull
+
+
+def prefetch_images(
+    steps: list[Step],
+    runner: Runner,
+    max_workers: int = 4
+) -> list[ImagePull]:
+    """Concurrently pull or verify the distinct images used by the given steps.
+
+    Prefetch failures are recorded but not fatal -- the affected steps will report their own errors when they run.
+    Runners that don't implement ``prefetch_image`` are skipped.
+    """
+    if not hasattr(runner, "prefetch_image"):
+        return []
+
+    images = list(dict.fromkeys(step.image for step in steps if step.image))
+    if not images:
+        return []
+
+    logging.info(f"Prefetching {len(images)} image(s): {images}")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(images)))) as executor:
+        image_pulls = list(executor.map(lambda image: prefetch_image(image, runner), images))
+    return [image_pull for image_pull in image_pulls if image_pull is not None]
+
+
+def step_runner(
+    step: Step,
+    runner: Runner,
+    step_runners: dict[str, Runner],
+    runner_options: dict[str, dict[str, Any]] = {},
+    runner_errors: dict[str, str] = {}
+) -> Runner | None:
+    """Choose the runner for one step: the one named by :attr:`Step.runner`, if any, otherwise the given runner.
+
+    Named runners are created once, as needed, with :func:`make_runner`, and reused via the given step_runners.
+    Any runner_options for the named runner are passed to :func:`make_runner` as keyword args.
+    If a named runner can't be created, this returns None and notes why in the given runner_errors.
+    """
+    if not step.runner:
+        return runner
+
+    if step.runner not in step_runners:
+        options = runner_options.get(step.runner, {})
+        logging.info(f"Step '{step.name}': creating runner {step.runner!r} with options {options}.")
+        try:
+            named_runner = make_runner(step.runner, **options)
+            if named_runner is None:
+                runner_errors[step.runner] = f"ValueError: unknown runner {step.runner!r}"
+        except Exception as e:
+            logging.error(f"Step '{step.name}': error creating runner {step.runner!r}.", exc_info=True)
+            named_runner = None
+            runner_errors[step.runner] = f"{type(e).__name__}: {e}"
+        step_runners[step.runner] = named_runner
+    return step_runners[step.runner]
 
 
 def run_pipeline(
@@ -203,11 +367,19 @@ def run_pipeline(
     args: dict[str, str] = {},
     force_rerun: bool = False,
     step_names: list[str] = None,
+    prefetch: bool = True,
+    log_compression: str = None,
+    step_runners: dict[str, Runner] = None,
+    runner_options: dict[str, dict[str, Any]] = None,
 ) -> ExecutionRecord:
     """Run steps of a pipeline and return results.
 
     :param original: a Pipeline, as read from an input YAML spec
-    :param runner: a Runner that executes each step's container
+    :param runner: a Runner that executes each step's container, unless the step names its own :attr:`Step.runner`
+    :param prefetch: whether to pull or verify step images concurrently, before the first step
+    :param log_compression: how to compress step log files: None, "gzip", or "zstd"
+    :param step_runners: Runners by name, to use for steps that name a :attr:`Step.runner` -- others are created as needed
+    :param runner_options: keyword args by runner name, for creating runners that aren't in step_runners
     :return: a summary of Pipeline execution results.
     """
     logging.info("Starting pipeline run.")
@@ -217,14 +389,36 @@ def run_pipeline(
 
     amended = original._with_args_applied(args)._with_prototype_applied()
     step_results = []
+    image_pulls = []
+    step_runners = dict(step_runners or {})
+    runner_errors = {}
+    pipeline_runners = []
+    distinct_runners = []
     try:
+        steps_to_run = []
         for step in amended.steps:
             if step_names and not step.name in step_names:
                 logging.info(f"Ignoring step '{step.name}', not in list of steps to run: {step_names}")
                 continue
+            steps_to_run.append((step, step_runner(step, runner, step_runners, runner_options or {}, runner_errors)))
+
+        # Each distinct runner can prepare for its own steps, for example by pulling images.
+        for (_, each_runner) in steps_to_run:
+            if each_runner is not None and not any(each_runner is r for r in distinct_runners):
+                distinct_runners.append(each_runner)
 
+        for pipeline_runner in distinct_runners:
+            runner_steps = [step for (step, each_runner) in steps_to_run if each_runner is pipeline_runner]
+            if prefetch:
+                image_pulls += prefetch_images(runner_steps, pipeline_runner)
+
+            if hasattr(pipeline_runner, "begin_pipeline"):
+                pipeline_runner.begin_pipeline(runner_steps)
+            pipeline_runners.append(pipeline_runner)
+
+        for (step, each_runner) in steps_to_run:
             log_stem = step.name.replace(" ", "_")
-            log_path = Path(execution_path, f"{log_stem}.log")
+            log_path = Path(execution_path, log_file_name(log_stem, log_compression))
 
             # Write a partial record before running so a crash still leaves a breadcrumb.
             partial_result = StepResult(
@@ -237,11 +431,24 @@ def run_pipeline(
                 original=original,
                 amended=amended,
                 step_results=step_results,
-                timing=Timing(start_iso)
+                timing=Timing(start_iso),
+                image_pulls=image_pulls
             )
             run_recorder.write(partial_record)
 
-            step_result = run_step(step, log_path, runner, force_rerun)
+            if each_runner is None:
+                runner_error = runner_errors.get(step.runner, "no runner given")
+                with open_log(log_path, 'wt') as f:
+                    f.write(f"unable to create runner {step.runner!r}: {runner_error}\n")
+                logging.error(f"Step '{step.name}': unable to create runner {step.runner!r}: {runner_error}")
+                step_result = StepResult(
+                    name=step.name,
+                    log_file=log_path.as_posix(),
+                    timing=Timing(start_iso),
+                    exit_code=-1
+                )
+            else:
+                step_result = run_step(step, log_path, each_runner, force_rerun)
             step_results[-1] = step_result
 
             if step_result.exit_code:
@@ -249,6 +456,14 @@ def run_pipeline(
                 break
 
     finally:
+        for pipeline_runner in pipeline_runners:
+            if hasattr(pipeline_runner, "end_pipeline"):
+                pipeline_runner.end_pipeline()
+
+        for pipeline_runner in distinct_runners:
+            if hasattr(pipeline_runner, "close"):
+                pipeline_runner.close()
+
         finish = datetime.now(timezone.utc)
         finish_iso = finish.isoformat(sep="T")
         duration = finish - start
@@ -259,53 +474,240 @@ def run_pipeline(
             original=original,
             amended=amended,
             step_results=step_results,
-            timing=Timing(start_iso, finish_iso, duration.total_seconds())
+            timing=Timing(start_iso, finish_iso, duration.total_seconds()),
+            image_pulls=image_pulls
         )
         run_recorder.write(execution_record)
 
     return execution_record
 
 
+def submit_pipeline(
+    original: Pipeline,
+    execution_path: Path,
+    run_recorder: RunRecorder,
+    runner: Runner,
+    args: dict[str, str] = {},
+    force_rerun: bool = False,
+    step_names: list[str] = None,
+    prefetch: bool = True,
+    finalize_command: list[str] = None,
+) -> ExecutionRecord:
+    """Submit steps of a pipeline as a chain of dependent batch jobs and return without waiting for them.
+
+    Each step's job waits for the previous step's job to succeed.
+    If a step fails, the jobs for the remaining steps are cancelled.
+    Steps that are already done are checked and skipped at submit time.
+
+    The returned :class:`ExecutionRecord` only has partial :class:`StepResult`, with :attr:`StepResult.job_id`.
+    It's written by the run_recorder so that :func:`finalize_pipeline` can complete it later.
+    If a finalize_command is given, it's submitted as a job that runs after all the step jobs end,
+    for example to run ``proceed finalize`` on a compute node.
+
+    :param original: a Pipeline, as read from an input YAML spec
+    :param runner: a Runner that implements ``submit_step()`` and ``submit_finalizer()``, like :class:`SlurmRunner`
+    :param finalize_command: command to run as a job after all step jobs end, or None to skip it
+    :return: a partial summary of Pipeline execution, with submitted job ids.
+    """
+    logging.info("Submitting pipeline.")
+
+    start = datetime.now(timezone.utc)
+    start_iso = start.isoformat(sep="T")
+
+    amended = original._with_args_applied(args)._with_prototype_applied()
+    steps_to_run = [step for step in amended.steps if not step_names or step.name in step_names]
+    image_pulls = prefetch_images(steps_to_run, runner) if prefetch else []
+
+    step_results = []
+    job_ids = []
+    for step in steps_to_run:
+        if step.runner:
+            logging.warning(f"Step '{step.name}': ignoring runner {step.runner!r} when submitting a detached pipeline.")
+
+        create_volume_dirs(step)
+        (skipped_result, files_done) = check_step_done(step, start_iso, force_rerun, step_file_matcher(step, runner))
+        if skipped_result:
+            step_results.append(skipped_result)
+            continue
+
+        log_path = Path(execution_path, log_file_name(step.name.replace(" ", "_")))
+        dependency = job_ids[-1] if job_ids else None
+        (job_id, step_details) = runner.submit_step(step, log_path, dependency)
+        job_ids.append(job_id)
+        start_progress_file(step, start_iso)
+
+        step_results.append(StepResult(
+            name=step.name,
+            log_file=log_path.as_posix(),
+            job_id=job_id,
+            files_done=files_done,
+            timing=Timing(start_iso),
+            **step_details
+        ))
+
+    execution_record = ExecutionRecord(
+        original=original,
+        amended=amended,
+        step_results=step_results,
+        timing=Timing(start_iso),
+        image_pulls=image_pulls
+    )
+    run_recorder.write(execution_record)
+
+    if finalize_command:
+        finalize_log_path = Path(execution_path, "proceed_finalize.log")
+        runner.submit_finalizer(finalize_command, finalize_log_path, job_ids)
+
+    logging.info(f"Submitted {len(job_ids)} step job(s): {job_ids}")
+    return execution_record
+
+
+def finalize_pipeline(
+    submitted: ExecutionRecord,
+    run_recorder: RunRecorder,
+    runner: Runner,
+) -> ExecutionRecord:
+    """Complete the execution record of a pipeline from :func:`submit_pipeline`, after all its jobs have ended.
+
+    This gathers each step's exit code and timing from the runner, hashes each step's
+    input, output, and summary files, and writes the completed record with the run_recorder.
+    Steps whose jobs never started, because an earlier step failed, are omitted from the record.
+    Steps whose jobs the runner has no record of are kept, with an error exit code.
+
+    Since the steps ran earlier, unattended, all files are hashed when finalizing rather than while each step ran.
+    So :attr:`StepResult.files_in` reflects files as they are after the whole pipeline,
+    which may differ from what a step actually read if later steps modified the same files.
+
+    :param submitted: the partial ExecutionRecord written by :func:`submit_pipeline`
+    :param runner: a Runner that implements ``job_details()``, like :class:`SlurmRunner`
+    :return: a summary of Pipeline execution results.
+    """
+    logging.info("Finalizing pipeline.")
+
+    steps = {step.name: step for step in submitted.amended.steps}
+    step_results = []
+    for submitted_result in submitted.step_results:
+        if not submitted_result.job_id:
+            step_results.append(submitted_result)
+            continue
+
+        step = steps[submitted_result.name]
+        log_path = Path(submitted_result.log_file)
+        job_details = runner.job_details(submitted_result.job_id, log_path, array=step.array)
+        if job_details is None:
+            logging.info(f"Step '{step.name}': job {submitted_result.job_id} never started.")
+            continue
+
+        volume_dirs = step.volumes.keys()
+        files_in = match_patterns_in_dirs(volume_dirs, step.match_in)
+        files_out = match_patterns_in_dirs(volume_dirs, step.match_out)
+        files_summary = match_patterns_in_dirs(volume_dirs, step.match_summary)
+        logging.info(f"Step '{step.name}': found {count_matches(files_in)} input files, "
+                     f"{count_matches(files_out)} output files, {count_matches(files_summary)} summary files.")
+
+        step_result = StepResult(
+            name=step.name,
+            image_id=submitted_result.image_id or step.image,
+            log_file=submitted_result.log_file,
+            stdout_file=submitted_result.stdout_file,
+            stderr_file=submitted_result.stderr_file,
+            job_id=submitted_result.job_id,
+            files_done=submitted_result.files_done,
+            files_in=files_in,
+            files_out=files_out,
+            files_summary=files_summary,
+            custom_columns=collect_files_custom_columns(files_summary),
+            **log_file_details(log_path),
+            # Without job timing from the runner, at least keep the submit time.
+            **{"timing": submitted_result.timing, **job_details}
+        )
+        finish_progress_file(step, step_result.exit_code, step_result.timing.finish or step_result.timing.start)
+        step_results.append(step_result)
+
+    finish = datetime.now(timezone.utc)
+    start_iso = submitted.timing.start if submitted.timing else finish.isoformat(sep="T")
+    duration = finish - datetime.fromisoformat(start_iso)
+
+    execution_record = ExecutionRecord(
+        original=submitted.original,
+        amended=submitted.amended,
+        step_results=step_results,
+        timing=Timing(start_iso, finish.isoformat(sep="T"), duration.total_seconds()),
+        image_pulls=submitted.image_pulls
+    )
+    run_recorder.write(execution_record)
+
+    logging.info("Finished pipeline.")
+    return execution_record
+
+
+def _make_docker_runner(**kwargs) -> Runner:
+    from proceed.docker_runner import DockerRunner
+    return DockerRunner(**kwargs)
+
+
+def _make_slurm_runner(**kwargs) -> Runner:
+    from proceed.slurm_runner import SlurmRunner
+    return SlurmRunner(**kwargs)
+
+
+def _make_local_runner(**kwargs) -> Runner:
+    from proceed.local_runner import LocalRunner
+    return LocalRunner(**kwargs)
+
+
+runner_registry: dict[str, Callable[..., Runner]] = {
+    "docker": _make_docker_runner,
+    "slurm": _make_slurm_runner,
+    "local": _make_local_runner,
+}
+
+
+def register_runner(runner_name: str, factory: Callable[..., Runner]):
+    """Add a runner factory to the registry, so :func:`make_runner` and :attr:`Step.runner` can refer to it by name."""
+    runner_registry[runner_name] = factory
+
+
 def make_runner(runner_name: str, **kwargs) -> Runner | None:
-    """Construct a Runner by name.
+    """Construct a Runner by name, using the factory from the runner registry.
 
     Lazy imports prevent ImportError -- eg don't try to import docker on a slurm-only system.
     """
-    if runner_name == "docker":
-        from proceed.docker_runner import DockerRunner
-        return DockerRunner(**kwargs)
-    elif runner_name == "slurm":
-        from proceed.slurm_runner import SlurmRunner
-        return SlurmRunner(**kwargs)
-    else:
-        logging.error(f"Unknown runner: {runner_name!r}. Choose 'docker' or 'slurm'.")
+    factory = runner_registry.get(runner_name)
+    if factory is None:
+        runner_names = ", ".join(repr(name) for name in runner_registry.keys())
+        logging.error(f"Unknown runner: {runner_name!r}. Choose one of {runner_names}.")
         return None
+    return factory(**kwargs)
 
 
 def discover_runner(
     docker_environment: dict[str, str] = environ,
-    slurm_srun_path: str = "srun"
+    slurm_srun_path: str = "srun",
+    runner_options: dict[str, Any] = {}
 ) -> Runner | None:
     """Return the first available runner, preferring Docker over Slurm.
 
     Docker is confirmed by pinging the daemon (not just finding the CLI).
     Slurm is confirmed by finding srun on PATH.
+    Any given runner_options are passed as keyword args to the runner that's detected.
     """
     if docker_environment:
         try:
             from docker import from_env
             client = from_env(environment=docker_environment)
             client.ping()
+            client.close()
             logging.info("Detected docker backend (daemon is running).")
             from proceed.docker_runner import DockerRunner
-            return DockerRunner()
+            return DockerRunner(**runner_options)
         except Exception:
             logging.info("Docker runner not available (daemon not running or docker SDK not installed).")
 
     if slurm_srun_path and shutil.which(slurm_srun_path) is not None:
         logging.info(f"Detected slurm backend ({slurm_srun_path} found on PATH).")
         from proceed.slurm_runner import SlurmRunner
-        return SlurmRunner(srun_path=slurm_srun_path)
+        return SlurmRunner(**{"srun_path": slurm_srun_path, **runner_options})
 
     logging.error("No backend detected: Docker nor Slurm.")
     return None
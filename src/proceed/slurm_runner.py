@@ -1,10 +1,23 @@
+import fcntl
+import json
 import logging
+import os
+import re
+import shlex
 import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Union
+from typing import Any, Iterator, Union
 
-from proceed.model import Step
+from proceed.file_matching import hash_contents, match_patterns_in_dirs
+from proceed.model import ArrayTaskResult, ImagePull, SlurmAccounting, Step, Timing
 from proceed.runner_protocol import apply_step_X11
+from proceed.step_logs import copy_process_stream, copy_process_streams, open_log, stream_log_path
 
 
 def _mounts_from_volumes(
@@ -22,14 +35,648 @@ def _mounts_from_volumes(
     return mounts
 
 
+def _enroot_uri(image: str) -> str:
+    """Convert a Docker-style image reference to an Enroot import URI like docker://registry#repo:tag."""
+    parts = image.split("/", 1)
+    if len(parts) > 1 and ("." in parts[0] or ":" in parts[0] or parts[0] == "localhost"):
+        return f"docker://{parts[0]}#{parts[1]}"
+    return f"docker://{image}"
+
+
+def _image_ref_name(image: str) -> str:
+    """Choose a file name for the given image reference, replacing characters like "/" and ":"."""
+    return "".join(c if c.isalnum() or c in "-_." else "+" for c in image)
+
+
+def _squashfs_name(digest: str) -> str:
+    """Choose a file name for the squashfs file with the given content digest, like sha256-1234abcd.sqsh."""
+    return f"{digest.replace(':', '-')}.sqsh"
+
+
+def _image_repository(image: str) -> str:
+    """Get the repository part of an image reference, without any tag or digest, like ``alpine`` for ``alpine:3``."""
+    repository = image.split("@", 1)[0]
+    (registry_and_path, slash, name) = repository.rpartition("/")
+    return f"{registry_and_path}{slash}{name.split(':', 1)[0]}"
+
+
+def _slurm_option_args(options: dict[str, str | int | bool], exclude: set[str] = set()) -> list[str]:
+    """Convert a :attr:`Step.slurm` options dict to Slurm command line args like --cpus-per-task=4."""
+    args = []
+    for key, value in options.items():
+        if key.replace("-", "_") in exclude:
+            continue
+        name = key.replace("_", "-")
+        if value is True:
+            args.append(f"--{name}")
+        elif value is not None and value is not False:
+            args.append(f"--{name}={value}")
+    return args
+
+
+# Options that apply to a whole job allocation, not to job steps within it.
+allocation_only_options = {"partition", "account", "qos", "reservation", "constraint"}
+
+# Options where one allocation needs the largest count requested by any step.
+allocation_max_options = {"ntasks", "cpus_per_task"}
+
+# Options with GPU counts like "2" or "a100:2", where one allocation needs the largest count of each GPU type.
+allocation_gpu_options = {"gpus", "gpus_per_node"}
+
+
+def format_slurm_duration(seconds: float) -> str:
+    """Convert seconds to a Slurm duration like ``1-02:03:04``."""
+    (minutes, seconds) = divmod(int(seconds), 60)
+    (hours, minutes) = divmod(minutes, 60)
+    (days, hours) = divmod(hours, 24)
+    return f"{days}-{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def parse_slurm_time_limit(time_limit: str | int) -> int | None:
+    """Convert a Slurm time limit, as given to ``--time``, to seconds.
+
+    Slurm accepts ``minutes``, ``minutes:seconds``, ``hours:minutes:seconds``, ``days-hours``,
+    ``days-hours:minutes``, and ``days-hours:minutes:seconds``.
+    Returns None for ``UNLIMITED`` or ``INFINITE``, and raises ValueError for other values.
+    """
+    text = str(time_limit).strip()
+    if text.upper() in {"UNLIMITED", "INFINITE"}:
+        return None
+
+    match = re.fullmatch(r"(?:(\d+)-)?(\d+)(?::(\d+))?(?::(\d+))?", text)
+    if not match:
+        raise ValueError(f"Invalid Slurm time limit: {time_limit!r}")
+
+    (days, first, second, third) = [int(group) if group else 0 for group in match.groups()]
+    if match.group(1) is not None or match.group(4) is not None:
+        (hours, minutes, seconds) = (first, second, third)
+    else:
+        (hours, minutes, seconds) = (0, first, second)
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def parse_slurm_gpus(gpus: str | int) -> dict[str | None, int]:
+    """Convert a Slurm GPU request like ``2``, ``a100:2``, or ``a100:2,v100:1`` to counts by GPU type.
+
+    Untyped counts are keyed by None.  Raises ValueError for requests without a count.
+    """
+    counts = {}
+    for item in str(gpus).split(","):
+        (gpu_type, _, count) = item.strip().rpartition(":")
+        counts[gpu_type or None] = int(count)
+    return counts
+
+
+def format_slurm_gpus(counts: dict[str | None, int]) -> str | int:
+    """Convert GPU counts by type, from :func:`parse_slurm_gpus`, back to a Slurm GPU request."""
+    if list(counts.keys()) == [None]:
+        return counts[None]
+    return ",".join(str(count) if gpu_type is None else f"{gpu_type}:{count}" for gpu_type, count in counts.items())
+
+
+def parse_slurm_node_count(nodes: str | int) -> tuple[int, int]:
+    """Convert a Slurm node count like ``2`` or ``2-4`` to (min, max) nodes.  Raises ValueError for other values."""
+    match = re.fullmatch(r"(\d+)(?:-(\d+))?", str(nodes).strip())
+    if not match:
+        raise ValueError(f"Invalid Slurm node count: {nodes!r}")
+    min_nodes = int(match.group(1))
+    return (min_nodes, int(match.group(2) or min_nodes))
+
+
+def step_gpu_options(step: Step) -> dict[str, str | int]:
+    """Convert a step's :attr:`Step.gpus` to Slurm options, the same way the step's srun will request GPUs."""
+    if not step.gpus:
+        return {}
+    elif isinstance(step.gpus, list):
+        # Lists are srun args as-is, like "--gpus=2".
+        options = {}
+        for arg in step.gpus:
+            (name, has_value, value) = str(arg).lstrip("-").partition("=")
+            if has_value:
+                options[name.replace("-", "_")] = value
+        return options
+    elif step.gpus is True:
+        return {"gpus_per_node": 1}
+    else:
+        return {"gpus_per_node": step.gpus}
+
+
+def pipeline_allocation_options(steps: list[Step]) -> dict[str, str | int | bool]:
+    """Size one Slurm allocation to fit each of the given steps in turn, based on their :attr:`Step.slurm` requests.
+
+    Counts like ``cpus_per_task`` take the largest value from any step, and so does ``mem``.
+    Node counts like ``2-4`` take the largest min and max from any step.
+    GPU requests like ``a100:2``, including those from :attr:`Step.gpus`, take the largest count of each GPU type.
+    The ``time`` is the sum over all steps, as long as every step gives a time.
+    Other options, like ``partition``, are kept when all steps that give them agree.
+
+    Raises ValueError for values that don't follow Slurm's syntax.
+    """
+    step_options = [
+        {**step_gpu_options(step), **{key.replace("-", "_"): value for key, value in step.slurm.items()}}
+        for step in steps if not step.array
+    ]
+
+    options = {}
+    all_keys = list(dict.fromkeys(key for each_step_options in step_options for key in each_step_options))
+    for key in all_keys:
+        values = [each_step_options[key] for each_step_options in step_options if key in each_step_options]
+        if key in allocation_max_options:
+            options[key] = max(int(value) for value in values)
+        elif key in allocation_gpu_options:
+            counts = {}
+            for value in values:
+                for gpu_type, count in parse_slurm_gpus(value).items():
+                    counts[gpu_type] = max(count, counts.get(gpu_type, 0))
+            options[key] = format_slurm_gpus(counts)
+        elif key == "nodes":
+            node_counts = [parse_slurm_node_count(value) for value in values]
+            min_nodes = max(min_count for (min_count, _) in node_counts)
+            max_nodes = max(max_count for (_, max_count) in node_counts)
+            options[key] = min_nodes if min_nodes == max_nodes else f"{min_nodes}-{max_nodes}"
+        elif key == "mem":
+            # Slurm reads plain numbers as megabytes.
+            options[key] = max(values, key=lambda value: parse_slurm_memory(str(value), default_unit="M"))
+        elif key == "time":
+            if len(values) == len(step_options):
+                seconds = [parse_slurm_time_limit(value) for value in values]
+                if None in seconds:
+                    options[key] = "UNLIMITED"
+                else:
+                    options[key] = format_slurm_duration(sum(seconds))
+        elif all(value == values[0] for value in values):
+            options[key] = values[0]
+    return options
+
+
+def parse_slurm_array(array: str | int) -> list[int]:
+    """Convert a Slurm ``--array`` spec like ``0-15``, ``1,3,5-7``, or ``0-15:4%2`` to the list of task ids.
+
+    Raises ValueError for specs that don't follow Slurm's syntax.
+    """
+    task_ids = set()
+    for item in str(array).split("%")[0].split(","):
+        match = re.fullmatch(r"(\d+)(?:-(\d+)(?::(\d+))?)?", item.strip())
+        if not match:
+            raise ValueError(f"Invalid Slurm array spec: {array!r}")
+        first = int(match.group(1))
+        last = int(match.group(2) or first)
+        stride = int(match.group(3) or 1)
+        task_ids.update(range(first, last + 1, stride))
+    return sorted(task_ids)
+
+
+def parse_exit_code(sacct_exit_code: str) -> int:
+    """Convert a sacct "exit_code:signal" value to a shell-style exit code."""
+    (exit_code, signal) = sacct_exit_code.split(":")
+    if int(exit_code) == 0 and int(signal) != 0:
+        return 128 + int(signal)
+    return int(exit_code)
+
+
+def parse_slurm_duration(duration: str) -> float | None:
+    """Convert a Slurm duration like ``1-02:03:04``, ``02:03:04``, or ``03:04.567`` to seconds."""
+    if not duration or duration in {"Unknown", "INVALID", "UNLIMITED"}:
+        return None
+    (days, _, clock) = duration.rpartition("-")
+    seconds = 0.0
+    for part in clock.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds + int(days or 0) * 24 * 60 * 60
+
+
+memory_units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4, "P": 1024 ** 5}
+
+
+def parse_slurm_memory(memory: str, default_unit: str = None) -> int | None:
+    """Convert a Slurm memory size like ``1234K`` or ``1.5G`` to bytes.
+
+    Sizes without a unit are bytes, like from sacct, unless a default_unit like "M" is given, like for ``--mem``.
+    """
+    if not memory:
+        return None
+    unit = memory[-1].upper()
+    if unit in memory_units:
+        return int(float(memory[:-1]) * memory_units[unit])
+    return int(float(memory) * memory_units.get(default_unit, 1))
+
+
+# Job states that sacct reports for jobs that are done, one way or another.
+sacct_ended_states = {
+    "BOOT_FAIL", "CANCELLED", "COMPLETED", "DEADLINE", "FAILED", "NODE_FAIL", "OUT_OF_MEMORY", "PREEMPTED", "TIMEOUT"
+}
+
+
+def _sacct_row_ended(row: dict[str, str]) -> bool:
+    """Does the sacct row show a job that's done, rather than one whose accounting hasn't caught up yet?"""
+    return row["State"].split(" ")[0] in sacct_ended_states
+
+
+def _sacct_rows_never_started(rows: list[dict[str, str]]) -> bool:
+    """Do the sacct rows show a job that Slurm cancelled before it started, like after a failed dependency?"""
+    if any(parse_sacct_time(row["Start"]) is not None for row in rows):
+        return False
+    return any(
+        row["State"].startswith("CANCELLED") or row.get("Reason") == "DependencyNeverSatisfied"
+        for row in rows
+    )
+
+
+def parse_sacct_time(sacct_time: str) -> datetime | None:
+    """Convert a sacct Start or End time, in the cluster's local time zone, to a UTC datetime.
+
+    Returns None for jobs that never started or haven't ended, which sacct reports as ``Unknown`` or ``None``.
+    """
+    if not sacct_time or sacct_time in {"Unknown", "None"}:
+        return None
+    return datetime.fromisoformat(sacct_time).astimezone(timezone.utc)
+
+
+class SlurmJobTracker:
+    """Track many Slurm jobs with one ``squeue`` query per poll interval, and wake threads waiting for them.
+
+    Threads call :meth:`wait_for_job`, which blocks until the job has left the queue.
+    Meanwhile, one background thread polls ``squeue`` for all tracked jobs at once.
+    While no tracked jobs finish, the poll interval backs off, up to ``max_poll_interval``.
+    The interval also backs off when ``squeue`` fails, for example when slurmctld is busy.
+    The background thread exits when there are no more jobs to track.
+    """
+
+    def __init__(
+        self,
+        squeue_path: str = "squeue",
+        poll_interval: float = 10.0,
+        max_poll_interval: float = 60.0,
+        backoff: float = 1.5
+    ):
+        self.squeue_path = squeue_path
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max(poll_interval, max_poll_interval)
+        self.backoff = backoff
+
+        self._waiters = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._current_interval = poll_interval
+
+    def track(self, job_id: str) -> threading.Event:
+        """Start tracking the given job and return an event that will be set once the job has left the queue."""
+        with self._lock:
+            event = self._waiters.get(job_id)
+            if event is None:
+                event = threading.Event()
+                self._waiters[job_id] = event
+            # Check back soon for newly submitted jobs.
+            self._current_interval = self.poll_interval
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._poll_jobs, name="slurm-job-tracker", daemon=True)
+                self._thread.start()
+        return event
+
+    def wait_for_job(self, job_id: str, timeout: float = None) -> bool:
+        """Block until the given job (including all array tasks) has left the queue, or until timeout.
+
+        Returns True if the job has left the queue, False if the timeout expired first.
+        """
+        return self.track(job_id).wait(timeout)
+
+    def untrack(self, job_id: str):
+        """Stop tracking the given job, for example after giving up on waiting for it."""
+        with self._lock:
+            self._waiters.pop(job_id, None)
+
+    def tracked_job_ids(self) -> list[str]:
+        """Get the ids of jobs currently being tracked."""
+        with self._lock:
+            return list(self._waiters.keys())
+
+    def query_queued_jobs(self, job_ids: list[str]) -> set[str] | None:
+        """Query squeue once for the given jobs and return the ids of those still in the queue.
+
+        Array tasks like ``123_4`` and ``123_[5-9]`` count as their array job ``123``.
+        Returns None if squeue failed, so the query should be retried later.
+        """
+        squeue_args = [self.squeue_path, "--noheader", "--format=%i", f"--jobs={','.join(job_ids)}"]
+        try:
+            completed = subprocess.run(squeue_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        except Exception as e:
+            logging.warning(f"Unable to query Slurm job queue: {type(e).__name__}: {e.args}")
+            return None
+
+        if completed.returncode != 0:
+            if "Invalid job id" in completed.stderr:
+                # squeue errors like this once jobs are no longer known to the controller.
+                return set()
+            logging.warning(f"Unable to query Slurm job queue, exit code {completed.returncode}: {completed.stderr.strip()}")
+            return None
+
+        return {line.strip().split("_")[0] for line in completed.stdout.splitlines() if line.strip()}
+
+    def _poll_jobs(self):
+        while True:
+            with self._lock:
+                interval = self._current_interval
+            time.sleep(interval)
+
+            with self._lock:
+                if not self._waiters:
+                    self._thread = None
+                    return
+                job_ids = list(self._waiters.keys())
+
+            queued_job_ids = self.query_queued_jobs(job_ids)
+
+            with self._lock:
+                finished_job_ids = [] if queued_job_ids is None else [
+                    job_id for job_id in job_ids if job_id not in queued_job_ids
+                ]
+                for job_id in finished_job_ids:
+                    self._waiters.pop(job_id).set()
+
+                if finished_job_ids:
+                    self._current_interval = self.poll_interval
+                else:
+                    self._current_interval = min(self._current_interval * self.backoff, self.max_poll_interval)
+
+
 class SlurmRunner:
-    """Execute pipeline steps via srun with Pyxis/Enroot container support."""
+    """Execute pipeline steps via srun with Pyxis/Enroot container support.
+
+    Step logs are written as raw, buffered bytes.  The ``log_echo`` policy and ``log_echo_limit``
+    choose which log lines are also echoed to the Proceed log (see :class:`StepLogWriter`).
+
+    With ``log_streams="separate"``, srun stdout and stderr are read from separate pipes into separate files
+    next to the step log, recorded as :attr:`StepResult.stdout_file` and :attr:`StepResult.stderr_file`.
+    With ``log_timestamps``, each line is prefixed with the UTC time when Proceed received it.
+
+    With an ``image_cache_dir``, each image is imported once with ``enroot import`` into a shared squashfs
+    cache, keyed by image reference.  Steps pass the cached squashfs file to Pyxis, and record the
+    squashfs file's content hash as :attr:`StepResult.image_id` -- a local id, like Docker's image id.
+    When ``skopeo`` is available, Proceed also resolves each reference's registry digest, like ``alpine@sha256:...``,
+    and records it as :attr:`ImagePull.digest`, comparable to Docker ``RepoDigests``.
+    Then a mutable tag like ``:latest`` is imported again when its registry digest changes,
+    and references with the same registry digest share one squashfs file.
+    Without ``skopeo``, cached references are reused as-is, unless ``image_refresh`` is set to import
+    each image again, once per runner.
+
+    With ``remote_file_matching``, step files are matched and hashed by a small helper command
+    (``python -m proceed.file_matching``) run via ``srun``, so that audit I/O happens on a compute node
+    where the data are local, rather than on the login node over a network file system.
+    The ``remote_python`` should be a Python with Proceed installed, as seen from the compute nodes.
+    With ``allocate``, the helper runs as a job step within the pipeline allocation, without waiting in the queue.
+    Otherwise, :meth:`begin_step` gets an allocation for each step, sized for the step, and the helper and the step
+    itself run as job steps within it, so that each step waits in the queue once, not once per helper command.
+    :meth:`end_step` releases the step's allocation.
+
+    With ``accounting``, Proceed queries ``sacct`` after each step's job and records
+    :attr:`StepResult.job_id` and :class:`SlurmAccounting`, like max RSS, CPU time, node list, and queue wait.
+    Steps run with ``srun`` get a unique job name so that ``sacct`` can find them.
+    Since accounting records can lag behind job completion, the query is retried ``accounting_retries`` times,
+    ``accounting_delay`` seconds apart.
+
+    With ``allocate``, :meth:`begin_pipeline` uses ``salloc --no-shell`` to get one allocation for the
+    whole pipeline, sized by :func:`pipeline_allocation_options` and any given ``allocation`` options.
+    Then each step runs as a job step within the allocation, via ``srun --jobid``, without waiting in the queue again.
+    :meth:`end_pipeline` releases the allocation with ``scancel``.
+    Steps within an allocation record the allocation's job id, but not per-step :class:`SlurmAccounting`.
+    If the allocation fails, steps run with their own ``srun`` as usual.
+
+    Steps with a :attr:`Step.array` are submitted as one ``sbatch --array`` job, which runs the same
+    ``srun`` and Pyxis container flags for each task.  Proceed waits for the job to leave the
+    ``squeue`` queue, then gathers per-task states and exit codes from ``sacct``, retrying while accounting lags.
+    If any task in the array still has no accounting record, the step fails rather than reporting success.
+
+    Resource requests in :attr:`Step.slurm` are passed to ``srun``, or to ``sbatch`` for steps submitted as
+    batch jobs, where the inner ``srun`` runs within the job's allocation.
+
+    Waiting uses a shared :class:`SlurmJobTracker`, so many concurrent jobs cost one ``squeue`` query
+    per ``poll_interval``, backing off to ``max_poll_interval`` while nothing changes.
+
+    For detached pipelines, :meth:`submit_step` submits each step as an ``sbatch`` job that depends on
+    the previous step's job, and :meth:`submit_finalizer` submits a job to run after all of them.
+    Afterwards :meth:`job_details` gathers each step's exit code and timing from ``sacct``.
+    """
 
     def __init__(
         self,
-        srun_path: str = "srun"
+        srun_path: str = "srun",
+        enroot_path: str = "enroot",
+        image_cache_dir: str = None,
+        skopeo_path: str = "skopeo",
+        image_refresh: bool = False,
+        log_echo: str = "all",
+        log_echo_limit: int = None,
+        log_streams: str = "combined",
+        log_timestamps: bool = False,
+        sbatch_path: str = "sbatch",
+        squeue_path: str = "squeue",
+        sacct_path: str = "sacct",
+        poll_interval: float = 10.0,
+        max_poll_interval: float = 60.0,
+        remote_file_matching: bool = False,
+        remote_python: str = sys.executable,
+        accounting: bool = True,
+        accounting_retries: int = 3,
+        accounting_delay: float = 2.0,
+        allocate: bool = False,
+        allocation: dict[str, str | int | bool] = {},
+        salloc_path: str = "salloc",
+        scancel_path: str = "scancel"
     ):
+        if log_streams not in {"combined", "separate"}:
+            raise ValueError(f"Unknown log_streams {log_streams!r}, expected 'combined' or 'separate'")
+
         self.srun_path = srun_path
+        self.enroot_path = enroot_path
+        self.image_cache_dir = image_cache_dir
+        self.skopeo_path = skopeo_path
+        self.image_refresh = image_refresh
+        self._refreshed_images = set()
+        self.log_echo = log_echo
+        self.log_echo_limit = log_echo_limit
+        self.log_streams = log_streams
+        self.log_timestamps = log_timestamps
+        self.sbatch_path = sbatch_path
+        self.squeue_path = squeue_path
+        self.sacct_path = sacct_path
+        self.poll_interval = poll_interval
+        self.job_tracker = SlurmJobTracker(squeue_path, poll_interval, max_poll_interval)
+        self.remote_file_matching = remote_file_matching
+        self.remote_python = remote_python
+        self.accounting = accounting
+        self.accounting_retries = accounting_retries
+        self.accounting_delay = accounting_delay
+        self.allocate = allocate
+        self.allocation = allocation
+        self.salloc_path = salloc_path
+        self.scancel_path = scancel_path
+        self.allocation_id = None
+        self._step_allocations = {}
+        self._step_allocations_lock = threading.Lock()
+
+    def _image_cache_path(self) -> Path | None:
+        """The absolute path to the image cache dir, if using one."""
+        if not self.image_cache_dir:
+            return None
+        return Path(self.image_cache_dir).expanduser().absolute()
+
+    def _cached_image(self, image: str) -> tuple[Path, dict[str, str]] | None:
+        """Look up the cached squashfs file and cache entry for the given image reference, if any.
+
+        The cache dir has one squashfs file per distinct content hash, like ``sha256-1234abcd.sqsh``.
+        Each image reference that was imported has a small file like ``alpine+latest.json`` with its cache entry:
+        the ``image_id``, which is the squashfs content hash, and the ``registry_digest``, if known.
+        """
+        cache_path = self._image_cache_path()
+        if cache_path is None:
+            return None
+
+        entry_path = Path(cache_path, f"{_image_ref_name(image)}.json")
+        if not entry_path.exists():
+            return None
+
+        entry = json.loads(entry_path.read_text())
+        squashfs_path = Path(cache_path, _squashfs_name(entry["image_id"]))
+        if not squashfs_path.exists():
+            return None
+
+        return (squashfs_path, entry)
+
+    def _cached_registry_digest(self, registry_digest: str) -> tuple[Path, dict[str, str]] | None:
+        """Look for a squashfs file already imported for any image reference with the given registry digest."""
+        for entry_path in self._image_cache_path().glob("*.json"):
+            entry = json.loads(entry_path.read_text())
+            squashfs_path = Path(entry_path.parent, _squashfs_name(entry["image_id"]))
+            if entry.get("registry_digest") == registry_digest and squashfs_path.exists():
+                return (squashfs_path, entry)
+        return None
+
+    def _write_cache_entry(self, image: str, image_id: str, registry_digest: str | None):
+        """Record the squashfs content hash and registry digest for the given image reference, atomically."""
+        entry_path = Path(self._image_cache_path(), f"{_image_ref_name(image)}.json")
+        partial_entry_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.partial")
+        partial_entry_path.write_text(json.dumps({"image_id": image_id, "registry_digest": registry_digest}))
+        partial_entry_path.rename(entry_path)
+
+    def registry_digest(self, image: str) -> str | None:
+        """Resolve the given image reference to its current registry digest, like ``alpine@sha256:...``.
+
+        References already pinned by digest are returned as-is.  Others are looked up with ``skopeo inspect``.
+        Returns None if the digest can't be resolved, for example when skopeo isn't installed.
+        """
+        if "@" in image:
+            return image
+
+        args = [self.skopeo_path, "inspect", "--format", "{{.Digest}}", f"docker://{image}"]
+        try:
+            completed = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        except Exception as e:
+            logging.info(f"Image '{image}': unable to resolve registry digest: {type(e).__name__}: {e.args}")
+            return None
+
+        digest = completed.stdout.strip()
+        if completed.returncode != 0 or not digest:
+            logging.warning(f"Image '{image}': unable to resolve registry digest: {completed.stderr.strip()}")
+            return None
+
+        return f"{_image_repository(image)}@{digest}"
+
+    def _is_cache_current(self, image: str, entry: dict[str, str], registry_digest: str | None) -> bool:
+        """Can the given cache entry be used as-is, or should the image be imported again?"""
+        if self.image_refresh and image not in self._refreshed_images:
+            return False
+        return registry_digest is None or entry.get("registry_digest") == registry_digest
+
+    @contextmanager
+    def _image_lock(self, image: str) -> Iterator[None]:
+        """Hold an exclusive lock on the given image reference in the cache dir, across threads and processes."""
+        lock_path = Path(self._image_cache_path(), f"{_image_ref_name(image)}.lock")
+        with open(lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def prefetch_image(self, image: str) -> ImagePull | None:
+        """Import the given image once, as an Enroot squashfs file in the image cache dir, if configured.
+
+        Steps then pass the squashfs file to Pyxis instead of importing the image again on each compute node.
+        Imports are locked per image reference, so concurrent steps and Proceed processes import each image once.
+        The image is identified by the content hash of its squashfs file, and by its registry digest, if known.
+        """
+        cache_path = self._image_cache_path()
+        if cache_path is None:
+            return None
+
+        registry_digest = self.registry_digest(image)
+        cached = self._cached_image(image)
+        if cached is not None and self._is_cache_current(image, cached[1], registry_digest):
+            (squashfs_path, entry) = cached
+            logging.info(f"Image '{image}': found cached squashfs file {squashfs_path}")
+            return ImagePull(image=image, image_id=entry["image_id"], digest=entry["registry_digest"], pulled=False)
+
+        cache_path.mkdir(parents=True, exist_ok=True)
+        with self._image_lock(image):
+            # Another step or process may have imported the image while we waited for the lock.
+            cached = self._cached_image(image)
+            if cached is not None and self._is_cache_current(image, cached[1], registry_digest):
+                (squashfs_path, entry) = cached
+                logging.info(f"Image '{image}': found squashfs file {squashfs_path} imported meanwhile")
+                return ImagePull(image=image, image_id=entry["image_id"], digest=entry["registry_digest"], pulled=False)
+
+            # Another image reference may already have brought in the same registry content.
+            shared = self._cached_registry_digest(registry_digest) if registry_digest else None
+            if shared is not None:
+                (squashfs_path, entry) = shared
+                self._write_cache_entry(image, entry["image_id"], registry_digest)
+                self._refreshed_images.add(image)
+                logging.info(f"Image '{image}': sharing squashfs file {squashfs_path} with the same registry digest")
+                return ImagePull(image=image, image_id=entry["image_id"], digest=registry_digest, pulled=False)
+
+            partial_path = Path(cache_path, f"{_image_ref_name(image)}.{os.getpid()}.partial")
+            args = [self.enroot_path, "import", "--output", partial_path.as_posix(), _enroot_uri(image)]
+            logging.info(f"Image '{image}': running enroot command: {args}")
+            try:
+                completed = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace")
+            except Exception as e:
+                return ImagePull(image=image, error=f"{type(e).__name__}: {e.args}")
+
+            if completed.returncode != 0:
+                partial_path.unlink(missing_ok=True)
+                return ImagePull(image=image, error=f"enroot import exit code {completed.returncode}: {completed.stdout.strip()}")
+
+            image_id = hash_contents(partial_path)
+            squashfs_path = Path(cache_path, _squashfs_name(image_id))
+            if squashfs_path.exists():
+                # Another image reference already brought in the same content.
+                partial_path.unlink()
+            else:
+                partial_path.rename(squashfs_path)
+
+            self._write_cache_entry(image, image_id, registry_digest)
+            self._refreshed_images.add(image)
+
+        logging.info(f"Image '{image}': imported squashfs file {squashfs_path}")
+        return ImagePull(image=image, image_id=image_id, digest=registry_digest, pulled=True)
+
+    def _resolve_image(self, image: str) -> str:
+        """Import the given image into the image cache dir on demand, if configured and not already cached.
+
+        Returns an image_id to record: the squashfs content hash if cached, otherwise the image reference as given.
+        """
+        if self._image_cache_path() is None:
+            return image
+
+        cached = self._cached_image(image)
+        if cached is None or (self.image_refresh and image not in self._refreshed_images):
+            image_pull = self.prefetch_image(image)
+            if image_pull.error:
+                logging.warning(f"Image '{image}': letting Pyxis import the image after error: {image_pull.error}")
+                return image
+            return image_pull.image_id
+
+        return cached[1]["image_id"]
 
     def run_container(
         self,
@@ -38,33 +685,478 @@ class SlurmRunner:
     ) -> tuple[str | None, int, str | None]:
         """Run one step via srun with Pyxis/Enroot.
 
-        Returns (image_id, exit_code, error_message). On success error_message is None.
-        The image_id is set to the step's image string to record what was requested.
+        Returns (image_id, exit_code, error_message, step_details). On success error_message is None.
+        With an image cache dir, the image_id is the content hash of the cached squashfs file that ran.
+        Otherwise, Pyxis imports the image itself, and the image_id is the step's image string, as requested.
         """
         self._warn_unsupported_fields(step)
 
         # Don't try to mount ~/.Xauthority on Slurm, instead use pyxis "--container-mount-home" below.
         apply_step_X11(step, mount_and_set_xauthority=False)
 
-        args = self._build_srun_args(step)
+        image_id = self._resolve_image(step.image)
+
+        if step.array:
+            return self._run_array(step, log_path, image_id)
+
+        # A unique job name lets sacct find the job afterwards.
+        job_name = f"{step.name}.{uuid.uuid4().hex[:8]}"
+        allocation_id = self._allocation_for(step)
+        args = self._build_srun_args(step, job_name=job_name, allocation_id=allocation_id)
         logging.info(f"Step '{step.name}': running srun command: {args}")
 
+        start_time = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
         try:
-            process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace")
-            with open(log_path, 'w') as f:
-                for log_entry in process.stdout:
-                    f.write(log_entry)
-                    logging.info(f"Step '{step.name}': {log_entry.strip()}\r")
+            log_writer_kwargs = {"echo": self.log_echo, "limit": self.log_echo_limit, "timestamps": self.log_timestamps}
+            if self.log_streams == "combined":
+                process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                step_details = copy_process_stream(process.stdout, log_path, step.name, **log_writer_kwargs)
+            else:
+                process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                step_details = copy_process_streams(process, log_path, step.name, **log_writer_kwargs)
 
             return_code = process.wait()
             logging.info(f"Step '{step.name}': completed with exit code {return_code}.")
-            return (step.image, return_code, None)
 
+            if allocation_id is not None:
+                step_details["job_id"] = allocation_id
+            elif self.accounting:
+                slurm_accounting = self.slurm_accounting([f"--name={job_name}", f"--starttime={start_time}"])
+                if slurm_accounting is not None:
+                    step_details["job_id"] = slurm_accounting.job_id
+                    step_details["slurm_accounting"] = slurm_accounting
+
+            return (image_id, return_code, None, step_details)
+
+        except Exception as e:
+            error_message = f"{type(e).__name__}: {e.args}\n"
+            logging.error(f"Step '{step.name}': {error_message}", exc_info=True)
+            return (None, -1, error_message)
+
+    def begin_pipeline(self, steps: list[Step]):
+        """Get one Slurm allocation for the given pipeline steps, if configured to ``allocate``."""
+        if not self.allocate:
+            return
+
+        try:
+            allocation_options = {**pipeline_allocation_options(steps), **self.allocation}
+            self.allocation_id = self._allocate(allocation_options)
+            logging.info(f"Using job allocation {self.allocation_id} for pipeline steps.")
+        except Exception as e:
+            logging.error(f"Unable to get a job allocation, running steps separately: {type(e).__name__}: {e.args}")
+
+    def end_pipeline(self):
+        """Release the Slurm allocation from :meth:`begin_pipeline`, if any."""
+        if self.allocation_id is None:
+            return
+
+        self._release_allocation(self.allocation_id)
+        self.allocation_id = None
+
+    def begin_step(self, step: Step):
+        """Get a Slurm allocation for one step, when it will use ``remote_file_matching`` outside a pipeline allocation.
+
+        This way file matching for the step, before and after it runs, and the step itself run as job steps
+        within one allocation, and only wait in the queue once.
+        """
+        if not self.remote_file_matching or self.allocation_id is not None or step.array:
+            return
+
+        try:
+            allocation_options = {**pipeline_allocation_options([step]), **self.allocation}
+            allocation_id = self._allocate(allocation_options, job_name=step.name)
+            logging.info(f"Step '{step.name}': using job allocation {allocation_id}.")
+            with self._step_allocations_lock:
+                self._step_allocations[step.name] = allocation_id
+        except Exception as e:
+            logging.error(f"Step '{step.name}': unable to get a job allocation, running jobs separately: {type(e).__name__}: {e.args}")
+
+    def end_step(self, step: Step):
+        """Release the Slurm allocation from :meth:`begin_step`, if any."""
+        with self._step_allocations_lock:
+            allocation_id = self._step_allocations.pop(step.name, None)
+        if allocation_id is not None:
+            self._release_allocation(allocation_id)
+
+    def _allocation_for(self, step: Step = None) -> str | None:
+        """The job id of the pipeline allocation, or the given step's own allocation, if any."""
+        if self.allocation_id is not None or step is None:
+            return self.allocation_id
+        with self._step_allocations_lock:
+            return self._step_allocations.get(step.name)
+
+    def _allocate(self, allocation_options: dict[str, str | int | bool], job_name: str = "proceed") -> str:
+        """Get a Slurm allocation with salloc and return its job id."""
+        args = [self.salloc_path, "--no-shell", f"--job-name={job_name}", *_slurm_option_args(allocation_options)]
+        logging.info(f"Running salloc command: {args}")
+        completed = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+        # salloc reports like "salloc: Granted job allocation 123".
+        match = re.search(r"Granted job allocation (\d+)", completed.stderr + completed.stdout)
+        if not match:
+            raise ValueError(f"No job allocation found in salloc output: {completed.stderr.strip()}")
+        return match.group(1)
+
+    def _release_allocation(self, allocation_id: str):
+        """Release a Slurm allocation with scancel."""
+        args = [self.scancel_path, allocation_id]
+        logging.info(f"Running scancel command to release job allocation: {args}")
+        try:
+            subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, check=True)
+        except Exception as e:
+            logging.warning(f"Unable to release job allocation {allocation_id}: {type(e).__name__}: {e.args}")
+
+    def match_patterns_in_dirs(
+        self,
+        dirs: list[str],
+        glob_patterns: list[str],
+        step: Step = None
+    ) -> dict[str, dict[str, str]]:
+        """Match and hash files like :func:`proceed.file_matching.match_patterns_in_dirs`, via srun if configured.
+
+        Within a pipeline allocation (see :meth:`begin_pipeline`) or the step's own allocation (see :meth:`begin_step`),
+        the helper command runs as a job step in the allocation, so it doesn't wait in the queue.
+        Otherwise, it runs as a small job with the given step's options that choose where jobs run,
+        like ``partition`` and ``account``.
+
+        If the remote helper command fails, this falls back to matching and hashing files locally.
+        """
+        dirs = list(dirs)
+        if not self.remote_file_matching or not dirs or not glob_patterns:
+            return match_patterns_in_dirs(dirs, glob_patterns)
+
+        args = [
+            self.srun_path,
+            "--ntasks=1",
+            "--job-name=proceed file matching"
+        ]
+        allocation_id = self._allocation_for(step)
+        if allocation_id is not None:
+            args.append(f"--jobid={allocation_id}")
+        elif step is not None:
+            placement_options = {
+                key: value for key, value in step.slurm.items() if key.replace("-", "_") in allocation_only_options
+            }
+            args.extend(_slurm_option_args(placement_options))
+        args.extend([
+            "--",
+            self.remote_python,
+            "-m",
+            "proceed.file_matching",
+            "--dirs",
+            *dirs,
+            "--patterns",
+            *glob_patterns
+        ])
+        logging.info(f"Running srun command for file matching: {args}")
+        try:
+            completed = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+            return json.loads(completed.stdout)
+        except Exception as e:
+            logging.warning(f"Remote file matching failed, matching files locally instead: {type(e).__name__}: {e.args}")
+            return match_patterns_in_dirs(dirs, glob_patterns)
+
+    def _run_array(
+        self,
+        step: Step,
+        log_path: Path,
+        image_id: str,
+    ) -> tuple[str | None, int, str | None]:
+        """Submit the step as one sbatch --array job, wait for it, and gather per-task results."""
+        task_log_pattern = self._task_log_pattern(log_path)
+        sbatch_args = self._build_sbatch_args(step, log_path)
+        logging.info(f"Step '{step.name}': running sbatch command: {sbatch_args}")
+
+        try:
+            task_ids = parse_slurm_array(step.array)
+            job_id = self._submit(sbatch_args)
+            with open_log(log_path, "wt") as f:
+                f.write(f"Submitted array job {job_id} with tasks {step.array}\n")
+            logging.info(f"Step '{step.name}': submitted array job {job_id}.")
+
+            self._wait_for_job(job_id)
+            array_tasks = self._array_task_results(job_id, task_log_pattern, task_ids)
         except Exception as e:
             error_message = f"{type(e).__name__}: {e.args}\n"
             logging.error(f"Step '{step.name}': {error_message}", exc_info=True)
             return (None, -1, error_message)
 
+        failed_tasks = [task for task in array_tasks if task.exit_code]
+        missing_task_ids = sorted(set(task_ids) - {int(task.task_id) for task in array_tasks})
+        if failed_tasks:
+            exit_code = failed_tasks[0].exit_code
+        elif missing_task_ids:
+            # Without results for every task, we can't say the step succeeded.
+            exit_code = -1
+        else:
+            exit_code = 0
+
+        with open_log(log_path, "at") as f:
+            for task in array_tasks:
+                f.write(f"Task {task.task_id}: {task.state} with exit code {task.exit_code}\n")
+            if missing_task_ids:
+                f.write(f"No Slurm accounting found for tasks: {missing_task_ids}\n")
+        logging.info(f"Step '{step.name}': {len(array_tasks)} tasks completed, {len(failed_tasks)} with errors.")
+        if missing_task_ids:
+            logging.error(f"Step '{step.name}': no Slurm accounting found for {len(missing_task_ids)} tasks: {missing_task_ids}")
+        return (image_id, exit_code, None, {"array_tasks": array_tasks})
+
+    def submit_step(
+        self,
+        step: Step,
+        log_path: Path,
+        dependency: str = None
+    ) -> tuple[str, dict[str, Any]]:
+        """Submit one step as an sbatch job and return right away, without waiting for the job to run.
+
+        If a dependency job id is given, the step's job only starts after that job completes successfully.
+        Otherwise Slurm cancels the step's job, and so on down the chain.
+
+        Returns (job_id, step_details) where step_details are additional :class:`StepResult` attributes,
+        like ``image_id``, ``stdout_file``, and ``stderr_file``.
+        """
+        self._warn_unsupported_fields(step)
+        apply_step_X11(step, mount_and_set_xauthority=False)
+
+        step_details = {"image_id": self._resolve_image(step.image)}
+        sbatch_args = self._build_sbatch_args(step, log_path, dependency)
+        if self.log_streams == "separate" and not step.array:
+            # The step log itself will only receive messages from Proceed, like errors.
+            with open_log(log_path, "wb"):
+                pass
+            step_details["stdout_file"] = stream_log_path(log_path, "stdout").absolute().as_posix()
+            step_details["stderr_file"] = stream_log_path(log_path, "stderr").absolute().as_posix()
+
+        logging.info(f"Step '{step.name}': running sbatch command: {sbatch_args}")
+        job_id = self._submit(sbatch_args)
+        logging.info(f"Step '{step.name}': submitted job {job_id}.")
+        return (job_id, step_details)
+
+    def submit_finalizer(
+        self,
+        command: list[str],
+        log_path: Path,
+        dependencies: list[str] = []
+    ) -> str:
+        """Submit a job to run the given command after all the given jobs have ended, successfully or not."""
+        sbatch_args = [
+            self.sbatch_path,
+            "--parsable",
+            "--job-name=proceed finalize",
+            f"--output={Path(log_path).absolute().as_posix()}"
+        ]
+        if dependencies:
+            sbatch_args.append(f"--dependency=afterany:{':'.join(dependencies)}")
+        sbatch_args.extend(["--wrap", shlex.join(command)])
+        logging.info(f"Running sbatch command for finalizer: {sbatch_args}")
+        job_id = self._submit(sbatch_args)
+        logging.info(f"Submitted finalizer job {job_id}.")
+        return job_id
+
+    def job_details(
+        self,
+        job_id: str,
+        log_path: Path,
+        array: str = None
+    ) -> dict[str, Any] | None:
+        """Query sacct for the exit code and timing of a step job submitted with :meth:`submit_step`.
+
+        For array steps, the array is the step's :attr:`Step.array` spec, which says which tasks to expect.
+
+        Returns a dict of :class:`StepResult` attributes, or None if the job never started,
+        for example because Slurm cancelled it after an earlier step failed.
+
+        Since accounting records can lag behind job completion, the query is retried like :meth:`slurm_accounting`,
+        until sacct has ended or cancelled records for the job (and each expected array task).
+        If sacct still has no usable record of the job, this returns an exit code of -1 and no timing,
+        rather than None, so that the step isn't mistaken for one that never started.
+        Likewise if sacct itself keeps failing, in which case the error is also appended to the step log.
+        """
+        field_names = ["JobID", "State", "ExitCode", "Start", "End", "Reason"]
+        task_ids = parse_slurm_array(array) if array else []
+        # Array jobs have rows for tasks like "123_4", and for tasks that never ran, like "123_[5-9]".
+        job_pattern = re.compile(rf"^{re.escape(job_id)}(_\d+|_\[.*\])?$")
+        rows = []
+        job_rows = []
+        sacct_error = None
+        for attempt in range(1, self.accounting_retries + 1):
+            try:
+                rows = self._sacct_rows(field_names, [f"--jobs={job_id}"])
+                sacct_error = None
+            except (subprocess.SubprocessError, OSError) as e:
+                sacct_error = f"{type(e).__name__}: {e}"
+                if isinstance(e, subprocess.CalledProcessError) and e.stderr:
+                    sacct_error += f" {e.stderr.strip()}"
+                logging.warning(f"Job {job_id}: unable to query Slurm accounting (attempt {attempt}): {sacct_error}")
+            else:
+                job_rows = [row for row in rows if job_pattern.match(row["JobID"])]
+                if job_rows and all(_sacct_row_ended(row) for row in job_rows):
+                    if _sacct_rows_never_started(job_rows):
+                        return None
+                    array_tasks = self._array_tasks_from_rows(job_id, rows, self._task_log_pattern(log_path))
+                    found_task_ids = {int(task.task_id) for task in array_tasks}
+                    if found_task_ids.issuperset(task_ids):
+                        break
+
+            if attempt < self.accounting_retries:
+                time.sleep(self.accounting_delay)
+
+        if sacct_error is not None:
+            logging.error(f"Job {job_id}: unable to query Slurm accounting, recording an error instead.")
+            with open(log_path, "a") as f:
+                f.write(f"Unable to query Slurm accounting for job {job_id}: {sacct_error}\n")
+            return {"exit_code": -1}
+
+        starts = [parse_sacct_time(row["Start"]) for row in job_rows]
+        ends = [parse_sacct_time(row["End"]) for row in job_rows]
+        started = [start for start in starts if start is not None]
+        if not started:
+            logging.error(f"Job {job_id}: no usable Slurm accounting found, recording an error instead.")
+            return {"exit_code": -1}
+
+        start = min(started)
+        ended = [end for end in ends if end is not None]
+        finish = max(ended) if ended else None
+        timing = Timing(
+            start.isoformat(sep="T"),
+            finish.isoformat(sep="T") if finish else None,
+            (finish - start).total_seconds() if finish else None
+        )
+
+        if array:
+            array_tasks = self._array_tasks_from_rows(job_id, rows, self._task_log_pattern(log_path))
+            failed_tasks = [task for task in array_tasks if task.exit_code]
+            missing_task_ids = sorted(set(task_ids) - {int(task.task_id) for task in array_tasks})
+            if failed_tasks:
+                exit_code = failed_tasks[0].exit_code
+            elif missing_task_ids:
+                logging.error(f"Job {job_id}: no Slurm accounting found for {len(missing_task_ids)} tasks: {missing_task_ids}")
+                exit_code = -1
+            else:
+                exit_code = 0
+            return {"exit_code": exit_code, "timing": timing, "array_tasks": array_tasks}
+
+        state = job_rows[0]["State"].split(" ")[0]
+        exit_code = parse_exit_code(job_rows[0]["ExitCode"])
+        if exit_code == 0 and state != "COMPLETED":
+            # For example a TIMEOUT or CANCELLED job that was killed without a signal exit code.
+            exit_code = -1
+        details = {"exit_code": exit_code, "timing": timing}
+        if self.accounting:
+            details["slurm_accounting"] = self.slurm_accounting([f"--jobs={job_id}"])
+        return details
+
+    def slurm_accounting(self, selection_args: list[str]) -> SlurmAccounting | None:
+        """Query sacct for accounting data about one job, selected with args like --jobs=123 or --name=foo.
+
+        Returns None if sacct is unavailable or has no record of the job, even after retries.
+        """
+        field_names = [
+            "JobID", "State", "Submit", "Start", "Elapsed", "TotalCPU", "MaxRSS", "NodeList", "AllocCPUS", "ReqMem"
+        ]
+        for attempt in range(1, self.accounting_retries + 1):
+            try:
+                rows = self._sacct_rows(field_names, selection_args)
+                slurm_accounting = self._accounting_from_rows(rows)
+            except Exception as e:
+                logging.warning(f"Unable to query Slurm accounting: {type(e).__name__}: {e.args}")
+                return None
+
+            if slurm_accounting is not None:
+                return slurm_accounting
+
+            if attempt < self.accounting_retries:
+                time.sleep(self.accounting_delay)
+
+        logging.warning(f"No Slurm accounting found for {selection_args}.")
+        return None
+
+    def _accounting_from_rows(self, rows: list[dict[str, str]]) -> SlurmAccounting | None:
+        """Combine sacct rows for one job and its job steps into a SlurmAccounting."""
+        job_rows = [row for row in rows if "." not in row["JobID"]]
+        if not job_rows:
+            return None
+
+        job_row = job_rows[-1]
+        job_id = job_row["JobID"]
+        step_rows = [row for row in rows if row["JobID"].startswith(f"{job_id}.")]
+        max_rss_values = [parse_slurm_memory(row["MaxRSS"]) for row in step_rows if row["MaxRSS"]]
+        submit = parse_sacct_time(job_row["Submit"])
+        start = parse_sacct_time(job_row["Start"])
+        return SlurmAccounting(
+            job_id=job_id,
+            step_ids=[row["JobID"] for row in step_rows],
+            state=job_row["State"].split(" ")[0],
+            node_list=job_row["NodeList"] or None,
+            alloc_cpus=int(job_row["AllocCPUS"]) if job_row["AllocCPUS"] else None,
+            req_mem=job_row["ReqMem"] or None,
+            elapsed=parse_slurm_duration(job_row["Elapsed"]),
+            total_cpu=parse_slurm_duration(job_row["TotalCPU"]),
+            max_rss=max(max_rss_values) if max_rss_values else None,
+            queue_wait=(start - submit).total_seconds() if submit and start else None
+        )
+
+    def _submit(self, sbatch_args: list[str]) -> str:
+        """Run sbatch --parsable and return the submitted job id."""
+        completed = subprocess.run(sbatch_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+        # Parsable output is "job_id" or "job_id;cluster_name".
+        return completed.stdout.strip().split(";")[0]
+
+    def _wait_for_job(self, job_id: str):
+        """Wait until the given job (including all array tasks) has left the queue."""
+        self.job_tracker.wait_for_job(job_id)
+
+    def _sacct_rows(self, field_names: list[str], selection_args: list[str]) -> list[dict[str, str]]:
+        """Query sacct for the given fields of the selected jobs, including array tasks and job steps."""
+        sacct_args = [
+            self.sacct_path,
+            "--parsable2",
+            "--noheader",
+            *selection_args,
+            f"--format={','.join(field_names)}"
+        ]
+        completed = subprocess.run(sacct_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+        return [dict(zip(field_names, line.split("|"))) for line in completed.stdout.splitlines()]
+
+    def _array_task_results(self, job_id: str, task_log_pattern: Path, task_ids: list[int]) -> list[ArrayTaskResult]:
+        """Query sacct for the state and exit code of each task in the given array job.
+
+        Since accounting records can lag behind job completion, the query is retried like :meth:`slurm_accounting`,
+        until there are results for all the given task_ids.  Returns the results found, which may be incomplete.
+        """
+        for attempt in range(1, self.accounting_retries + 1):
+            rows = self._sacct_rows(["JobID", "State", "ExitCode"], [f"--jobs={job_id}"])
+            array_tasks = self._array_tasks_from_rows(job_id, rows, task_log_pattern)
+            if {int(task.task_id) for task in array_tasks}.issuperset(task_ids):
+                return array_tasks
+
+            if attempt < self.accounting_retries:
+                time.sleep(self.accounting_delay)
+
+        return array_tasks
+
+    def _array_tasks_from_rows(
+        self,
+        job_id: str,
+        rows: list[dict[str, str]],
+        task_log_pattern: Path
+    ) -> list[ArrayTaskResult]:
+        """Convert sacct rows to one ArrayTaskResult per task in the given array job."""
+        task_pattern = re.compile(rf"^{re.escape(job_id)}_(\d+)$")
+        array_tasks = []
+        for row in rows:
+            match = task_pattern.match(row["JobID"])
+            if not match:
+                # Skip job steps like "123_4.batch" and pending ranges like "123_[5-9]".
+                continue
+            task_id = match.group(1)
+            array_tasks.append(ArrayTaskResult(
+                task_id=task_id,
+                exit_code=parse_exit_code(row["ExitCode"]),
+                state=row["State"].split(" ")[0],
+                log_file=task_log_pattern.as_posix().replace("%a", task_id)
+            ))
+        return sorted(array_tasks, key=lambda task: int(task.task_id))
+
     def _warn_unsupported_fields(self, step: Step) -> None:
         """Warn about Step fields that are not used with Slurm/Pyxis equivalent."""
         unsupported_fields = {
@@ -78,13 +1170,67 @@ class SlurmRunner:
             if value:
                 logging.warning(f"Step '{step.name}': '{field_name}' is ignored by Slurm runner.")
 
-    def _build_srun_args(self, step: Step) -> list[str]:
-        """Build the srun argument list for the given step."""
+    def _task_log_pattern(self, log_path: Path) -> Path:
+        """Choose the sbatch --output pattern for array task logs, next to the given step log."""
+        log_stem = log_path.name.split(".log")[0]
+        return Path(log_path.parent, f"{log_stem}.task_%a.log").absolute()
+
+    def _build_sbatch_args(self, step: Step, log_path: Path, dependency: str = None) -> list[str]:
+        """Build the sbatch argument list to run the given step's srun command as a batch job."""
+        sbatch_args = [
+            self.sbatch_path,
+            "--parsable",
+            f"--job-name={step.name}"
+        ]
+
+        sbatch_args.extend(_slurm_option_args(step.slurm))
+
+        if dependency:
+            sbatch_args.append(f"--dependency=afterok:{dependency}")
+            sbatch_args.append("--kill-on-invalid-dep=yes")
+
+        if step.array:
+            sbatch_args.append(f"--array={step.array}")
+            sbatch_args.append(f"--output={self._task_log_pattern(log_path).as_posix()}")
+        elif self.log_streams == "separate":
+            sbatch_args.append(f"--output={stream_log_path(log_path, 'stdout').absolute().as_posix()}")
+            sbatch_args.append(f"--error={stream_log_path(log_path, 'stderr').absolute().as_posix()}")
+        else:
+            sbatch_args.append(f"--output={log_path.absolute().as_posix()}")
+
+        srun_args = self._build_srun_args(step, resource_args=False)
+        sbatch_args.extend(["--wrap", shlex.join(srun_args)])
+        return sbatch_args
+
+    def _build_srun_args(
+        self,
+        step: Step,
+        resource_args: bool = True,
+        job_name: str = None,
+        allocation_id: str = None
+    ) -> list[str]:
+        """Build the srun argument list for the given step, optionally including its resource requests.
+
+        With an allocation_id, srun runs the step as a job step within that allocation.
+        Leave this out when srun will run inside some other job, like an sbatch job for an array step.
+        """
+        cached = self._cached_image(step.image)
+        if cached is not None:
+            container_image = cached[0].as_posix()
+        else:
+            container_image = step.image
+
         args = [
             self.srun_path,
-            f"--container-image={step.image}"
+            f"--container-image={container_image}"
         ]
 
+        if job_name:
+            args.append(f"--job-name={job_name}")
+
+        if allocation_id is not None:
+            args.append(f"--jobid={allocation_id}")
+
         if step.X11:
             # Give the container access to eg ~/.Xauthority
             args.append("--container-mount-home")
@@ -104,6 +1250,12 @@ class SlurmRunner:
         if step.gpus:
             args.extend(self._gpus_args(step))
 
+        if resource_args:
+            if allocation_id is not None:
+                args.extend(_slurm_option_args(step.slurm, exclude=allocation_only_options))
+            else:
+                args.extend(_slurm_option_args(step.slurm))
+
         if step.command:
             command = [str(arg) for arg in step.command] if isinstance(step.command, list) else [step.command]
             args.append("--")
@@ -0,0 +1,284 @@
+import logging
+import gzip
+import hashlib
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any
+from subprocess import Popen
+from concurrent.futures import ThreadPoolExecutor
+
+from proceed.file_matching import hash_contents
+
+log_suffixes = {
+    None: ".log",
+    "gzip": ".log.gz",
+    "zstd": ".log.zst",
+}
+
+echo_policies = {"all", "none", "sampled", "rate_limited", "tail"}
+
+default_echo_limits = {
+    "sampled": 100,
+    "rate_limited": 10,
+    "tail": 20,
+}
+
+
+def log_file_name(stem: str, compression: str = None) -> str:
+    """Choose a step log file name with a suffix that indicates how the log is compressed."""
+    if compression not in log_suffixes:
+        raise ValueError(f"Unknown log compression {compression!r}, expected one of {list(log_suffixes.keys())}")
+    return f"{stem}{log_suffixes[compression]}"
+
+
+def stream_log_path(log_path: Path, stream: str) -> Path:
+    """Choose a separate log file path for one output stream, like step.log.gz -> step.stdout.log.gz."""
+    log_path = Path(log_path)
+    name = log_path.name
+    index = name.rfind(".log")
+    if index < 0:
+        return log_path.with_name(f"{name}.{stream}")
+    return log_path.with_name(f"{name[:index]}.{stream}{name[index:]}")
+
+
+def utc_timestamp() -> str:
+    """Format the current time like Docker log timestamps, in RFC 3339 UTC format."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def open_log(path: Path, mode: str = "rb", buffer_size: int = 1024 * 1024, fileobj: IO[bytes] = None) -> IO[Any]:
+    """Open a step log file for reading or writing, compressed or not, based on its suffix.
+
+    Files ending with ``.gz`` are gzip-compressed.
+    Files ending with ``.zst`` are zstd-compressed, which requires the optional ``zstandard`` package.
+    Other files are opened as plain files with a large write buffer.
+    Appending to a compressed file adds a new compressed frame, which readers handle transparently.
+
+    With a binary fileobj, compressed data goes to the fileobj instead of opening the path directly,
+    and uncompressed files use the fileobj itself.
+    """
+    suffix = Path(path).suffix
+    if suffix == ".gz":
+        return gzip.open(fileobj or path, mode)
+    elif suffix == ".zst":
+        # Lazy import so zstandard is only required when actually used.
+        import zstandard
+        return zstandard.open(fileobj or path, mode, closefd=False if fileobj else None)
+    elif fileobj is not None:
+        return fileobj
+    elif "b" in mode:
+        return open(path, mode, buffering=buffer_size)
+    else:
+        return open(path, mode)
+
+
+def log_file_details(log_path: Path) -> dict[str, Any]:
+    """Hash an existing step log file, returning a dict with its log_digest and log_size.
+
+    This is for logs that were not written by a :class:`StepLogWriter`, or that were appended to afterwards.
+    Returns an empty dict if the log file doesn't exist.
+    """
+    log_path = Path(log_path)
+    if not log_path.is_file():
+        return {}
+    return {"log_digest": hash_contents(log_path), "log_size": log_path.stat().st_size}
+
+
+class HashingFile():
+    """Wrap a binary file opened for writing, to hash and count all the bytes written to it."""
+
+    def __init__(self, file: IO[bytes], algorithm: str = "sha256"):
+        self.file = file
+        self.hash = hashlib.new(algorithm)
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.hash.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.file.closed
+
+    @property
+    def name(self) -> str:
+        return self.file.name
+
+    def digest(self) -> str:
+        """Return the hex-encoded digest prefixed with the algorithm name, like :func:`hash_contents`."""
+        return f"{self.hash.name}:{self.hash.hexdigest()}"
+
+
+class StepLogWriter():
+    """Write step log output as raw bytes, with a buffer and a configurable policy for echoing to the Proceed log.
+
+    The step log file receives all output, as-is, without decoding.
+    Only the lines chosen by the echo policy are decoded and passed to ``logging.info()``:
+
+    all
+      echo every chunk of output (the default)
+
+    none
+      echo nothing
+
+    sampled
+      echo every Nth line, where N is the echo ``limit`` (default 100)
+
+    rate_limited
+      echo at most ``limit`` lines per second (default 10)
+
+    tail
+      echo the last ``limit`` lines (default 20) when the writer is closed
+
+    With ``timestamps``, the writer prefixes each line with the current UTC time, similar to Docker log timestamps.
+    This is for sources that don't provide their own timestamps.
+
+    When writing a new log (``mode="wb"``), the writer also hashes and counts the bytes that reach the file,
+    after any compression.  So :meth:`log_details` can report the same digest as :func:`hash_contents`
+    would for the finished file, without reading the file back.
+    """
+
+    def __init__(
+        self,
+        log_path: Path,
+        step_name: str,
+        echo: str = "all",
+        limit: int = None,
+        mode: str = "wb",
+        timestamps: bool = False
+    ):
+        if echo not in echo_policies:
+            raise ValueError(f"Unknown log echo policy {echo!r}, expected one of {sorted(echo_policies)}")
+
+        self.log_path = log_path
+        self.step_name = step_name
+        self.echo = echo
+        self.limit = limit or default_echo_limits.get(echo)
+        self.mode = mode
+        self.timestamps = timestamps
+
+        self.file = None
+        self.hashing_file = None
+        self.at_line_start = True
+        self.line_count = 0
+        self.tail_lines = deque(maxlen=self.limit if echo == "tail" else 0)
+        self.rate_window_start = 0.0
+        self.rate_window_count = 0
+
+    def __enter__(self):
+        if self.mode == "wb":
+            self.hashing_file = HashingFile(open(self.log_path, "wb", buffering=1024 * 1024))
+            self.file = open_log(self.log_path, self.mode, fileobj=self.hashing_file)
+        else:
+            self.file = open_log(self.log_path, self.mode)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        if self.hashing_file is not None:
+            # Compressed files flush their last bytes on close, but leave closing the wrapped file to us.
+            self.hashing_file.close()
+
+        if self.echo == "tail":
+            for line in self.tail_lines:
+                self._echo_line(line)
+        elif self.echo == "sampled" or self.echo == "rate_limited":
+            logging.info(f"Step '{self.step_name}': wrote {self.line_count} lines to {self.log_path}")
+
+    def log_details(self) -> dict[str, Any]:
+        """After closing, return a dict with the log_digest and log_size of the log file, if known."""
+        if self.hashing_file is None or self.file is not None:
+            return {}
+        return {"log_digest": self.hashing_file.digest(), "log_size": self.hashing_file.size}
+
+    def write(self, chunk: bytes):
+        if self.timestamps:
+            chunk = self._timestamped(chunk)
+
+        self.file.write(chunk)
+
+        if self.echo == "none":
+            return
+
+        if self.echo == "all":
+            self._echo_line(chunk)
+            return
+
+        lines = chunk.splitlines()
+        if self.echo == "tail":
+            self.tail_lines.extend(lines)
+        elif self.echo == "sampled":
+            for index, line in enumerate(lines, start=self.line_count):
+                if index % self.limit == 0:
+                    self._echo_line(line)
+        elif self.echo == "rate_limited":
+            now = time.monotonic()
+            if now - self.rate_window_start >= 1.0:
+                self.rate_window_start = now
+                self.rate_window_count = 0
+            for line in lines:
+                if self.rate_window_count < self.limit:
+                    self._echo_line(line)
+                    self.rate_window_count += 1
+        self.line_count += len(lines)
+
+    def _timestamped(self, chunk: bytes) -> bytes:
+        stamp = f"{utc_timestamp()} ".encode("utf-8")
+        stamped = bytearray()
+        for line in chunk.splitlines(keepends=True):
+            if self.at_line_start:
+                stamped += stamp
+            stamped += line
+            self.at_line_start = line.endswith(b"\n")
+        return bytes(stamped)
+
+    def _echo_line(self, line: bytes):
+        text = line.decode("utf-8", errors="replace")
+        logging.info(f"Step '{self.step_name}': {text.strip()}")
+
+
+def copy_process_stream(stream: IO[bytes], log_path: Path, step_name: str, **log_writer_kwargs) -> dict[str, Any]:
+    """Copy one process output stream to the given log file, until the stream closes.
+
+    Returns a dict with the log_digest and log_size of the log file that was written.
+    """
+    with StepLogWriter(log_path, step_name, **log_writer_kwargs) as log_writer:
+        for log_entry in iter(lambda: stream.read1(65536), b""):
+            log_writer.write(log_entry)
+    return log_writer.log_details()
+
+
+def copy_process_streams(process: Popen, log_path: Path, step_name: str, **log_writer_kwargs) -> dict[str, str]:
+    """Copy process stdout and stderr to separate log files next to the given log file, concurrently.
+
+    Returns a dict with the stdout_file and stderr_file that were written.
+    """
+
+    # The step log itself will only receive messages from Proceed, like errors.
+    with open_log(log_path, "wb"):
+        pass
+
+    stdout_path = stream_log_path(log_path, "stdout")
+    stderr_path = stream_log_path(log_path, "stderr")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        stdout_future = executor.submit(
+            copy_process_stream, process.stdout, stdout_path, step_name, **log_writer_kwargs)
+        copy_process_stream(process.stderr, stderr_path, step_name, **log_writer_kwargs)
+        stdout_future.result()
+
+    return {"stdout_file": stdout_path.as_posix(), "stderr_file": stderr_path.as_posix()}
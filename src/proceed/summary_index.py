@@ -0,0 +1,160 @@
+import json
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+from proceed.__about__ import __version__ as proceed_version
+
+# Bump this when the layout of summary rows changes, so that stale rows are not reused.
+summary_index_schema = 7
+
+
+class SummaryIndex():
+    """Persistent index of summary rows, per execution record, in a SQLite database file.
+
+    Each entry is keyed by record path, relative to the results dir, along with the record file's
+    modification time and size.  When a record file is unchanged, its summary rows can be reused
+    from the index instead of parsing the record again.
+
+    Rows are stored as JSON, so that reading the index never runs code from the index file.
+    Values like strings, numbers, and None come back with the same types, and other values,
+    like dates parsed from custom summary files, come back as strings (see :meth:`store_rows`).
+    The whole index is discarded when the Proceed version or :attr:`summary_index_schema` changes.
+
+    When the index file can't be opened or written, for example in a read-only results dir,
+    the index logs a warning and acts as empty, so that summaries fall back to parsing every record.
+
+    Each kind of summary, like wide "rows" or normalized "tables", is kept in its own table within the index.
+
+    Entries may also record the pipeline args of each record, so that records can be filtered by args
+    without loading their summary rows.
+    """
+
+    def __init__(self, index_path: Path, version: str = f"{proceed_version}/{summary_index_schema}", kind: str = "rows"):
+        if not kind.isidentifier():
+            raise ValueError(f"Summary index kind must be a simple name, not {kind!r}")
+
+        self.index_path = Path(index_path)
+        self.version = version
+        self.table = f"records_{kind}"
+        self.connection = None
+        self.entries = {}
+        self.entry_args = {}
+        self.reused_count = 0
+        self.stored_count = 0
+
+    def __enter__(self):
+        try:
+            self.connection = sqlite3.connect(self.index_path)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+            existing_version = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if existing_version is None or existing_version[0] != self.version:
+                logging.info(f"Starting new summary index {self.index_path.as_posix()} for version {self.version}")
+                existing_tables = self.connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'records%'"
+                ).fetchall()
+                for (existing_table,) in existing_tables:
+                    self.connection.execute(f"DROP TABLE {existing_table}")
+                self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (self.version,))
+
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, args TEXT, rows TEXT)"
+            )
+
+            self.entries = {}
+            self.entry_args = {}
+            for path, mtime_ns, size, args in self.connection.execute(f"SELECT path, mtime_ns, size, args FROM {self.table}"):
+                self.entries[path] = (mtime_ns, size)
+                if args is not None:
+                    self.entry_args[path] = json.loads(args)
+        except sqlite3.Error as error:
+            self.disable(error)
+        return self
+
+    def disable(self, error: Exception):
+        """Stop using the index file after an error, and carry on as if the index were empty."""
+        logging.warning(
+            f"Not using summary index {self.index_path.as_posix()}, parsing records instead: {error}"
+        )
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        self.entries = {}
+        self.entry_args = {}
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.connection is None:
+            return
+
+        if exc_type is None:
+            try:
+                self.connection.commit()
+            except sqlite3.Error as error:
+                self.disable(error)
+                return
+            logging.info(
+                f"Summary index {self.index_path.as_posix()}: reused {self.reused_count} records, stored {self.stored_count}."
+            )
+        else:
+            self.connection.rollback()
+        self.connection.close()
+        self.connection = None
+
+    def is_current(self, record_key: str, mtime_ns: int, size: int) -> bool:
+        """Check whether the given record is in the index and unchanged since it was indexed."""
+        return self.entries.get(record_key) == (mtime_ns, size)
+
+    def cached_args(self, record_key: str) -> dict[str, Any]:
+        """Get the pipeline args recorded for the given record, or None if they weren't recorded."""
+        return self.entry_args.get(record_key)
+
+    def cached_rows(self, record_key: str, mtime_ns: int, size: int) -> Any:
+        """Get summary rows for the given record, or None if the record is new or changed since it was indexed."""
+        if not self.is_current(record_key, mtime_ns, size):
+            return None
+
+        (rows,) = self.connection.execute(f"SELECT rows FROM {self.table} WHERE path = ?", (record_key,)).fetchone()
+        self.reused_count += 1
+        return json.loads(rows)
+
+    def store_rows(self, record_key: str, mtime_ns: int, size: int, rows: Any, args: dict[str, Any] = None) -> Any:
+        """Add or replace summary rows, and optionally pipeline args, for the given record.
+
+        Return the rows as they'll be read back from the index later, so that callers can use the same
+        values whether or not a record was already indexed.
+        """
+        rows_json = json.dumps(rows, default=str)
+        if self.connection is not None:
+            args_json = None if args is None else json.dumps(args, default=str)
+            try:
+                self.connection.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (path, mtime_ns, size, args, rows) VALUES (?, ?, ?, ?, ?)",
+                    (record_key, mtime_ns, size, args_json, rows_json)
+                )
+                self.entries[record_key] = (mtime_ns, size)
+                if args is None:
+                    self.entry_args.pop(record_key, None)
+                else:
+                    self.entry_args[record_key] = args
+                self.stored_count += 1
+            except sqlite3.Error as error:
+                self.disable(error)
+
+        return json.loads(rows_json)
+
+    def prune(self, keep_keys: set[str]):
+        """Remove entries for records that no longer exist."""
+        if self.connection is None:
+            return
+
+        stale_keys = [key for key in self.entries.keys() if key not in keep_keys]
+        try:
+            self.connection.executemany(f"DELETE FROM {self.table} WHERE path = ?", [(key,) for key in stale_keys])
+        except sqlite3.Error as error:
+            self.disable(error)
+            return
+        for key in stale_keys:
+            del self.entries[key]
+            self.entry_args.pop(key, None)
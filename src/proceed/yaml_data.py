@@ -1,9 +1,26 @@
 from types import GenericAlias
 from typing import Any, Self
-from dataclasses import asdict, fields
-import inspect
+from dataclasses import fields
 import yaml
 
+try:
+    # The libyaml C extension is much faster, when PyYAML was built with it.
+    # Its output loads as the same data, and is the same text except that with allow_unicode=True,
+    # libyaml still escapes characters outside the Basic Multilingual Plane, like emoji, as "\U0001F600".
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
+
+def safe_load(stream: Any, loader: type = YamlLoader) -> Any:
+    """Like yaml.safe_load(), but with libyaml when available."""
+    return yaml.load(stream, Loader=loader)
+
+
+def safe_dump(data: Any, dumper: type = YamlDumper, **dump_args) -> str:
+    """Like yaml.safe_dump(), but with libyaml when available."""
+    return yaml.dump(data, Dumper=dumper, **dump_args)
+
 
 def is_empty(x: Any):
     return x is None or (isinstance(x, list) and not x) or (isinstance(x, dict) and not x)
@@ -19,6 +36,60 @@ def remove_empty_values(x: Any):
         return x
 
 
+class YamlDataCodec():
+    """Field lists and nested type info for one YamlData class, worked out once and reused.
+
+    Inspecting a class's constructor and fields is slow compared to copying values around.
+    A codec does that inspection once per class, so that converting many instances,
+    like the step results in large execution records, only has to visit field values.
+    """
+
+    def __init__(self, data_class: type):
+        self.data_class = data_class
+        self.field_names = []
+        self.init_names = set()
+        self.nested_types = {}
+        self.nested_list_types = {}
+        for field in fields(data_class):
+            self.field_names.append(field.name)
+            if field.init:
+                self.init_names.add(field.name)
+            if YamlData.field_is_yaml_data(field):
+                self.nested_types[field.name] = field.type
+            elif YamlData.field_is_list_of_yaml_data(field):
+                self.nested_list_types[field.name] = YamlData.generic_list_element_type(field)
+
+    def to_dict(self, instance: Any) -> dict[str, Any]:
+        """Convert an instance to a plain dictionary, converting nested YamlData but sharing other values."""
+        instance_dict = {name: getattr(instance, name) for name in self.field_names}
+        for name in self.nested_types.keys():
+            value = instance_dict[name]
+            if isinstance(value, YamlData):
+                instance_dict[name] = value.to_dict()
+        for name in self.nested_list_types.keys():
+            value = instance_dict[name]
+            if isinstance(value, list):
+                instance_dict[name] = [e.to_dict() if isinstance(e, YamlData) else e for e in value]
+        return instance_dict
+
+    def from_dict(self, instance_dict: dict[str, Any]) -> Any:
+        """Create an instance from a dictionary, ignoring unknown keys and converting nested dicts to YamlData."""
+        init_args = {k: v for k, v in instance_dict.items() if k in self.init_names}
+        for name, field_type in self.nested_types.items():
+            value = init_args.get(name)
+            if isinstance(value, dict):
+                init_args[name] = field_type.from_dict(value)
+        for name, element_type in self.nested_list_types.items():
+            value = init_args.get(name)
+            if isinstance(value, list):
+                init_args[name] = [
+                    element_type.from_dict(e) if isinstance(e, dict) else e
+                    for e in value
+                    if isinstance(e, (dict, element_type))
+                ]
+        return self.data_class(**init_args)
+
+
 class YamlData():
     """Utility methods to convert @dataclass objects to and from YAML.
 
@@ -32,32 +103,38 @@ class YamlData():
         self_dict = self.to_dict()
         if skip_empty:
             self_dict = remove_empty_values(self_dict)
-        self_yaml = yaml.safe_dump(self_dict, **dump_args)
+        self_yaml = safe_dump(self_dict, **dump_args)
         return self_yaml
 
     @classmethod
     def from_yaml(cls, instance_yaml) -> Self:
         """Read a class instance from a plain YAML string without custom YAML tags."""
 
-        instance_dict = yaml.safe_load(instance_yaml)
+        instance_dict = safe_load(instance_yaml)
         instance = cls.from_dict(instance_dict)
         return instance
 
     def to_dict(self) -> dict[str, Any]:
-        """Dump self to a plain dictionary -- a convenience wrapper around dataclasses.asdict()."""
-        return asdict(self)
+        """Dump self to a plain dictionary, like dataclasses.asdict().
+
+        Unlike asdict(), this doesn't deep-copy field values: nested YamlData become new dicts,
+        but other collections, like lists and dicts of file digests, are shared with self.
+        """
+        return self.codec().to_dict(self)
 
     @classmethod
     def from_dict(cls, instance_dict) -> Self:
         """Read an instance of this YamlData class from a dictionary that has the same shape."""
+        return cls.codec().from_dict(instance_dict)
 
-        constructor_params = inspect.signature(cls).parameters
-        sanitized_dict = {k: v for k, v in instance_dict.items() if k in constructor_params}
-        instance = cls(**sanitized_dict)
-
-        # The instance itself is now a YamlData subclass, but nested YamlData fields may still be dicts.
-        instance.bless_yaml_data_fields()
-        return instance
+    @classmethod
+    def codec(cls) -> YamlDataCodec:
+        """Get the :class:`YamlDataCodec` for this class, creating it on first use."""
+        codec = cls.__dict__.get("_yaml_data_codec")
+        if codec is None:
+            codec = YamlDataCodec(cls)
+            cls._yaml_data_codec = codec
+        return codec
 
     @classmethod
     def field_is_yaml_data(cls, field):
@@ -80,25 +157,22 @@ class YamlData():
     def bless_yaml_data_fields(self):
         """Look for fields of self declared as YamlData subclasses, and convert these from dictionaries."""
 
-        for field in fields(self):
-            if YamlData.field_is_yaml_data(field):
-                # Convert a scalar field from dict to YamlData subclass.
-                field_value = getattr(self, field.name)
-                if isinstance(field_value, dict):
-                    field_instance = field.type.from_dict(field_value)
-                    setattr(self, field.name, field_instance)
-            elif YamlData.field_is_list_of_yaml_data(field):
-                # Convert a list of dicts field to list of YamlData subclass.
-                field_value = getattr(self, field.name)
-                if isinstance(field_value, list):
-                    element_type = YamlData.generic_list_element_type(field)
-                    raw_list = getattr(self, field.name)
-                    blessed_list = [element_type.from_dict(e) for e in raw_list if isinstance(e, dict)]
-                    setattr(self, field.name, blessed_list)
+        codec = self.codec()
+        for name, field_type in codec.nested_types.items():
+            # Convert a scalar field from dict to YamlData subclass.
+            field_value = getattr(self, name)
+            if isinstance(field_value, dict):
+                setattr(self, name, field_type.from_dict(field_value))
+        for name, element_type in codec.nested_list_types.items():
+            # Convert a list of dicts field to list of YamlData subclass.
+            field_value = getattr(self, name)
+            if isinstance(field_value, list):
+                blessed_list = [element_type.from_dict(e) for e in field_value if isinstance(e, dict)]
+                setattr(self, name, blessed_list)
 
     def parse_yaml_string(self, value):
         """Convenience to parse the given string value as yaml."""
         if isinstance(value, str):
-            return yaml.safe_load(value)
+            return safe_load(value)
         else:
             return value
@@ -1,11 +1,22 @@
+import os
+import json
 from math import isnan
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
 from pathlib import Path
-from pytest import fixture
-from proceed.model import Pipeline
+from pytest import fixture, importorskip, raises
+from pandas import read_csv, read_feather, read_parquet
+from proceed.model import ArrayTaskResult, ExecutionRecord, Pipeline, SlurmAccounting, Step, StepResult, Timing
 from proceed.run_recorder import RunRecorder
 from proceed.docker_runner import DockerRunner
 from proceed.runner_protocol import run_pipeline
-from proceed.aggregator import summarize_results, collect_custom_columns
+from proceed import aggregator
+from proceed.aggregator import (
+    SummaryFilter, SummarySpool, summarize_results, summarize_record_files, collect_custom_columns, iter_summary_rows,
+    iter_summary_tables, write_summary, write_summary_tables
+)
+from proceed.summary_index import SummaryIndex
+from proceed.file_matching import hash_contents
 
 
 @fixture
@@ -415,3 +426,477 @@ def test_custom_summary_column(pipelines, tmp_path):
     assert not "step_files_in" in summary_columns
     assert not "step_files_out" in summary_columns
     assert not "step_files_summary" in summary_columns
+
+
+def test_slurm_accounting_columns(tmp_path):
+    execution_path = Path(tmp_path, "slurm_group", "slurm_id")
+    execution_path.mkdir(parents=True)
+    pipeline = Pipeline(steps=[Step(name="accounted", image="alpine:latest", slurm={"mem": "16G"})])
+    execution_record = ExecutionRecord(
+        original=pipeline,
+        amended=pipeline,
+        timing=Timing("2024-01-31T12:00:00", "2024-01-31T12:01:40", 100.0),
+        step_results=[
+            StepResult(
+                name="accounted",
+                exit_code=0,
+                job_id="2001",
+                timing=Timing("2024-01-31T12:00:00", "2024-01-31T12:01:40", 100.0),
+                slurm_accounting=SlurmAccounting(
+                    job_id="2001",
+                    alloc_cpus=4,
+                    req_mem="16G",
+                    elapsed=100.0,
+                    total_cpu=200.5,
+                    max_rss=2 * 1024 ** 3,
+                    queue_wait=30.0
+                )
+            )
+        ]
+    )
+    with open(Path(execution_path, "execution_record.yaml"), "w") as f:
+        f.write(execution_record.to_yaml())
+
+    summary = summarize_results(tmp_path)
+    assert len(summary.index) == 1
+    assert summary["step_job_id"][0] == "2001"
+    assert summary["step_slurm_alloc_cpus"][0] == 4
+    assert summary["step_slurm_req_mem"][0] == "16G"
+    assert summary["step_slurm_total_cpu"][0] == 200.5
+    assert summary["step_slurm_max_rss"][0] == 2 * 1024 ** 3
+    assert summary["step_slurm_queue_wait"][0] == 30.0
+
+
+def write_execution_record(results_path: Path, group: str, results_id: str, arg_value: str):
+    execution_path = Path(results_path, group, results_id)
+    execution_path.mkdir(parents=True)
+    pipeline = Pipeline(args={"value": arg_value}, steps=[Step(name="step_a"), Step(name="step_b")])
+    execution_record = ExecutionRecord(
+        original=pipeline,
+        amended=pipeline,
+        timing=Timing("2024-01-31T12:00:00", "2024-01-31T12:01:40", 100.0),
+        step_results=[
+            StepResult(name="step_a", exit_code=0, timing=Timing("2024-01-31T12:00:00", "2024-01-31T12:00:50", 50.0)),
+            StepResult(name="step_b", exit_code=0, timing=Timing("2024-01-31T12:00:50", "2024-01-31T12:01:40", 50.0)),
+        ]
+    )
+    with open(Path(execution_path, "execution_record.yaml"), "w") as f:
+        f.write(execution_record.to_yaml())
+
+
+def test_summarize_results_in_parallel(tmp_path):
+    # Write records in scrambled order, the summary should come out sorted by group and id, regardless.
+    for index in [7, 2, 9, 0, 4, 1, 8, 3, 6, 5]:
+        write_execution_record(tmp_path, f"group_{index % 3}", f"id_{index}", str(index))
+
+    # Add one bogus record that should be skipped.
+    bogus_path = Path(tmp_path, "group_0", "id_bogus")
+    bogus_path.mkdir()
+    Path(bogus_path, "execution_record.yaml").write_text("{not a record")
+
+    serial_summary = summarize_results(tmp_path, max_workers=1)
+    parallel_summary = summarize_results(tmp_path, max_workers=3)
+    assert serial_summary.equals(parallel_summary)
+
+    expected_ids = ["id_0", "id_3", "id_6", "id_9", "id_1", "id_4", "id_7", "id_2", "id_5", "id_8"]
+    assert parallel_summary["results_id"].to_list()[::2] == expected_ids
+    assert parallel_summary["arg_value"].to_list()[::2] == [results_id[-1] for results_id in expected_ids]
+    assert parallel_summary["step_name"].to_list() == ["step_a", "step_b"] * 10
+
+
+def test_summarize_results_with_index(tmp_path):
+    results_path = Path(tmp_path, "results")
+    for index in range(4):
+        write_execution_record(results_path, "group", f"id_{index}", str(index))
+    index_path = Path(tmp_path, "summary_index.sqlite")
+
+    # The first summary should populate the index.
+    with_index = summarize_results(results_path, max_workers=1, index_path=index_path)
+    without_index = summarize_results(results_path, max_workers=1)
+    assert with_index.equals(without_index)
+    assert index_path.exists()
+
+    # Changes to indexed records should be picked up, including new and deleted records.
+    Path(results_path, "group", "id_0", "execution_record.yaml").unlink()
+    write_execution_record(results_path, "group", "id_4", "4")
+    Path(results_path, "group", "id_1", "execution_record.yaml").write_text("{not a record")
+
+    with SummaryIndex(index_path) as summary_index:
+        assert set(summary_index.entries.keys()) == {f"group/id_{index}/execution_record.yaml" for index in range(4)}
+
+    with_index = summarize_results(results_path, max_workers=1, index_path=index_path)
+    without_index = summarize_results(results_path, max_workers=1)
+    assert with_index.equals(without_index)
+    assert with_index["results_id"].to_list() == ["id_2", "id_2", "id_3", "id_3", "id_4", "id_4"]
+
+    # Unchanged records should come from the index, even if they'd be summarized differently now.
+    with SummaryIndex(index_path) as summary_index:
+        assert set(summary_index.entries.keys()) == {f"group/id_{index}/execution_record.yaml" for index in range(1, 5)}
+        record_key = "group/id_2/execution_record.yaml"
+        (mtime_ns, size) = summary_index.entries[record_key]
+        summary_index.store_rows(record_key, mtime_ns, size, [{"results_id": "from_index"}])
+
+    with_index = summarize_results(results_path, max_workers=1, index_path=index_path)
+    assert with_index["results_id"].to_list() == ["from_index", "id_3", "id_3", "id_4", "id_4"]
+
+    # A different version should discard the whole index.
+    with SummaryIndex(index_path, version="other") as summary_index:
+        assert not summary_index.entries
+
+
+def test_summarize_results_with_unusable_index(tmp_path):
+    results_path = Path(tmp_path, "results")
+    for index in range(2):
+        write_execution_record(results_path, "group", f"id_{index}", str(index))
+
+    # An index that can't be opened, like in a read-only results dir, should fall back to parsing records.
+    index_path = Path(tmp_path, "no_such_dir", "summary_index.sqlite")
+    with_index = summarize_results(results_path, max_workers=1, index_path=index_path)
+    without_index = summarize_results(results_path, max_workers=1)
+    assert with_index.equals(without_index)
+    assert not index_path.exists()
+
+
+def test_summary_index_stores_json(tmp_path):
+    index_path = Path(tmp_path, "summary_index.sqlite")
+    rows = [{"results_id": "id_0", "step_exit_code": 0, "step_duration": 1.5, "missing": None, "when": date(2024, 1, 2)}]
+    with SummaryIndex(index_path) as summary_index:
+        stored_rows = summary_index.store_rows("record.yaml", 42, 100, rows)
+
+    # Values that JSON can't represent come back as strings, the same way whether stored or reused.
+    expected_rows = [{"results_id": "id_0", "step_exit_code": 0, "step_duration": 1.5, "missing": None, "when": "2024-01-02"}]
+    assert stored_rows == expected_rows
+
+    with SummaryIndex(index_path) as summary_index:
+        assert summary_index.cached_rows("record.yaml", 42, 100) == expected_rows
+        (rows_json,) = summary_index.connection.execute("SELECT rows FROM records_rows").fetchone()
+        assert json.loads(rows_json) == expected_rows
+
+
+def test_write_summary_in_chunks(tmp_path):
+    results_path = Path(tmp_path, "results")
+    for index in [3, 1, 4, 0, 2]:
+        write_execution_record(results_path, f"group_{index % 2}", f"id_{index}", str(index))
+
+    # Add a custom column that only appears in the last rows, after the first chunks.
+    summary_path = Path(results_path, "group_1", "id_3", "custom.yaml")
+    summary_path.write_text("custom: yes")
+    record_path = Path(results_path, "group_1", "id_3", "execution_record.yaml")
+    execution_record = ExecutionRecord.from_yaml(record_path.read_text())
+    execution_record.step_results[1].files_summary = {summary_path.parent.as_posix(): {"custom.yaml": "digest"}}
+    record_path.write_text(execution_record.to_yaml())
+
+    # Sort by step_name first, which interleaves rows from different records and chunks.
+    sort_rows_by = ["step_name", "arg_value"]
+    in_memory = summarize_results(results_path, sort_rows_by=sort_rows_by, max_workers=1)
+
+    csv_path = Path(tmp_path, "summary.csv")
+    row_count = write_summary(iter_summary_rows(results_path, max_workers=1), csv_path, sort_rows_by=sort_rows_by, chunk_size=3)
+    assert row_count == len(in_memory.index)
+
+    streamed = read_csv(csv_path, dtype=str, keep_default_na=False)
+    assert list(streamed.columns) == list(in_memory.columns)
+    assert streamed["step_name"].to_list() == in_memory["step_name"].to_list()
+    assert streamed["arg_value"].to_list() == in_memory["arg_value"].to_list()
+    assert streamed["arg_value"].to_list() == ["0", "1", "2", "3", "4", "0", "1", "2", "3", "3", "4"]
+    assert streamed["file_role"].to_list() == ["log"] * 9 + ["summary", "log"]
+    assert streamed["custom"].to_list() == [""] * 8 + ["True", "True", ""]
+
+    # Without sorting, rows should come out in the same order they went in.
+    columns = ["results_id", "step_name", "custom", "no_such_column"]
+    row_count = write_summary(iter_summary_rows(results_path, max_workers=1), csv_path, columns=columns, chunk_size=3)
+    streamed = read_csv(csv_path, dtype=str, keep_default_na=False)
+    assert list(streamed.columns) == ["results_id", "step_name", "custom"]
+    assert streamed["results_id"].to_list() == ["id_0", "id_0", "id_2", "id_2", "id_4", "id_4", "id_1", "id_1", "id_3", "id_3", "id_3"]
+
+
+def test_summary_spool_bounded_merge(tmp_path):
+    # 25 rows in chunks of 2 makes 13 sorted chunks, more than can be merged at once with a fan-in of 3.
+    spool = SummarySpool(tmp_path, sort_columns=["key"], chunk_size=2, merge_fan_in=3)
+    spool.add_rows({"key": index % 5, "order": index} for index in range(25))
+    rows = list(spool.rows())
+
+    # Extra merge passes leave few enough chunk files for the final merge, and don't leave extra files behind.
+    assert len(spool.spool_paths) <= 3
+    assert sorted(os.listdir(tmp_path)) == sorted(spool_path.name for spool_path in spool.spool_paths)
+
+    # Rows are sorted by key and rows with equal keys keep their original order.
+    expected = sorted(({"key": index % 5, "order": index} for index in range(25)), key=lambda row: row["key"])
+    assert rows == expected
+
+
+def test_summarize_record_files_bounded(monkeypatch):
+    # Use threads instead of processes, so the test can count chunks in flight and use a local summarize.
+    submitted = []
+    completed = []
+
+    class CountingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(args[1])
+            return super().submit(fn, *args, **kwargs)
+
+    def summarize(record_path):
+        completed.append(record_path)
+        return record_path
+
+    monkeypatch.setattr(aggregator, "ProcessPoolExecutor", CountingExecutor)
+    record_paths = list(range(100))
+    summaries = summarize_record_files(record_paths, max_workers=2, summarize=summarize, max_chunk_size=5, max_pending=3)
+
+    # Only a few chunks are submitted ahead of the consumer.
+    assert next(summaries) == 0
+    assert len(submitted) == 4
+    assert all(len(chunk) == 5 for chunk in submitted)
+
+    # All the summaries come out, in order.
+    assert [0, *summaries] == record_paths
+    assert sorted(completed) == record_paths
+
+
+def test_write_summary_empty(tmp_path):
+    csv_path = Path(tmp_path, "summary.csv")
+    row_count = write_summary(iter_summary_rows(tmp_path), csv_path, sort_rows_by=["step_start"])
+    assert row_count == 0
+    assert csv_path.exists()
+
+
+def test_write_summary_parquet(tmp_path):
+    importorskip("pyarrow")
+    results_path = Path(tmp_path, "results")
+    for index in range(5):
+        write_execution_record(results_path, "group", f"id_{index}", str(index))
+
+    parquet_path = Path(tmp_path, "summary.parquet")
+    row_count = write_summary(iter_summary_rows(results_path, max_workers=1), parquet_path, chunk_size=3)
+    assert row_count == 10
+
+    streamed = read_parquet(parquet_path)
+    in_memory = summarize_results(results_path, max_workers=1)
+    assert list(streamed.columns) == list(in_memory.columns)
+    assert streamed["results_id"].to_list() == in_memory["results_id"].to_list()
+    assert streamed["step_duration"].to_list() == [50.0] * 10
+
+    # Columnar formats should parse numbers and use categorical columns where there are few distinct values.
+    assert in_memory["step_exit_code"].to_list() == ["0"] * 10
+    assert streamed["step_exit_code"].to_list() == [0] * 10
+    assert streamed["step_exit_code"].dtype == "int64"
+    assert streamed["file_role"].dtype == "category"
+    assert streamed["results_group"].dtype == "category"
+
+
+def test_write_summary_feather(tmp_path):
+    importorskip("pyarrow")
+    results_path = Path(tmp_path, "results")
+    for index in range(5):
+        write_execution_record(results_path, "group", f"id_{index}", str(index))
+
+    # The format can be given explicitly, regardless of file name.
+    feather_path = Path(tmp_path, "summary.data")
+    summary_rows = iter_summary_rows(results_path, max_workers=1)
+    row_count = write_summary(summary_rows, feather_path, sort_rows_by=["arg_value"], chunk_size=3, summary_format="feather")
+    assert row_count == 10
+
+    streamed = read_feather(feather_path)
+    assert streamed["arg_value"].to_list() == ["0", "0", "1", "1", "2", "2", "3", "3", "4", "4"]
+    assert streamed["step_exit_code"].to_list() == [0] * 10
+    assert streamed["step_name"].dtype == "category"
+
+
+def test_write_summary_unknown_format(tmp_path):
+    with raises(ValueError, match="Unknown summary format 'xlsx'"):
+        write_summary([], Path(tmp_path, "summary.xlsx"), summary_format="xlsx")
+
+
+def test_recorded_log_digest(tmp_path):
+    execution_path = Path(tmp_path, "group", "id")
+    execution_path.mkdir(parents=True)
+    log_path = Path(execution_path, "step.log")
+    log_path.write_text("step log\n")
+    pipeline = Pipeline(steps=[Step(name="recorded"), Step(name="old")])
+    execution_record = ExecutionRecord(
+        original=pipeline,
+        amended=pipeline,
+        timing=Timing("2024-01-31T12:00:00", "2024-01-31T12:01:40", 100.0),
+        step_results=[
+            # The recorded digest should be used as-is, without reading the log.
+            StepResult(name="recorded", exit_code=0, log_file=log_path.as_posix(), log_digest="sha256:recorded", log_size=9,
+                       timing=Timing("2024-01-31T12:00:00", "2024-01-31T12:00:50", 50.0)),
+            # Older records have no digest, so the log has to be hashed.
+            StepResult(name="old", exit_code=0, log_file=log_path.as_posix(),
+                       timing=Timing("2024-01-31T12:00:50", "2024-01-31T12:01:40", 50.0)),
+        ]
+    )
+    with open(Path(execution_path, "execution_record.yaml"), "w") as f:
+        f.write(execution_record.to_yaml())
+
+    summary = summarize_results(tmp_path, max_workers=1)
+    assert summary["file_digest"].to_list() == ["sha256:recorded", hash_contents(log_path)]
+    assert summary["step_log_size"].to_list() == ["9", "None"]
+    assert "step_log_digest" not in summary.columns
+
+
+def test_write_summary_tables(tmp_path):
+    results_path = Path(tmp_path, "results")
+    for index in range(3):
+        write_execution_record(results_path, "group", f"id_{index}", str(index))
+
+    # Add a custom column for one step.
+    summary_path = Path(results_path, "group", "id_1", "custom.yaml")
+    summary_path.write_text("custom: 42")
+    record_path = Path(results_path, "group", "id_1", "execution_record.yaml")
+    execution_record = ExecutionRecord.from_yaml(record_path.read_text())
+    execution_record.step_results[0].files_summary = {summary_path.parent.as_posix(): {"custom.yaml": "digest"}}
+
+    # And array tasks for another.
+    execution_record.step_results[1].array_tasks = [
+        ArrayTaskResult(task_id="0", exit_code=0, state="COMPLETED", log_file="task_0.log"),
+        ArrayTaskResult(task_id="1", exit_code=3, state="FAILED", log_file="task_1.log"),
+    ]
+    record_path.write_text(execution_record.to_yaml())
+
+    out_path = Path(tmp_path, "summary.csv")
+    index_path = Path(tmp_path, "summary_index.sqlite")
+    summary_tables = iter_summary_tables(results_path, max_workers=2, index_path=index_path)
+    table_files = write_summary_tables(summary_tables, out_path, sort_rows_by=["step_start", "file_path"], chunk_size=2)
+    assert table_files == {
+        "pipelines": Path(tmp_path, "summary_pipelines.csv"),
+        "steps": Path(tmp_path, "summary_steps.csv"),
+        "files": Path(tmp_path, "summary_files.csv"),
+        "array_tasks": Path(tmp_path, "summary_array_tasks.csv"),
+    }
+
+    pipelines = read_csv(table_files["pipelines"], dtype=str, keep_default_na=False)
+    assert pipelines["results_id"].to_list() == ["id_0", "id_1", "id_2"]
+    assert pipelines["arg_value"].to_list() == ["0", "1", "2"]
+    assert "step_name" not in pipelines.columns
+
+    steps = read_csv(table_files["steps"], dtype=str, keep_default_na=False)
+    assert list(steps.columns[:3]) == ["results_group", "results_id", "step_name"]
+    assert steps["results_id"].to_list() == ["id_0", "id_1", "id_2", "id_0", "id_1", "id_2"]
+    assert steps["step_name"].to_list() == ["step_a"] * 3 + ["step_b"] * 3
+    assert steps["custom"].to_list() == ["", "42", "", "", "", ""]
+    assert "file_path" not in steps.columns
+    assert "arg_value" not in steps.columns
+
+    files = read_csv(table_files["files"], dtype=str, keep_default_na=False)
+    assert list(files.columns) == ["results_group", "results_id", "step_name", "file_volume", "file_path", "file_digest", "file_role"]
+    assert files["file_role"].to_list() == ["log"] * 6 + ["summary"]
+
+    array_tasks = read_csv(table_files["array_tasks"], dtype=str, keep_default_na=False)
+    assert list(array_tasks.columns) == [
+        "results_group", "results_id", "step_name", "task_id", "task_exit_code", "task_state", "task_log_file"
+    ]
+    assert array_tasks["results_id"].to_list() == ["id_1", "id_1"]
+    assert array_tasks["step_name"].to_list() == ["step_b", "step_b"]
+    assert array_tasks["task_exit_code"].to_list() == ["0", "3"]
+    assert "step_array_tasks" not in steps.columns
+
+    # Joining the tables should give back the wide summary.
+    joined = files.merge(steps, on=["results_group", "results_id", "step_name"]).merge(pipelines, on=["results_group", "results_id"])
+    wide = summarize_results(results_path, max_workers=1).astype(str)
+    assert "step_array_tasks" not in wide.columns
+    joined = joined.sort_values(["results_id", "step_name", "file_role"]).reset_index(drop=True)
+    wide = wide.sort_values(["results_id", "step_name", "file_role"]).reset_index(drop=True)
+    assert joined["file_role"].to_list() == wide["file_role"].to_list()
+    assert joined["step_start"].to_list() == wide["step_start"].to_list()
+    assert joined["arg_value"].to_list() == wide["arg_value"].to_list()
+
+    # With column selection, tables should keep their keys.
+    summary_tables = iter_summary_tables(results_path, max_workers=1, index_path=index_path)
+    table_files = write_summary_tables(summary_tables, out_path, columns=["arg_value", "step_duration", "file_role"])
+    assert list(read_csv(table_files["pipelines"]).columns) == ["results_group", "results_id", "arg_value"]
+    assert list(read_csv(table_files["steps"]).columns) == ["results_group", "results_id", "step_name", "step_duration"]
+    assert list(read_csv(table_files["files"]).columns) == ["results_group", "results_id", "step_name", "file_role"]
+
+    # Normalized tables and wide rows should be indexed separately.
+    with SummaryIndex(index_path, kind="tables") as summary_index:
+        assert len(summary_index.entries) == 3
+    with SummaryIndex(index_path, kind="rows") as summary_index:
+        assert len(summary_index.entries) == 0
+
+
+def test_summary_filter_groups_and_times(tmp_path, caplog):
+    write_execution_record(tmp_path, "group_a", "20240130T120000UTC", "a_30")
+    write_execution_record(tmp_path, "group_a", "20240131T120000UTC", "a_31")
+    write_execution_record(tmp_path, "group_b", "20240131T120000UTC", "b_31")
+    write_execution_record(tmp_path, "group_b", "custom_id", "b_custom")
+
+    # Without a timestamp, the results_id dir modification time counts.
+    custom_time = datetime(2024, 2, 1, 12, tzinfo=timezone.utc).timestamp()
+    os.utime(Path(tmp_path, "group_b", "custom_id"), (custom_time, custom_time))
+
+    # Records from filtered-out groups should not be opened at all.
+    bogus_path = Path(tmp_path, "group_c", "20240131T120000UTC")
+    bogus_path.mkdir(parents=True)
+    Path(bogus_path, "execution_record.yaml").write_text("{not a record")
+
+    def summarized_args(summary_filter: SummaryFilter) -> list[str]:
+        summary = summarize_results(tmp_path, max_workers=1, summary_filter=summary_filter)
+        return summary["arg_value"].to_list()[::2]
+
+    assert summarized_args(SummaryFilter(groups=["group_a"])) == ["a_30", "a_31"]
+    assert summarized_args(SummaryFilter(groups=["group_a", "group_b"], since="2024-01-31")) == ["a_31", "b_31", "b_custom"]
+    assert summarized_args(SummaryFilter(groups=["group_a", "group_b"], until="2024-01-31T12:00:00")) == ["a_30"]
+    assert summarized_args(SummaryFilter(since="2024-02-01", until=datetime(2024, 2, 2, tzinfo=timezone.utc))) == ["b_custom"]
+    assert "Skipping file" not in caplog.text
+
+
+def test_summary_filter_args(tmp_path, monkeypatch):
+    for index in range(4):
+        write_execution_record(tmp_path, "group", f"id_{index}", str(index % 2))
+    summary_filter = SummaryFilter(args={"value": 1})
+
+    # Filtering by args should work without an index.
+    summary = summarize_results(tmp_path, max_workers=1, summary_filter=summary_filter)
+    assert summary["results_id"].to_list() == ["id_1", "id_1", "id_3", "id_3"]
+
+    # With an index, filtering by args should work for new records and reused records.
+    index_path = Path(tmp_path, "summary_index.sqlite")
+    summary = summarize_results(tmp_path, max_workers=1, index_path=index_path, summary_filter=summary_filter)
+    assert summary["results_id"].to_list() == ["id_1", "id_1", "id_3", "id_3"]
+
+    # Reused records that don't match should not be loaded from the index.
+    loaded_keys = []
+    original_cached_rows = SummaryIndex.cached_rows
+
+    def cached_rows(self, record_key, mtime_ns, size):
+        loaded_keys.append(record_key)
+        return original_cached_rows(self, record_key, mtime_ns, size)
+
+    monkeypatch.setattr(SummaryIndex, "cached_rows", cached_rows)
+    tables = list(iter_summary_tables(tmp_path, max_workers=1, index_path=index_path))
+    assert len(tables) == 4
+    loaded_keys.clear()
+
+    summary = summarize_results(tmp_path, max_workers=1, index_path=index_path, summary_filter=summary_filter)
+    assert summary["results_id"].to_list() == ["id_1", "id_1", "id_3", "id_3"]
+    assert loaded_keys == ["group/id_1/execution_record.yaml", "group/id_3/execution_record.yaml"]
+
+    loaded_keys.clear()
+    tables = list(iter_summary_tables(tmp_path, max_workers=1, index_path=index_path, summary_filter=summary_filter))
+    assert [table["pipelines"][0]["results_id"] for table in tables] == ["id_1", "id_3"]
+    assert loaded_keys == ["group/id_1/execution_record.yaml", "group/id_3/execution_record.yaml"]
+
+    # Filtered summaries should not prune the index.
+    with SummaryIndex(index_path) as summary_index:
+        assert len(summary_index.entries) == 4
+
+
+def test_recorded_custom_columns(tmp_path):
+    results_path = Path(tmp_path, "results")
+    write_execution_record(results_path, "group", "id", "0")
+
+    # The summary files don't exist any more, as if their volume was offline, but their parsed content was recorded.
+    volume = Path(tmp_path, "offline").as_posix()
+    record_path = Path(results_path, "group", "id", "execution_record.yaml")
+    execution_record = ExecutionRecord.from_yaml(record_path.read_text())
+    execution_record.step_results[0].files_summary = {volume: {"summary.yaml": "sha256:yaml", "note.txt": "sha256:text"}}
+    execution_record.step_results[0].custom_columns = {"sha256:yaml": {"accuracy": 0.9}, "sha256:text": "some notes"}
+    record_path.write_text(execution_record.to_yaml())
+
+    summary = summarize_results(results_path, max_workers=1)
+    assert summary["file_role"].to_list() == ["log", "summary", "summary", "log"]
+    assert summary["accuracy"].to_list()[:3] == [0.9, 0.9, 0.9]
+    assert summary["note"].to_list()[:3] == ["some notes", "some notes", "some notes"]
+    assert isnan(summary["accuracy"].to_list()[3])
+    assert "step_custom_columns" not in summary.columns
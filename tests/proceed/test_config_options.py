@@ -1,9 +1,10 @@
 from pathlib import Path
-from pytest import fixture
+from pytest import fixture, raises
 from argparse import ArgumentParser
 from proceed.config_options import (
     ConfigOptions,
     ConvertingKeyValuePairsAction,
+    GroupedKeyValuePairsAction,
     KeyValuePairsAction,
     parse_key_value_pairs,
     resolve_config_options
@@ -39,6 +40,21 @@ def test_convertng_key_value_pairs_action():
     assert parsed.kvp == {"foo": "bar", "baz": 1, "quux": False, "flim": None}
 
 
+def test_grouped_key_value_pairs_action():
+    parser = ArgumentParser()
+    parser.add_argument("--kvp", nargs="+", action=GroupedKeyValuePairsAction)
+    parsed = parser.parse_args(["--kvp", "slurm.image_cache_dir=/cache", "slurm.poll_interval=3", "local.log_echo=none"])
+    assert parsed.kvp == {"slurm": {"image_cache_dir": "/cache", "poll_interval": 3}, "local": {"log_echo": "none"}}
+
+
+def test_grouped_key_value_pairs_action_requires_groups(capsys):
+    parser = ArgumentParser()
+    parser.add_argument("--kvp", nargs="+", action=GroupedKeyValuePairsAction)
+    with raises(SystemExit):
+        parser.parse_args(["--kvp", "slurm.poll_interval=3", "log_echo=none"])
+    assert "expected a key like group.key, got 'log_echo'" in capsys.readouterr().err
+
+
 def test_resolve_default_options():
     resolved_options = resolve_config_options()
     expected_options = ConfigOptions()
@@ -3,13 +3,15 @@ from grp import getgrgid
 from getpass import getuser
 from pathlib import Path
 from shutil import rmtree
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
 import docker
 
 from pytest import fixture
 
 from proceed.model import Pipeline, ExecutionRecord, Step, StepResult
 from proceed.run_recorder import RunRecorder
-from proceed.docker_runner import DockerRunner
+from proceed.docker_runner import DockerRunner, ContainerEventMonitor
 from proceed.runner_protocol import run_pipeline, run_step
 
 
@@ -777,6 +779,70 @@ def test_pipeline_with_environment(alpine_image, tmp_path):
     assert read_step_logs(pipeline_result.step_results[1]) == "one two-b three-b\n"
 
 
+def test_prefetch_image_present(alpine_image):
+    image_pull = DockerRunner().prefetch_image(alpine_image.tags[0])
+    assert image_pull.image == alpine_image.tags[0]
+    assert image_pull.image_id == alpine_image.id
+    assert image_pull.digest in alpine_image.attrs["RepoDigests"]
+    assert image_pull.pulled == False
+    assert image_pull.error == None
+
+
+def test_prefetch_image_not_found():
+    image_pull = DockerRunner().prefetch_image("no_such_image")
+    assert image_pull.image == "no_such_image"
+    assert image_pull.image_id == None
+    assert image_pull.pulled == False
+    assert "no_such_image" in image_pull.error
+
+
+def test_pipeline_records_image_pulls(alpine_image, tmp_path):
+    pipeline = Pipeline(
+        steps=[
+            Step(name="step 1", image=alpine_image.tags[0], command=["echo", "hello"]),
+            Step(name="step 2", image=alpine_image.tags[0], command=["echo", "bye"])
+        ]
+    )
+    run_recorder = RunRecorder(tmp_path)
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, DockerRunner())
+
+    # The shared image is pulled or verified once, before the first step.
+    assert len(pipeline_result.image_pulls) == 1
+    image_pull = pipeline_result.image_pulls[0]
+    assert image_pull.image == alpine_image.tags[0]
+    assert image_pull.image_id == alpine_image.id
+    assert image_pull.error == None
+    assert image_pull.timing._is_complete()
+
+    # Each step ran the same image that was prefetched.
+    assert [step_result.image_id for step_result in pipeline_result.step_results] == [image_pull.image_id] * 2
+    assert [step_result.exit_code for step_result in pipeline_result.step_results] == [0, 0]
+    assert all([step_result.timing._is_complete() for step_result in pipeline_result.step_results])
+
+    assert read_step_logs(pipeline_result.step_results[0]) == "hello\n"
+    assert read_step_logs(pipeline_result.step_results[1]) == "bye\n"
+
+
+def test_pipeline_closes_docker_runner(alpine_image, tmp_path):
+    pipeline = Pipeline(
+        steps=[
+            Step(name="step 1", image=alpine_image.tags[0], command=["echo", "hello"])
+        ]
+    )
+    runner = DockerRunner()
+    run_recorder = RunRecorder(tmp_path)
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, runner)
+    assert pipeline_result.step_results[0].exit_code == 0
+
+    # The shared client and the events stream were released when the pipeline finished.
+    assert runner._client is None
+    assert runner._event_monitor is None
+
+    # The runner still works, reconnecting as needed.
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, runner)
+    assert pipeline_result.step_results[0].exit_code == 0
+
+
 def test_pipeline_with_network_config(alpine_image, tmp_path):
     pipeline = Pipeline(
         prototype=Step(
@@ -1102,3 +1168,151 @@ def test_pipeline_interrupted(alpine_image, tmp_path):
 
     assert execution_record.step_results[1].name == "step 2"
     assert execution_record.step_results[1].exit_code == 130
+
+
+def test_shared_client():
+    # An explicit API version lets us create clients without contacting the daemon.
+    runner = DockerRunner(client_kwargs={"version": "1.41"}, max_pool_size=3)
+    client = runner.client()
+    assert runner.client() is client
+    assert client.api.adapters["http+docker://"].max_pool_size == 3
+
+    runner.reset_client()
+    assert runner.client() is not client
+    runner.close()
+
+
+def test_shared_client_reset_while_in_use():
+    runner = DockerRunner(client_kwargs={"version": "1.41"})
+    closed = []
+
+    # One step is still using the client when another step's failure resets it.
+    client = runner._acquire_client()
+    client.close = lambda: closed.append(client)
+    runner.reset_client(client)
+    replacement = runner.client()
+    assert replacement is not client
+    assert closed == []
+
+    # A late reset with the old client leaves the replacement alone.
+    runner.reset_client(client)
+    assert runner.client() is replacement
+
+    # The old client is closed once its last user is done with it.
+    runner._release_client(client)
+    assert closed == [client]
+    runner.close()
+
+
+def test_shared_client_reconnect_on_failed_health_check():
+    # With no daemon at this host, the health check ping should fail and cause a reconnect.
+    client_kwargs = {"version": "1.41", "environment": {"DOCKER_HOST": "unix:///no/such/docker.sock"}}
+    runner = DockerRunner(client_kwargs=client_kwargs, health_check_interval=-1)
+    client = runner.client()
+    assert runner.client() is not client
+    runner.close()
+
+
+class FakeEventsStream():
+    """Stand-in for the Docker events stream that yields events given by the test."""
+
+    def __init__(self):
+        self.events = Queue()
+
+    def __iter__(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            yield event
+
+    def close(self):
+        self.events.put(None)
+
+
+class FakeEventsClient():
+    def __init__(self):
+        self.stream = FakeEventsStream()
+        self.filters = None
+
+    def events(self, decode, filters):
+        self.filters = filters
+        return self.stream
+
+
+def die_event(container_id: str, exit_code: int) -> dict:
+    return {"Type": "container", "Action": "die", "Actor": {"ID": container_id, "Attributes": {"exitCode": str(exit_code)}}}
+
+
+def test_event_monitor_dispatch():
+    client = FakeEventsClient()
+    monitor = ContainerEventMonitor(client, {"proceed.runner": "test"})
+    monitor.start()
+    assert client.filters == {"type": "container", "event": "die", "label": ["proceed.runner=test"]}
+
+    # Exit before waiting.
+    client.stream.events.put(die_event("early", 0))
+
+    # Exit after waiting, from another thread.
+    with ThreadPoolExecutor() as executor:
+        late_future = executor.submit(monitor.wait_for_exit, "late")
+        other_future = executor.submit(monitor.wait_for_exit, "other")
+        client.stream.events.put(die_event("other", 42))
+        client.stream.events.put(die_event("late", 1))
+        assert late_future.result(timeout=5) == 1
+        assert other_future.result(timeout=5) == 42
+
+    assert monitor.wait_for_exit("early", timeout=5) == 0
+    monitor.stop()
+
+
+def test_event_monitor_stream_failure():
+    client = FakeEventsClient()
+    monitor = ContainerEventMonitor(client, {"proceed.runner": "test"})
+    monitor.start()
+
+    with ThreadPoolExecutor() as executor:
+        future = executor.submit(monitor.wait_for_exit, "never")
+        monitor.stop()
+        assert future.result(timeout=5) is None
+
+    # After failure, waiters should fall back right away.
+    assert monitor.wait_for_exit("also never", timeout=5) is None
+
+
+def test_step_supervise_with_events(alpine_image, tmp_path):
+    runner = DockerRunner(supervise_with_events=True)
+    success_step = Step(name="events success", image=alpine_image.tags[0], command=["echo", "hello from events"])
+    success_result = run_step(success_step, Path(tmp_path, "success.log"), runner)
+    assert success_result.exit_code == 0
+    assert success_result.image_id == alpine_image.id
+    assert read_step_logs(success_result) == "hello from events\n"
+
+    error_step = Step(name="events error", image=alpine_image.tags[0], command=["ls", "no_such_dir"])
+    error_result = run_step(error_step, Path(tmp_path, "error.log"), runner)
+    assert error_result.exit_code == 1
+    assert "no_such_dir: No such file or directory" in read_step_logs(error_result)
+    runner.close()
+
+
+def test_step_separate_streams_with_timestamps(alpine_image, tmp_path):
+    runner = DockerRunner(log_streams="separate", log_timestamps=True)
+    step = Step(
+        name="separate streams",
+        image=alpine_image.tags[0],
+        command=["/bin/sh", "-c", "echo to stdout; echo to stderr >&2"]
+    )
+    step_result = run_step(step, Path(tmp_path, "step.log"), runner)
+    assert step_result.exit_code == 0
+    assert step_result.stdout_file == Path(tmp_path, "step.stdout.log").as_posix()
+    assert step_result.stderr_file == Path(tmp_path, "step.stderr.log").as_posix()
+
+    with open(step_result.stdout_file) as f:
+        (timestamp, text) = f.read().split(" ", maxsplit=1)
+    assert timestamp.endswith("Z")
+    assert text == "to stdout\n"
+
+    with open(step_result.stderr_file) as f:
+        (timestamp, text) = f.read().split(" ", maxsplit=1)
+    assert timestamp.endswith("Z")
+    assert text == "to stderr\n"
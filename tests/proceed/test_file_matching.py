@@ -1,6 +1,7 @@
+import json
 from pathlib import Path
 from pytest import fixture
-from proceed.file_matching import count_matches, flatten_matches, match_patterns_in_dirs
+from proceed.file_matching import count_matches, flatten_matches, match_patterns_in_dirs, main
 
 
 @fixture
@@ -69,3 +70,11 @@ def test_flatten_matches():
         {"file_volume": "volume_b", "file_path": "file_4.txt", "file_digest": "sha256:44444444", "foo": "bar"},
     ]
     assert flattened == expected_flattened
+
+
+def test_file_matching_main(fixture_path, capsys):
+    fixture_dir = fixture_path.as_posix()
+    exit_code = main(["--dirs", fixture_dir, "--patterns", "happy_spec.yaml", "*.nonexistent"])
+    assert exit_code == 0
+    printed = json.loads(capsys.readouterr().out)
+    assert printed == match_patterns_in_dirs([fixture_dir], ["happy_spec.yaml"])
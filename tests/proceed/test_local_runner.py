@@ -0,0 +1,192 @@
+import logging
+from os import getcwd
+from pathlib import Path
+from shutil import which
+
+from pytest import fixture
+
+from proceed.model import Pipeline, Step
+from proceed.run_recorder import RunRecorder
+from proceed.runner_protocol import run_pipeline, run_step
+from proceed.local_runner import LocalRunner, path_rewrites, rewrite_paths
+from proceed.file_matching import hash_contents
+
+
+@fixture
+def fixture_path(request):
+    this_file = Path(request.module.__file__)
+    return Path(this_file.parent, 'fixture_files')
+
+
+def read_step_logs(step_result) -> str:
+    with open(step_result.log_file, 'r') as f:
+        return f.read()
+
+
+def test_path_rewrites():
+    volumes = {
+        "/host/a": "/work",
+        "/host/b": {"bind": "/work/nested", "mode": "ro"},
+    }
+    rewrites = path_rewrites(volumes)
+    assert rewrites == [("/work/nested", "/host/b"), ("/work", "/host/a")]
+
+    assert rewrite_paths("/work", rewrites) == "/host/a"
+    assert rewrite_paths("/work/file.txt", rewrites) == "/host/a/file.txt"
+    assert rewrite_paths("/work/nested/file.txt", rewrites) == "/host/b/file.txt"
+    assert rewrite_paths("--out=/work/file.txt", rewrites) == "--out=/host/a/file.txt"
+    assert rewrite_paths("echo hi > /work/file.txt", rewrites) == "echo hi > /host/a/file.txt"
+    assert rewrite_paths("/workspace/file.txt", rewrites) == "/workspace/file.txt"
+    assert rewrite_paths("/other/work/file.txt", rewrites) == "/other/work/file.txt"
+    assert rewrite_paths(["/work", 42], rewrites) == ["/host/a", 42]
+    assert rewrite_paths({"/work": "/work"}, rewrites) == {"/work": "/host/a"}
+    assert rewrite_paths(None, rewrites) is None
+
+
+def test_step_command_success(tmp_path):
+    step = Step(name="command success", image="ignored", command=["echo", "hello to you"])
+    step_result = run_step(step, Path(tmp_path, "step.log"), LocalRunner())
+    assert step_result.name == step.name
+    assert step_result.exit_code == 0
+    assert read_step_logs(step_result) == "hello to you\n"
+
+    echo_path = Path(which("echo")).resolve()
+    assert step_result.image_id == f"{echo_path.as_posix()}@{hash_contents(echo_path)}"
+    assert step_result.timing._is_complete()
+
+    log_path = Path(step_result.log_file)
+    assert step_result.log_digest == hash_contents(log_path)
+    assert step_result.log_size == log_path.stat().st_size
+
+
+def test_step_string_command(tmp_path):
+    step = Step(name="string command", command="echo 'hello to you'")
+    step_result = run_step(step, Path(tmp_path, "step.log"), LocalRunner())
+    assert step_result.exit_code == 0
+    assert read_step_logs(step_result) == "hello to you\n"
+
+
+def test_step_command_error(tmp_path):
+    step = Step(name="command error", command=["ls", "no_such_dir"])
+    step_result = run_step(step, Path(tmp_path, "step.log"), LocalRunner())
+    assert step_result.exit_code == 2
+    assert "no_such_dir" in read_step_logs(step_result)
+
+
+def test_step_command_not_found(tmp_path):
+    step = Step(name="command not found", command=["no_such_command"])
+    step_result = run_step(step, Path(tmp_path, "step.log"), LocalRunner())
+    assert step_result.image_id is None
+    assert step_result.exit_code == -1
+    assert "no_such_command: executable file not found" in read_step_logs(step_result)
+
+
+def test_step_no_command(tmp_path):
+    step = Step(name="no command", image="alpine")
+    step_result = run_step(step, Path(tmp_path, "step.log"), LocalRunner())
+    assert step_result.exit_code == -1
+    assert "requires a step command" in read_step_logs(step_result)
+
+    # The log digest should include the error message appended after the step.
+    assert step_result.log_digest == hash_contents(Path(step_result.log_file))
+
+
+def test_step_environment(tmp_path):
+    step = Step(
+        name="environment",
+        environment={"ENV_VAR": "foo"},
+        command=["/bin/sh", "-c", "echo $ENV_VAR"]
+    )
+    step_result = run_step(step, Path(tmp_path, "step.log"), LocalRunner())
+    assert step_result.exit_code == 0
+    assert read_step_logs(step_result) == "foo\n"
+
+
+def test_step_no_inherit_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOST_VAR", "from host")
+    step = Step(
+        name="environment",
+        environment={"PATH": "/usr/bin:/bin"},
+        command=["/bin/sh", "-c", "echo [$HOST_VAR]"]
+    )
+    step_result = run_step(step, Path(tmp_path, "step.log"), LocalRunner(inherit_environment=False))
+    assert step_result.exit_code == 0
+    assert read_step_logs(step_result) == "[]\n"
+
+
+def test_step_volumes_and_working_dir(tmp_path):
+    host_dir = Path(tmp_path, "host")
+    step = Step(
+        name="volumes",
+        volumes={host_dir.as_posix(): "/work"},
+        working_dir="/work",
+        environment={"OUT_FILE": "/work/env.txt"},
+        command=["/bin/sh", "-c", "pwd > /work/pwd.txt; echo hello > $OUT_FILE"],
+        match_out=["*.txt"]
+    )
+    step_result = run_step(step, Path(tmp_path, "step.log"), LocalRunner())
+    assert step_result.exit_code == 0
+    assert Path(host_dir, "pwd.txt").read_text() == f"{host_dir.as_posix()}\n"
+    assert Path(host_dir, "env.txt").read_text() == "hello\n"
+    assert set(step_result.files_out[host_dir.as_posix()].keys()) == {"pwd.txt", "env.txt"}
+
+
+def test_step_custom_columns(tmp_path):
+    host_dir = Path(tmp_path, "host")
+    step = Step(
+        name="custom columns",
+        volumes={host_dir.as_posix(): "/work"},
+        command=["/bin/sh", "-c", "echo 'accuracy: 0.9' > /work/summary.yaml; echo 'some notes' > /work/note.txt"],
+        match_summary=["summary.yaml", "note.txt"]
+    )
+    step_result = run_step(step, Path(tmp_path, "step.log"), LocalRunner())
+    assert step_result.exit_code == 0
+
+    summary_digest = hash_contents(Path(host_dir, "summary.yaml"))
+    note_digest = hash_contents(Path(host_dir, "note.txt"))
+    assert step_result.custom_columns == {summary_digest: {"accuracy": 0.9}, note_digest: "some notes"}
+
+
+def test_step_separate_streams(tmp_path):
+    runner = LocalRunner(log_streams="separate")
+    step = Step(name="streams", command=["/bin/sh", "-c", "echo to stdout; echo to stderr >&2"])
+    step_result = run_step(step, Path(tmp_path, "step.log"), runner)
+    assert step_result.exit_code == 0
+    with open(step_result.stdout_file) as f:
+        assert f.read() == "to stdout\n"
+    with open(step_result.stderr_file) as f:
+        assert f.read() == "to stderr\n"
+
+
+def test_step_docker_only_fields_warn(tmp_path, caplog):
+    step = Step(
+        name="docker fields",
+        gpus=True,
+        network_mode="bridge",
+        user="self",
+        command=["true"]
+    )
+    with caplog.at_level(logging.WARNING):
+        run_step(step, Path(tmp_path, "step.log"), LocalRunner())
+
+    assert "Step 'docker fields': 'gpus' is ignored by local runner." in caplog.messages
+    assert "Step 'docker fields': 'network_mode' is ignored by local runner." in caplog.messages
+    assert "Step 'docker fields': 'user' is ignored by local runner." in caplog.messages
+
+
+def test_pipeline_files_spec(fixture_path, tmp_path):
+    with open(Path(fixture_path, "files_spec.yaml")) as f:
+        pipeline = Pipeline.from_yaml(f.read())
+
+    work_dir = Path(tmp_path, "work")
+    run_recorder = RunRecorder(tmp_path)
+    args = {"work_dir": work_dir.as_posix()}
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, LocalRunner(), args)
+
+    assert len(pipeline_result.step_results) == 2
+    assert pipeline_result.step_results[0].exit_code == 0
+    assert pipeline_result.step_results[1].exit_code == 0
+    assert Path(work_dir, "file.txt").read_text() == "testing\n"
+    assert pipeline_result.step_results[1].files_out == {
+        work_dir.as_posix(): {"file.txt": hash_contents(Path(work_dir, "file.txt"))}
+    }
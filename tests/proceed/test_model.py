@@ -1,4 +1,12 @@
-from proceed.model import apply_args, Pipeline, Step
+from dataclasses import asdict
+from os import environ
+from time import perf_counter
+
+import yaml
+from pytest import mark
+
+from proceed.model import apply_args, Pipeline, Step, StepResult, Timing, ExecutionRecord
+from proceed.yaml_data import safe_dump, safe_load, YamlDumper, YamlLoader
 
 pipeline_spec = """
   version: 0.0.42
@@ -105,6 +113,99 @@ def test_yaml_collection_style():
     assert "    /dir_b_2: {bind: /bar/b2, mode: ro}\n" in pipeline_yaml
 
 
+def test_yaml_pure_python_compatible():
+    # Whether or not libyaml is available, YAML should look the same as with PyYAML's pure Python dumper.
+    dump_args = {
+        "sort_keys": False,
+        "default_flow_style": None,
+        "width": 1000
+    }
+    pipeline = Pipeline.from_yaml(pipeline_spec)
+    pipeline_dict = pipeline.to_dict()
+    pipeline_yaml = safe_dump(pipeline_dict, **dump_args)
+    assert pipeline_yaml == safe_dump(pipeline_dict, dumper=yaml.SafeDumper, **dump_args)
+    assert safe_load(pipeline_yaml) == safe_load(pipeline_yaml, loader=yaml.SafeLoader)
+    assert Pipeline.from_yaml(pipeline_yaml) == pipeline
+
+
+def test_yaml_pure_python_compatible_unicode():
+    # With allow_unicode, libyaml escapes non-BMP characters that the pure Python dumper writes as-is.
+    # The text may differ, but either loader should read either text back as the same data.
+    pipeline = Pipeline(
+        description="caf\u00e9 \u4e2d \U0001F600",
+        args={"emoji": "\U0001F680", "gothic": "\U00010348"},
+        steps=[Step(name="step \U0001F600", image="alpine", command=["echo", "\u00e9\U0001F600"])]
+    )
+    pipeline_dict = pipeline.to_dict()
+    for dump_args in [{}, {"allow_unicode": True}]:
+        default_yaml = safe_dump(pipeline_dict, **dump_args)
+        pure_python_yaml = safe_dump(pipeline_dict, dumper=yaml.SafeDumper, **dump_args)
+        for pipeline_yaml in [default_yaml, pure_python_yaml]:
+            assert safe_load(pipeline_yaml) == pipeline_dict
+            assert safe_load(pipeline_yaml, loader=yaml.SafeLoader) == pipeline_dict
+            assert Pipeline.from_yaml(pipeline_yaml) == pipeline
+
+
+@mark.skipif(not environ.get("PROCEED_BENCHMARK"), reason="set PROCEED_BENCHMARK=1 to run benchmarks")
+def test_yaml_libyaml_benchmark():
+    # Time a record with 100k file entries, with libyaml when available vs PyYAML's pure Python loader and dumper.
+    # Run with: PROCEED_BENCHMARK=1 pytest -s tests/proceed/test_model.py -k benchmark
+    pipeline = Pipeline.from_yaml(pipeline_spec)
+    files_done = {"/work": {f"data/file_{index}.txt": f"sha256:{index:064x}" for index in range(100000)}}
+    record = ExecutionRecord(
+        original=pipeline,
+        step_results=[StepResult(name="a", files_done=files_done)]
+    )
+    record_dict = record.to_dict()
+
+    timings = {}
+    for (name, loader, dumper) in [
+        ("pure python", yaml.SafeLoader, yaml.SafeDumper),
+        ("default", YamlLoader, YamlDumper)
+    ]:
+        start = perf_counter()
+        record_yaml = safe_dump(record_dict, dumper=dumper, sort_keys=False)
+        dumped = perf_counter()
+        loaded = safe_load(record_yaml, loader=loader)
+        done = perf_counter()
+        assert loaded == record_dict
+        timings[name] = (dumped - start, done - dumped)
+        print(f"{name}: dump {dumped - start:.2f}s, load {done - dumped:.2f}s")
+
+    if yaml.__with_libyaml__:
+        assert sum(timings["default"]) < sum(timings["pure python"])
+
+
+def test_to_dict_matches_asdict():
+    pipeline = Pipeline.from_yaml(pipeline_spec)
+    record = ExecutionRecord(
+        original=pipeline,
+        amended=pipeline._with_prototype_applied(),
+        timing=Timing(start="2023-01-01T00:00:00", duration=1.0),
+        step_results=[
+            StepResult(
+                name="a",
+                exit_code=0,
+                timing=Timing(duration=0.5),
+                files_out={"/foo/a1": {"out.txt": "sha256:abcd"}},
+                custom_columns={"sha256:abcd": {"x": 1}},
+            )
+        ]
+    )
+    record_dict = record.to_dict()
+    assert record_dict == asdict(record)
+    assert ExecutionRecord.from_dict(record_dict) == record
+
+    # Nested YamlData become new dicts, but other values are shared rather than deep-copied.
+    assert isinstance(record_dict["step_results"][0], dict)
+    assert record_dict["step_results"][0]["files_out"] is record.step_results[0].files_out
+
+
+def test_from_dict_ignores_unknown_keys():
+    step = Step.from_dict({"name": "a", "not_a_field": "ignore me", "command": ["command", "a"]})
+    assert step == Step(name="a", command=["command", "a"])
+
+
 def test_apply_args_to_step():
     step = Step(
         name="$name",
@@ -345,3 +446,17 @@ def test_apply_prototype_to_steps():
         ]
     )
     assert amended == expected
+
+
+def test_apply_prototype_slurm_options():
+    pipeline = Pipeline(
+        args={"minutes": "30"},
+        prototype=Step(slurm={"partition": "short", "time": "00:$minutes:00", "mem": "4G"}),
+        steps=[
+            Step(name="default"),
+            Step(name="bigger", slurm={"mem": "64G", "cpus_per_task": 8}),
+        ]
+    )
+    amended = pipeline._with_args_applied({})._with_prototype_applied()
+    assert amended.steps[0].slurm == {"partition": "short", "time": "00:30:00", "mem": "4G"}
+    assert amended.steps[1].slurm == {"partition": "short", "time": "00:30:00", "mem": "64G", "cpus_per_task": 8}
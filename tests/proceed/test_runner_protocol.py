@@ -1,8 +1,12 @@
 from os import environ
+from pathlib import Path
 
-from proceed.runner_protocol import make_runner, discover_runner
+from proceed.model import Pipeline, Step
+from proceed.run_recorder import RunRecorder
+from proceed.runner_protocol import make_runner, discover_runner, register_runner, runner_registry, run_pipeline
 from proceed.docker_runner import DockerRunner
 from proceed.slurm_runner import SlurmRunner
+from proceed.local_runner import LocalRunner
 
 
 def test_make_docker_runner():
@@ -41,3 +45,140 @@ def test_discover_no_runners_no_docker_daemon():
     }
     runner = discover_runner(docker_environment=docker_environment, slurm_srun_path=None)
     assert runner is None
+
+
+def test_make_runner_with_options():
+    runner = make_runner("docker", max_pool_size=3, max_attempts=5)
+    assert isinstance(runner, DockerRunner)
+    assert runner.max_pool_size == 3
+    assert runner.max_attempts == 5
+
+
+def test_discover_slurm_runner_with_options():
+    runner_options = {"image_cache_dir": "/cache"}
+    runner = discover_runner(docker_environment=None, slurm_srun_path="/usr/bin/true", runner_options=runner_options)
+    assert isinstance(runner, SlurmRunner)
+    assert runner.srun_path == "/usr/bin/true"
+    assert runner.image_cache_dir == "/cache"
+
+
+def test_make_local_runner():
+    runner = make_runner("local")
+    assert isinstance(runner, LocalRunner)
+
+
+def test_register_runner():
+    register_runner("custom", lambda **kwargs: LocalRunner(inherit_environment=False, **kwargs))
+    try:
+        runner = make_runner("custom", log_echo="none")
+        assert isinstance(runner, LocalRunner)
+        assert runner.inherit_environment is False
+        assert runner.log_echo == "none"
+    finally:
+        del runner_registry["custom"]
+
+
+def test_pipeline_step_runners(tmp_path):
+    pipeline = Pipeline(
+        prototype=Step(image="alpine:latest", runner="slurm"),
+        steps=[
+            Step(name="heavy", command=["echo", "heavy"]),
+            Step(name="light", command=["echo", "light"], runner="local")
+        ]
+    )
+    slurm_runner = SlurmRunner(srun_path="/usr/bin/echo", accounting=False)
+    run_recorder = RunRecorder(tmp_path)
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, None, step_runners={"slurm": slurm_runner})
+    assert [step_result.exit_code for step_result in pipeline_result.step_results] == [0, 0]
+
+    # The heavy step went to the given Slurm runner, which echoes srun args.
+    with open(pipeline_result.step_results[0].log_file) as f:
+        assert "--container-image=alpine:latest" in f.read()
+    assert pipeline_result.step_results[0].image_id == "alpine:latest"
+
+    # The light step went to a new local runner.
+    with open(pipeline_result.step_results[1].log_file) as f:
+        assert f.read() == "light\n"
+    assert "@sha256:" in pipeline_result.step_results[1].image_id
+
+
+def test_pipeline_step_runner_options(tmp_path):
+    pipeline = Pipeline(
+        steps=[
+            Step(name="quiet", image="alpine:latest", command=["echo", "quiet"], runner="custom"),
+            Step(name="also quiet", image="alpine:latest", command=["echo", "also quiet"], runner="custom")
+        ]
+    )
+    created_options = []
+
+    def make_custom_runner(**kwargs):
+        created_options.append(kwargs)
+        return LocalRunner(**kwargs)
+
+    register_runner("custom", make_custom_runner)
+    try:
+        run_recorder = RunRecorder(tmp_path)
+        runner_options = {"custom": {"log_echo": "none"}, "slurm": {"max_attempts": 3}}
+        pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, None, runner_options=runner_options)
+    finally:
+        del runner_registry["custom"]
+
+    # The named runner was created once, with its own options only, and shared by both steps.
+    assert created_options == [{"log_echo": "none"}]
+    assert [step_result.exit_code for step_result in pipeline_result.step_results] == [0, 0]
+
+
+def test_pipeline_step_runner_bad_options(tmp_path):
+    pipeline = Pipeline(
+        steps=[
+            Step(name="bad options", image="alpine:latest", command=["echo"], runner="local"),
+            Step(name="should not run", image="alpine:latest", command=["echo"])
+        ]
+    )
+    run_recorder = RunRecorder(tmp_path)
+    runner_options = {"local": {"no_such_option": True}}
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, LocalRunner(), runner_options=runner_options)
+
+    # The step fails with the runner error in its log, and the pipeline still writes its record.
+    assert len(pipeline_result.step_results) == 1
+    assert pipeline_result.step_results[0].exit_code == -1
+    with open(Path(pipeline_result.step_results[0].log_file)) as f:
+        assert "unable to create runner 'local': TypeError:" in f.read()
+    assert run_recorder.record_path.exists()
+
+
+def test_pipeline_closes_runners(tmp_path):
+    closed = []
+
+    class ClosingRunner(LocalRunner):
+        def close(self):
+            closed.append(self)
+
+    pipeline = Pipeline(
+        steps=[
+            Step(name="fails", image="alpine:latest", command=["false"]),
+            Step(name="should not run", image="alpine:latest", command=["echo"])
+        ]
+    )
+    runner = ClosingRunner()
+    run_recorder = RunRecorder(tmp_path)
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, runner)
+
+    # The runner is closed once, even when the pipeline stops early.
+    assert pipeline_result.step_results[0].exit_code != 0
+    assert closed == [runner]
+
+
+def test_pipeline_unknown_step_runner(tmp_path):
+    pipeline = Pipeline(
+        steps=[
+            Step(name="unknown", image="alpine:latest", command=["echo"], runner="NOPE"),
+            Step(name="should not run", image="alpine:latest", command=["echo"])
+        ]
+    )
+    run_recorder = RunRecorder(tmp_path)
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, LocalRunner())
+    assert len(pipeline_result.step_results) == 1
+    assert pipeline_result.step_results[0].exit_code == -1
+    with open(Path(pipeline_result.step_results[0].log_file)) as f:
+        assert "unable to create runner 'NOPE'" in f.read()
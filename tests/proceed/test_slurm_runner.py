@@ -1,11 +1,23 @@
+import sys
+import json
+import shlex
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from datetime import datetime
 
-from pytest import fixture
+from pytest import fixture, raises
 
 from proceed.model import Pipeline, Step
 from proceed.run_recorder import RunRecorder
-from proceed.runner_protocol import run_pipeline, run_step
-from proceed.slurm_runner import SlurmRunner
+from proceed.cli import main
+from proceed.model import ExecutionRecord
+from proceed.runner_protocol import finalize_pipeline, run_pipeline, run_step, submit_pipeline
+from proceed.slurm_runner import (
+    SlurmJobTracker, SlurmRunner, parse_slurm_array, parse_slurm_duration, parse_slurm_gpus, parse_slurm_memory, parse_slurm_time_limit,
+    pipeline_allocation_options
+)
+from proceed.step_logs import open_log
 
 
 @fixture
@@ -217,6 +229,23 @@ def test_step_gpus_list(success_runner, tmp_path):
     assert "--partition=cool-hardware" in logs
 
 
+def test_step_slurm_resources(success_runner, tmp_path):
+    step = Step(
+        name="resources",
+        image="alpine:latest",
+        slurm={"cpus_per_task": 4, "mem": "16G", "time": "02:00:00", "partition": "short", "nodes": 1,
+               "exclusive": True, "requeue": False},
+        command=["echo"]
+    )
+    step_result = run_step(step, Path(tmp_path, "step.log"), success_runner)
+    assert step_result.exit_code == 0
+    with open(step_result.log_file) as f:
+        logs = f.read()
+    expected_args = "--cpus-per-task=4 --mem=16G --time=02:00:00 --partition=short --nodes=1 --exclusive -- echo"
+    assert expected_args in logs
+    assert "requeue" not in logs
+
+
 def test_step_docker_only_fields_warn(success_runner, tmp_path, caplog):
     import logging
     step = Step(
@@ -279,3 +308,1049 @@ def test_pipeline_stops_on_error(failure_runner, tmp_path):
     assert pipeline_result.step_results[0].exit_code == 1
     assert pipeline_result.step_results[0].image_id == "alpine:latest"
     assert pipeline_result.step_results[0].timing._is_complete()
+
+
+def write_fake_enroot(tmp_path: Path) -> Path:
+    # Stand-in for "enroot import --output path uri" that just writes the uri to the output path.
+    fake_enroot = Path(tmp_path, "fake_enroot")
+    fake_enroot.write_text('#!/bin/sh\necho "$4" > "$3"\n')
+    fake_enroot.chmod(0o755)
+    return fake_enroot
+
+
+def write_fake_skopeo(tmp_path: Path, digest_file: Path = None) -> str:
+    # Stand-in for "skopeo inspect --format {{.Digest}} docker://image" that makes up a digest for each image,
+    # or reads the digest from a file, to simulate a tag that moves.
+    if digest_file:
+        digest_command = f'cat "{digest_file.as_posix()}"'
+    else:
+        digest_command = 'echo "sha256:$(echo "$4" | sha256sum | cut -d " " -f 1)"'
+    return write_fake_script(Path(tmp_path, "fake_skopeo"), f"#!/bin/sh\n{digest_command}\n")
+
+
+def test_pipeline_prefetch_images(tmp_path):
+    cache_dir = Path(tmp_path, "cache")
+    runner = SlurmRunner(
+        srun_path='/usr/bin/echo',
+        enroot_path=write_fake_enroot(tmp_path).as_posix(),
+        skopeo_path=write_fake_skopeo(tmp_path),
+        image_cache_dir=cache_dir.as_posix()
+    )
+    pipeline = Pipeline(
+        steps=[
+            Step(name="step 1", image="alpine:latest", command=["echo", "one"]),
+            Step(name="step 2", image="nvcr.io/nvidia/cuda:12.0-base", command=["echo", "two"]),
+            Step(name="step 3", image="alpine:latest", command=["echo", "three"]),
+        ]
+    )
+    run_recorder = RunRecorder(tmp_path)
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, runner)
+
+    assert len(pipeline_result.image_pulls) == 2
+    assert [image_pull.image for image_pull in pipeline_result.image_pulls] == ["alpine:latest", "nvcr.io/nvidia/cuda:12.0-base"]
+    for image_pull in pipeline_result.image_pulls:
+        assert image_pull.pulled
+        assert image_pull.error is None
+        assert image_pull.timing._is_complete()
+        assert image_pull.image_id.startswith("sha256:")
+
+    # Registry digests should look like Docker RepoDigests.
+    assert pipeline_result.image_pulls[0].digest.startswith("alpine@sha256:")
+    assert pipeline_result.image_pulls[1].digest.startswith("nvcr.io/nvidia/cuda@sha256:")
+
+    cuda_digest = pipeline_result.image_pulls[1].image_id
+    cuda_squashfs = Path(cache_dir, cuda_digest.replace(":", "-") + ".sqsh")
+    assert cuda_squashfs.read_text() == "docker://nvcr.io#nvidia/cuda:12.0-base\n"
+    cuda_entry = json.loads(Path(cache_dir, "nvcr.io+nvidia+cuda+12.0-base.json").read_text())
+    assert cuda_entry == {"image_id": cuda_digest, "registry_digest": pipeline_result.image_pulls[1].digest}
+
+    # Steps should use the cached squashfs file and record its digest.
+    assert pipeline_result.step_results[1].image_id == cuda_digest
+    with open(pipeline_result.step_results[1].log_file) as f:
+        logs = f.read()
+    assert f"--container-image={cuda_squashfs.as_posix()}" in logs
+
+    # A second run should find the cached squashfs files.
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, runner)
+    assert not any(image_pull.pulled for image_pull in pipeline_result.image_pulls)
+    assert pipeline_result.step_results[1].image_id == cuda_digest
+
+
+def test_step_imports_image_on_demand(tmp_path):
+    cache_dir = Path(tmp_path, "cache")
+    runner = SlurmRunner(
+        srun_path='/usr/bin/echo',
+        enroot_path=write_fake_enroot(tmp_path).as_posix(),
+        image_cache_dir=cache_dir.as_posix()
+    )
+    step = Step(name="on demand", image="alpine:latest", command=["echo", "hello"])
+    step_result = run_step(step, Path(tmp_path, "step.log"), runner)
+    assert step_result.exit_code == 0
+    assert step_result.image_id.startswith("sha256:")
+    squashfs = Path(cache_dir, step_result.image_id.replace(":", "-") + ".sqsh")
+    with open(step_result.log_file) as f:
+        assert f"--container-image={squashfs.as_posix()}" in f.read()
+
+
+def test_image_cache_shares_digests(tmp_path):
+    cache_dir = Path(tmp_path, "cache")
+    # Stand-in for enroot that writes the same content for any image.
+    fake_enroot = write_fake_script(Path(tmp_path, "fake_enroot"), '#!/bin/sh\necho "same" > "$3"\n')
+    runner = SlurmRunner(enroot_path=fake_enroot, image_cache_dir=cache_dir.as_posix())
+
+    image_pull_1 = runner.prefetch_image("alpine:3")
+    image_pull_2 = runner.prefetch_image("alpine:latest")
+    assert image_pull_1.pulled
+    assert image_pull_2.pulled
+    assert image_pull_1.digest == image_pull_2.digest
+    assert len(list(cache_dir.glob("*.sqsh"))) == 1
+    assert not list(cache_dir.glob("*.partial"))
+
+
+def test_image_cache_shares_registry_digests(tmp_path):
+    cache_dir = Path(tmp_path, "cache")
+    calls_file = Path(tmp_path, "calls.txt")
+    fake_enroot = write_fake_script(
+        Path(tmp_path, "fake_enroot"),
+        f'#!/bin/sh\necho "$4" >> "{calls_file.as_posix()}"\necho "$4" > "$3"\n'
+    )
+    digest_file = Path(tmp_path, "digest.txt")
+    digest_file.write_text("sha256:1234\n")
+    runner = SlurmRunner(
+        enroot_path=fake_enroot,
+        skopeo_path=write_fake_skopeo(tmp_path, digest_file),
+        image_cache_dir=cache_dir.as_posix()
+    )
+
+    # References with the same registry digest should share one import.
+    image_pull_1 = runner.prefetch_image("alpine:3")
+    image_pull_2 = runner.prefetch_image("alpine:latest")
+    assert image_pull_1.pulled
+    assert not image_pull_2.pulled
+    assert image_pull_1.digest == image_pull_2.digest == "alpine@sha256:1234"
+    assert image_pull_1.image_id == image_pull_2.image_id
+    assert calls_file.read_text() == "docker://alpine:3\n"
+
+
+def test_image_cache_imports_moved_tag(tmp_path):
+    cache_dir = Path(tmp_path, "cache")
+    digest_file = Path(tmp_path, "digest.txt")
+    digest_file.write_text("sha256:1234\n")
+    runner = SlurmRunner(
+        enroot_path=write_fake_enroot(tmp_path).as_posix(),
+        skopeo_path=write_fake_skopeo(tmp_path, digest_file),
+        image_cache_dir=cache_dir.as_posix()
+    )
+    assert runner.prefetch_image("alpine:latest").pulled
+    assert not runner.prefetch_image("alpine:latest").pulled
+
+    # When the tag moves to a new registry digest, the image should be imported again.
+    digest_file.write_text("sha256:5678\n")
+    image_pull = runner.prefetch_image("alpine:latest")
+    assert image_pull.pulled
+    assert image_pull.digest == "alpine@sha256:5678"
+
+
+def test_image_cache_refresh(tmp_path):
+    cache_dir = Path(tmp_path, "cache")
+    runner_args = {
+        "enroot_path": write_fake_enroot(tmp_path).as_posix(),
+        "skopeo_path": "/no/such/skopeo",
+        "image_cache_dir": cache_dir.as_posix()
+    }
+    image_pull = SlurmRunner(**runner_args).prefetch_image("alpine:latest")
+    assert image_pull.pulled
+    assert image_pull.digest is None
+
+    # Without registry digests, cached references are reused unless refreshing, once per runner.
+    assert not SlurmRunner(**runner_args).prefetch_image("alpine:latest").pulled
+    refresh_runner = SlurmRunner(image_refresh=True, **runner_args)
+    assert refresh_runner.prefetch_image("alpine:latest").pulled
+    assert not refresh_runner.prefetch_image("alpine:latest").pulled
+
+
+def test_image_cache_imports_once_concurrently(tmp_path):
+    cache_dir = Path(tmp_path, "cache")
+    calls_file = Path(tmp_path, "calls.txt")
+    # Stand-in for a slow enroot import that notes each call.
+    fake_enroot = write_fake_script(
+        Path(tmp_path, "fake_enroot"),
+        f'#!/bin/sh\necho "$4" >> "{calls_file.as_posix()}"\nsleep 0.2\necho "$4" > "$3"\n'
+    )
+    runner = SlurmRunner(enroot_path=fake_enroot, image_cache_dir=cache_dir.as_posix())
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        image_pulls = list(executor.map(runner.prefetch_image, ["alpine:latest"] * 4))
+
+    assert calls_file.read_text() == "docker://alpine:latest\n"
+    assert sum(image_pull.pulled for image_pull in image_pulls) == 1
+    assert len({image_pull.digest for image_pull in image_pulls}) == 1
+
+
+def test_pipeline_prefetch_images_error(tmp_path):
+    runner = SlurmRunner(
+        srun_path='/usr/bin/echo',
+        enroot_path='/usr/bin/false',
+        image_cache_dir=Path(tmp_path, "cache").as_posix()
+    )
+    pipeline = Pipeline(
+        steps=[
+            Step(name="step 1", image="alpine:latest", command=["echo", "one"]),
+        ]
+    )
+    run_recorder = RunRecorder(tmp_path)
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, runner)
+
+    assert len(pipeline_result.image_pulls) == 1
+    assert pipeline_result.image_pulls[0].image_id is None
+    assert "enroot import exit code 1" in pipeline_result.image_pulls[0].error
+
+    # The step should still run, letting Pyxis import the image as usual.
+    assert pipeline_result.step_results[0].exit_code == 0
+    with open(pipeline_result.step_results[0].log_file) as f:
+        logs = f.read()
+    assert "--container-image=alpine:latest" in logs
+
+
+def test_pipeline_no_prefetch_without_cache(success_runner, tmp_path):
+    pipeline = Pipeline(
+        steps=[
+            Step(name="step 1", image="alpine:latest", command=["echo", "one"]),
+        ]
+    )
+    run_recorder = RunRecorder(tmp_path)
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, success_runner)
+    assert pipeline_result.image_pulls == []
+
+
+def test_pipeline_compressed_logs(tmp_path):
+    runner = SlurmRunner(srun_path='/usr/bin/echo', log_echo="none")
+    pipeline = Pipeline(
+        steps=[
+            Step(name="step 1", image="alpine:latest", command=["echo", "one"]),
+        ]
+    )
+    run_recorder = RunRecorder(tmp_path)
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, runner, log_compression="gzip")
+
+    log_file = pipeline_result.step_results[0].log_file
+    assert log_file.endswith("step_1.log.gz")
+    with open_log(log_file, "rt") as f:
+        logs = f.read()
+    assert "echo one" in logs
+
+
+def write_fake_srun(tmp_path: Path) -> Path:
+    # Stand-in for srun that writes to both stdout and stderr.
+    fake_srun = Path(tmp_path, "fake_srun")
+    fake_srun.write_text('#!/bin/sh\necho "out $@"\necho "err one" >&2\necho "err two" >&2\n')
+    fake_srun.chmod(0o755)
+    return fake_srun
+
+
+def test_step_separate_streams(tmp_path):
+    runner = SlurmRunner(srun_path=write_fake_srun(tmp_path).as_posix(), log_streams="separate")
+    step = Step(name="streams", image="alpine:latest", command=["echo", "hello"])
+    step_result = run_step(step, Path(tmp_path, "step.log"), runner)
+    assert step_result.exit_code == 0
+    assert step_result.log_file == Path(tmp_path, "step.log").as_posix()
+    assert step_result.stdout_file == Path(tmp_path, "step.stdout.log").as_posix()
+    assert step_result.stderr_file == Path(tmp_path, "step.stderr.log").as_posix()
+
+    with open(step_result.stdout_file) as f:
+        stdout = f.read()
+    assert stdout.startswith("out ")
+    assert "err" not in stdout
+
+    with open(step_result.stderr_file) as f:
+        stderr = f.read()
+    assert stderr == "err one\nerr two\n"
+
+
+def test_step_log_timestamps(tmp_path):
+    runner = SlurmRunner(srun_path=write_fake_srun(tmp_path).as_posix(), log_streams="separate", log_timestamps=True)
+    step = Step(name="timestamps", image="alpine:latest", command=["echo", "hello"])
+    step_result = run_step(step, Path(tmp_path, "step.log"), runner)
+    assert step_result.exit_code == 0
+
+    with open(step_result.stderr_file) as f:
+        stderr_lines = f.readlines()
+    assert len(stderr_lines) == 2
+    for line, expected in zip(stderr_lines, ["err one\n", "err two\n"]):
+        (timestamp, text) = line.split(" ", maxsplit=1)
+        assert datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%fZ")
+        assert text == expected
+
+
+fake_srun_script = """#!/bin/sh
+# Stand-in for srun that skips Slurm and Pyxis options and runs the command after "--".
+while [ "$#" -gt 0 ] && [ "$1" != "--" ]; do shift; done
+shift
+exec "$@"
+"""
+
+fake_sbatch_script = """#!{python}
+# Stand-in for sbatch that runs each job or array task right away and remembers sacct rows in a state dir.
+import json, os, subprocess, sys
+from datetime import datetime
+from pathlib import Path
+state_dir = Path("{state_dir}")
+state_dir.mkdir(exist_ok=True)
+options = {{}}
+args = sys.argv[1:]
+while args:
+    arg = args.pop(0)
+    if arg == "--wrap":
+        options["wrap"] = args.pop(0)
+    elif "=" in arg:
+        (key, value) = arg[2:].split("=", 1)
+        options[key] = value
+    else:
+        options[arg[2:]] = True
+job_id = str(1000 + len(list(state_dir.glob("*.json"))))
+
+def dependency_ok(dependency):
+    (condition, *dependency_ids) = dependency.split(":")
+    if condition == "afterany":
+        return True
+    for dependency_id in dependency_ids:
+        dependency_job = json.loads(Path(state_dir, dependency_id + ".json").read_text())
+        if any(row["State"] != "COMPLETED" for row in dependency_job["rows"]):
+            return False
+    return True
+
+def run_task(job_name, log, error_log, task_env):
+    start = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    with open(log, "w") as f, open(error_log or log, "a") as e:
+        completed = subprocess.run(options["wrap"], shell=True, stdout=f, stderr=e if error_log else subprocess.STDOUT, env=task_env)
+    end = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    state = "COMPLETED" if completed.returncode == 0 else "FAILED"
+    row = {{"JobID": job_name, "State": state, "ExitCode": f"{{completed.returncode}}:0", "Submit": start, "Start": start,
+            "End": end, "Elapsed": "00:00:01", "TotalCPU": "00:00.500", "MaxRSS": "", "NodeList": "fake_node",
+            "AllocCPUS": "1", "ReqMem": "1G", "Reason": "None"}}
+    return [row, {{**row, "JobID": job_name + ".batch", "MaxRSS": "1024K"}}]
+
+rows = []
+tasks = {{}}
+if "dependency" in options and not dependency_ok(options["dependency"]):
+    now = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    rows.append({{"JobID": job_id, "State": "CANCELLED by 0", "ExitCode": "0:0", "Submit": now, "Start": "None", "End": now,
+                 "Elapsed": "00:00:00", "TotalCPU": "00:00:00", "MaxRSS": "", "NodeList": "None assigned",
+                 "AllocCPUS": "0", "ReqMem": "1G", "Reason": "DependencyNeverSatisfied"}})
+elif "array" in options:
+    (first, last) = options["array"].split("%")[0].split("-")
+    for task_id in range(int(first), int(last) + 1):
+        task_log = options["output"].replace("%a", str(task_id)).replace("%A", job_id)
+        task_env = {{**os.environ, "SLURM_ARRAY_JOB_ID": job_id, "SLURM_ARRAY_TASK_ID": str(task_id)}}
+        task_rows = run_task(f"{{job_id}}_{{task_id}}", task_log, None, task_env)
+        tasks[task_id] = int(task_rows[0]["ExitCode"].split(":")[0])
+        rows.extend(task_rows)
+else:
+    rows.extend(run_task(job_id, options["output"], options.get("error"), {{**os.environ, "SLURM_JOB_ID": job_id}}))
+Path(state_dir, job_id + ".json").write_text(json.dumps({{"options": options, "tasks": tasks, "rows": rows}}))
+print(job_id + ";fake_cluster")
+"""
+
+fake_sacct_script = """#!{python}
+# Stand-in for sacct that reports job and array task results from the fake sbatch state dir.
+import json, sys
+from pathlib import Path
+job_id = [arg.split("=")[1] for arg in sys.argv if arg.startswith("--jobs=")][0]
+field_names = [arg.split("=")[1] for arg in sys.argv if arg.startswith("--format=")][0].split(",")
+job = json.loads(Path("{state_dir}", job_id + ".json").read_text())
+for row in job["rows"]:
+    print("|".join(row[field_name] for field_name in field_names))
+"""
+
+
+def write_fake_script(path: Path, script: str) -> str:
+    path.write_text(script)
+    path.chmod(0o755)
+    return path.as_posix()
+
+
+@fixture
+def fake_slurm_runner(tmp_path):
+    # Runner that uses stand-ins for Slurm commands, which run everything locally.
+    fake_bin = Path(tmp_path, "fake_bin")
+    fake_bin.mkdir()
+    state_dir = Path(tmp_path, "fake_slurm_state")
+    format_args = {"python": sys.executable, "state_dir": state_dir.as_posix()}
+    return SlurmRunner(
+        srun_path=write_fake_script(Path(fake_bin, "srun"), fake_srun_script),
+        sbatch_path=write_fake_script(Path(fake_bin, "sbatch"), fake_sbatch_script.format(**format_args)),
+        squeue_path="/usr/bin/true",
+        sacct_path=write_fake_script(Path(fake_bin, "sacct"), fake_sacct_script.format(**format_args)),
+        poll_interval=0.01
+    )
+
+
+def test_step_array_success(fake_slurm_runner, tmp_path):
+    step = Step(
+        name="fan out",
+        image="alpine:latest",
+        array="0-4",
+        command=["/bin/sh", "-c", "echo shard $SLURM_ARRAY_TASK_ID"]
+    )
+    step_result = run_step(step, Path(tmp_path, "fan_out.log"), fake_slurm_runner)
+    assert step_result.exit_code == 0
+    assert step_result.image_id == "alpine:latest"
+    assert len(step_result.array_tasks) == 5
+    for index, task in enumerate(step_result.array_tasks):
+        assert task.task_id == str(index)
+        assert task.exit_code == 0
+        assert task.state == "COMPLETED"
+        assert task.log_file == Path(tmp_path, f"fan_out.task_{index}.log").as_posix()
+        with open(task.log_file) as f:
+            assert f.read() == f"shard {index}\n"
+
+    with open(step_result.log_file) as f:
+        logs = f.read()
+    assert "Submitted array job 1000 with tasks 0-4" in logs
+    assert "Task 4: COMPLETED with exit code 0" in logs
+
+
+def test_step_array_task_errors(fake_slurm_runner, tmp_path):
+    step = Step(
+        name="fan out errors",
+        image="alpine:latest",
+        array="0-3",
+        command=["/bin/sh", "-c", "exit $((SLURM_ARRAY_TASK_ID % 2 * 7))"]
+    )
+    step_result = run_step(step, Path(tmp_path, "fan_out.log"), fake_slurm_runner)
+    assert step_result.exit_code == 7
+    assert [task.exit_code for task in step_result.array_tasks] == [0, 7, 0, 7]
+    assert [task.state for task in step_result.array_tasks] == ["COMPLETED", "FAILED", "COMPLETED", "FAILED"]
+
+
+def test_step_array_missing_tasks(fake_slurm_runner, tmp_path):
+    # Stand-in for sacct that lags behind, with no records for the array job yet.
+    fake_slurm_runner.sacct_path = write_fake_script(Path(tmp_path, "lagging_sacct"), "#!/bin/sh\n")
+    fake_slurm_runner.accounting_retries = 2
+    fake_slurm_runner.accounting_delay = 0.01
+    step = Step(name="fan out", image="alpine:latest", array="0-3", command=["echo", "hello"])
+    step_result = run_step(step, Path(tmp_path, "fan_out.log"), fake_slurm_runner)
+
+    # Without results for every task, the step should not count as a success.
+    assert step_result.exit_code == -1
+    assert step_result.array_tasks == []
+    with open(step_result.log_file) as f:
+        assert "No Slurm accounting found for tasks: [0, 1, 2, 3]" in f.read()
+
+
+def test_parse_slurm_array():
+    assert parse_slurm_array("0-4") == [0, 1, 2, 3, 4]
+    assert parse_slurm_array("1,3,5-7") == [1, 3, 5, 6, 7]
+    assert parse_slurm_array("0-15:4%2") == [0, 4, 8, 12]
+    assert parse_slurm_array(7) == [7]
+    with raises(ValueError):
+        parse_slurm_array("first-last")
+
+
+def test_step_array_sbatch_args(fake_slurm_runner, tmp_path):
+    step = Step(
+        name="fan out args",
+        image="alpine:latest",
+        array="0-1%1",
+        environment={"FOO": "bar"},
+        command=["echo", "hello world"]
+    )
+    step_result = run_step(step, Path(tmp_path, "fan_out.log"), fake_slurm_runner)
+    assert step_result.exit_code == 0
+
+    state_file = Path(tmp_path, "fake_slurm_state", "1000.json")
+    options = json.loads(state_file.read_text())["options"]
+    assert options["parsable"]
+    assert options["array"] == "0-1%1"
+    assert options["job-name"] == "fan out args"
+    assert options["output"] == Path(tmp_path, "fan_out.task_%a.log").as_posix()
+    wrap_args = shlex.split(options["wrap"])
+    assert "--container-image=alpine:latest" in wrap_args
+    assert "--export=FOO=bar" in wrap_args
+    assert wrap_args[-3:] == ["--", "echo", "hello world"]
+
+
+def test_step_array_slurm_resources(fake_slurm_runner, tmp_path):
+    step = Step(
+        name="fan out resources",
+        image="alpine:latest",
+        array="0-1",
+        slurm={"cpus_per_task": 2, "mem": "1G"},
+        command=["echo", "hello"]
+    )
+    step_result = run_step(step, Path(tmp_path, "fan_out.log"), fake_slurm_runner)
+    assert step_result.exit_code == 0
+
+    state_file = Path(tmp_path, "fake_slurm_state", "1000.json")
+    options = json.loads(state_file.read_text())["options"]
+    assert options["cpus-per-task"] == "2"
+    assert options["mem"] == "1G"
+
+    # The inner srun runs within the sbatch allocation, without repeating the resource requests.
+    assert "--cpus-per-task=2" not in shlex.split(options["wrap"])
+
+
+def test_step_array_sbatch_not_found(tmp_path):
+    runner = SlurmRunner(sbatch_path="/no/such/sbatch")
+    step = Step(name="fan out", image="alpine:latest", array="0-4", command=["echo"])
+    step_result = run_step(step, Path(tmp_path, "step.log"), runner)
+    assert step_result.exit_code == -1
+    with open(step_result.log_file) as f:
+        logs = f.read()
+    assert "FileNotFoundError" in logs
+
+
+def test_submit_and_finalize_pipeline(fake_slurm_runner, tmp_path):
+    work_dir = Path(tmp_path, "work")
+    pipeline = Pipeline(
+        steps=[
+            Step(name="a", image="alpine:latest", volumes={work_dir.as_posix(): "/work"},
+                 command=["/bin/sh", "-c", f"echo a > {work_dir.as_posix()}/a.txt"], match_out=["*.txt"]),
+            Step(name="b", image="alpine:latest", volumes={work_dir.as_posix(): "/work"},
+                 command=["echo", "b"], match_in=["a.txt"])
+        ]
+    )
+    execution_path = Path(tmp_path, "execution")
+    execution_path.mkdir()
+    run_recorder = RunRecorder(execution_path)
+    submitted = submit_pipeline(pipeline, execution_path, run_recorder, fake_slurm_runner)
+
+    assert [step_result.job_id for step_result in submitted.step_results] == ["1000", "1001"]
+    assert all(step_result.exit_code is None for step_result in submitted.step_results)
+    with open(run_recorder.record_path) as f:
+        assert ExecutionRecord.from_yaml(f.read()) == submitted
+
+    options = json.loads(Path(tmp_path, "fake_slurm_state", "1001.json").read_text())["options"]
+    assert options["dependency"] == "afterok:1000"
+    assert options["kill-on-invalid-dep"] == "yes"
+    assert options["output"] == Path(execution_path, "b.log").as_posix()
+
+    finalized = finalize_pipeline(submitted, run_recorder, fake_slurm_runner)
+    assert [step_result.exit_code for step_result in finalized.step_results] == [0, 0]
+    assert finalized.step_results[0].slurm_accounting.job_id == "1000"
+    assert finalized.step_results[0].slurm_accounting.step_ids == ["1000.batch"]
+    assert finalized.step_results[0].slurm_accounting.max_rss == 1024 * 1024
+    assert finalized.step_results[0].files_out == {work_dir.as_posix(): {"a.txt": "sha256:87428fc522803d31065e7bce3cf03fe475096631e5e07bbd7a0fde60c4cf25c7"}}
+    assert finalized.step_results[1].files_in == finalized.step_results[0].files_out
+    assert finalized.step_results[1].timing.duration >= 0
+    with open(finalized.step_results[1].log_file) as f:
+        assert f.read() == "b\n"
+    with open(run_recorder.record_path) as f:
+        assert ExecutionRecord.from_yaml(f.read()) == finalized
+
+
+def test_submit_and_finalize_pipeline_error(fake_slurm_runner, tmp_path):
+    pipeline = Pipeline(
+        steps=[
+            Step(name="a", image="alpine:latest", command=["echo", "a"]),
+            Step(name="b", image="alpine:latest", command=["/bin/sh", "-c", "exit 3"]),
+            Step(name="c", image="alpine:latest", command=["echo", "c"])
+        ]
+    )
+    run_recorder = RunRecorder(tmp_path)
+    submitted = submit_pipeline(pipeline, tmp_path, run_recorder, fake_slurm_runner)
+    assert len(submitted.step_results) == 3
+
+    # Step "c" was cancelled without starting, so it's omitted.
+    finalized = finalize_pipeline(submitted, run_recorder, fake_slurm_runner)
+    assert [step_result.name for step_result in finalized.step_results] == ["a", "b"]
+    assert [step_result.exit_code for step_result in finalized.step_results] == [0, 3]
+
+
+def lagging_sacct(tmp_path: Path, sacct_path: str, lag_count: int) -> str:
+    # Stand-in for sacct that has no records for the first few queries, then catches up.
+    counter_file = Path(tmp_path, "sacct_count.txt")
+    script = (
+        f'#!/bin/sh\ncount=$(cat "{counter_file.as_posix()}" 2>/dev/null || echo 0)\n'
+        f'echo $((count + 1)) > "{counter_file.as_posix()}"\n'
+        f'if [ "$count" -lt {lag_count} ]; then exit 0; fi\n'
+        f'exec "{sacct_path}" "$@"\n'
+    )
+    return write_fake_script(Path(tmp_path, "lagging_sacct"), script)
+
+
+def test_finalize_pipeline_accounting_lag(fake_slurm_runner, tmp_path):
+    pipeline = Pipeline(
+        steps=[
+            Step(name="a", image="alpine:latest", command=["echo", "a"]),
+            Step(name="b", image="alpine:latest", array="0-1", command=["echo", "b"])
+        ]
+    )
+    run_recorder = RunRecorder(tmp_path)
+    submitted = submit_pipeline(pipeline, tmp_path, run_recorder, fake_slurm_runner)
+
+    # Finalizing should wait for accounting to catch up, rather than dropping steps as never started.
+    fake_slurm_runner.sacct_path = lagging_sacct(tmp_path, fake_slurm_runner.sacct_path, 2)
+    fake_slurm_runner.accounting_delay = 0.01
+    finalized = finalize_pipeline(submitted, run_recorder, fake_slurm_runner)
+    assert [step_result.name for step_result in finalized.step_results] == ["a", "b"]
+    assert [step_result.exit_code for step_result in finalized.step_results] == [0, 0]
+    assert len(finalized.step_results[1].array_tasks) == 2
+
+
+def test_finalize_pipeline_accounting_missing(fake_slurm_runner, tmp_path):
+    pipeline = Pipeline(steps=[Step(name="a", image="alpine:latest", command=["echo", "a"])])
+    run_recorder = RunRecorder(tmp_path)
+    submitted = submit_pipeline(pipeline, tmp_path, run_recorder, fake_slurm_runner)
+
+    # A step with no accounting at all should be kept as an error, not dropped as never started.
+    fake_slurm_runner.sacct_path = "/usr/bin/true"
+    fake_slurm_runner.accounting_retries = 2
+    fake_slurm_runner.accounting_delay = 0.01
+    finalized = finalize_pipeline(submitted, run_recorder, fake_slurm_runner)
+    assert [step_result.name for step_result in finalized.step_results] == ["a"]
+    assert finalized.step_results[0].exit_code == -1
+    assert finalized.step_results[0].timing == submitted.step_results[0].timing
+
+
+def test_finalize_pipeline_sacct_error(fake_slurm_runner, tmp_path):
+    pipeline = Pipeline(steps=[Step(name="a", image="alpine:latest", command=["echo", "a"])])
+    run_recorder = RunRecorder(tmp_path)
+    submitted = submit_pipeline(pipeline, tmp_path, run_recorder, fake_slurm_runner)
+
+    # If sacct keeps failing, finalizing should still write a record, with the error in the step log.
+    failing_sacct = '#!/bin/sh\necho "slurmdbd: connection refused" >&2\nexit 1\n'
+    fake_slurm_runner.sacct_path = write_fake_script(Path(tmp_path, "failing_sacct"), failing_sacct)
+    fake_slurm_runner.accounting_retries = 2
+    fake_slurm_runner.accounting_delay = 0.01
+    finalized = finalize_pipeline(submitted, run_recorder, fake_slurm_runner)
+    assert [step_result.name for step_result in finalized.step_results] == ["a"]
+    assert finalized.step_results[0].exit_code == -1
+    assert ExecutionRecord.from_yaml(run_recorder.record_path.read_text()) == finalized
+    with open(finalized.step_results[0].log_file) as f:
+        assert "Unable to query Slurm accounting for job 1000: CalledProcessError:" in f.read()
+
+    # Likewise if sacct is missing.
+    fake_slurm_runner.sacct_path = Path(tmp_path, "no_such_sacct").as_posix()
+    finalized = finalize_pipeline(submitted, run_recorder, fake_slurm_runner)
+    assert finalized.step_results[0].exit_code == -1
+    with open(finalized.step_results[0].log_file) as f:
+        assert "FileNotFoundError" in f.read()
+
+
+def test_submit_pipeline_skips_done_steps(fake_slurm_runner, tmp_path):
+    progress_file = Path(tmp_path, "progress.txt")
+    progress_file.with_name("progress.txt.done").touch()
+    pipeline = Pipeline(
+        steps=[
+            Step(name="a", image="alpine:latest", command=["echo", "a"], progress_file=progress_file.as_posix()),
+            Step(name="b", image="alpine:latest", command=["echo", "b"])
+        ]
+    )
+    run_recorder = RunRecorder(tmp_path)
+    submitted = submit_pipeline(pipeline, tmp_path, run_recorder, fake_slurm_runner)
+    assert submitted.step_results[0].skipped
+    assert submitted.step_results[0].job_id is None
+    assert submitted.step_results[1].job_id == "1000"
+
+    options = json.loads(Path(tmp_path, "fake_slurm_state", "1000.json").read_text())["options"]
+    assert "dependency" not in options
+
+
+def test_cli_detach(fake_slurm_runner, tmp_path):
+    spec = Path(tmp_path, "spec.yaml")
+    spec.write_text(Pipeline(
+        steps=[
+            Step(name="a", image="alpine:latest", command=["echo", "a"]),
+            Step(name="b", image="alpine:latest", command=["echo", "b"])
+        ]
+    ).to_yaml())
+    runner_options = [
+        f"srun_path={fake_slurm_runner.srun_path}",
+        f"sbatch_path={fake_slurm_runner.sbatch_path}",
+        f"sacct_path={fake_slurm_runner.sacct_path}"
+    ]
+    cli_args = ["run", spec.as_posix(),
+                "--results-dir", tmp_path.as_posix(),
+                "--results-id", "detached",
+                "--runner", "slurm",
+                "--runner-options", *runner_options,
+                "--detach"]
+    exit_code = main(cli_args)
+    assert exit_code == 0
+
+    # The fake sbatch ran the finalizer job right away, as job 1002 after the two steps.
+    options = json.loads(Path(tmp_path, "fake_slurm_state", "1002.json").read_text())["options"]
+    assert options["dependency"] == "afterany:1000:1001"
+    wrap_args = shlex.split(options["wrap"])
+    assert wrap_args[1:4] == ["-m", "proceed", "finalize"]
+
+    execution_path = Path(tmp_path, "spec", "detached")
+    with open(Path(execution_path, "execution_record.yaml")) as f:
+        execution_record = ExecutionRecord.from_yaml(f.read())
+    assert [step_result.exit_code for step_result in execution_record.step_results] == [0, 0]
+    assert execution_record.timing.finish is not None
+
+
+def test_cli_detach_log_compression(fake_slurm_runner, tmp_path):
+    spec = Path(tmp_path, "spec.yaml")
+    spec.write_text(Pipeline(steps=[Step(name="a", image="alpine:latest", command=["echo", "a"])]).to_yaml())
+    cli_args = ["run", spec.as_posix(),
+                "--results-dir", tmp_path.as_posix(),
+                "--runner", "slurm",
+                "--runner-options", f"sbatch_path={fake_slurm_runner.sbatch_path}",
+                "--detach",
+                "--log-compression", "gzip"]
+    exit_code = main(cli_args)
+    assert exit_code == -2
+
+    # Nothing should have been submitted.
+    assert not Path(tmp_path, "fake_slurm_state").exists()
+
+
+fake_squeue_script = """#!{python}
+# Stand-in for squeue that logs each query and reports the jobs listed in a "queued" file.
+import sys
+from pathlib import Path
+with open("{calls_file}", "a") as f:
+    f.write(" ".join(sys.argv[1:]) + "\\n")
+queued_file = Path("{queued_file}")
+if queued_file.exists():
+    print(queued_file.read_text(), end="")
+"""
+
+
+def test_job_tracker_batches_queries(tmp_path):
+    calls_file = Path(tmp_path, "calls.txt")
+    queued_file = Path(tmp_path, "queued.txt")
+    queued_file.write_text("100_[0-3]\n101\n102\n")
+    format_args = {"python": sys.executable, "calls_file": calls_file.as_posix(), "queued_file": queued_file.as_posix()}
+    squeue_path = write_fake_script(Path(tmp_path, "squeue"), fake_squeue_script.format(**format_args))
+    tracker = SlurmJobTracker(squeue_path, poll_interval=0.05, max_poll_interval=0.1)
+
+    events = [tracker.track(job_id) for job_id in ["100", "101", "102"]]
+    time.sleep(0.2)
+    assert not any(event.is_set() for event in events)
+    assert tracker.tracked_job_ids() == ["100", "101", "102"]
+
+    queued_file.write_text("101\n")
+    assert tracker.wait_for_job("100", timeout=5)
+    assert tracker.wait_for_job("102", timeout=5)
+    assert not events[1].is_set()
+
+    queued_file.write_text("")
+    assert tracker.wait_for_job("101", timeout=5)
+    assert tracker.tracked_job_ids() == []
+
+    # Each poll queried all the tracked jobs at once.
+    calls = calls_file.read_text().splitlines()
+    assert "--noheader --format=%i --jobs=100,101,102" in calls
+    assert len(calls) < 20
+
+
+def test_job_tracker_backs_off_on_error(tmp_path):
+    squeue_path = write_fake_script(Path(tmp_path, "squeue"), "#!/bin/sh\necho 'Socket timed out' >&2\nexit 1\n")
+    tracker = SlurmJobTracker(squeue_path, poll_interval=0.01, max_poll_interval=0.04, backoff=2.0)
+    assert not tracker.wait_for_job("100", timeout=0.2)
+    assert tracker._current_interval == 0.04
+    assert tracker.tracked_job_ids() == ["100"]
+
+    tracker.untrack("100")
+    assert tracker.tracked_job_ids() == []
+
+
+def test_job_tracker_invalid_job_id(tmp_path):
+    squeue_path = write_fake_script(Path(tmp_path, "squeue"), "#!/bin/sh\necho 'Invalid job id specified' >&2\nexit 1\n")
+    tracker = SlurmJobTracker(squeue_path, poll_interval=0.01)
+    assert tracker.wait_for_job("100", timeout=5)
+
+
+def test_step_remote_file_matching(tmp_path):
+    calls_file = Path(tmp_path, "calls.txt")
+    # Stand-in for srun that notes each call, then runs the command after "--".
+    fake_srun = write_fake_script(
+        Path(tmp_path, "fake_srun"),
+        f'#!/bin/sh\necho "$@" >> "{calls_file.as_posix()}"\nwhile [ "$1" != "--" ]; do shift; done\nshift\nexec "$@"\n'
+    )
+    runner = SlurmRunner(srun_path=fake_srun, remote_file_matching=True)
+    work_dir = Path(tmp_path, "work")
+    work_dir.mkdir()
+    Path(work_dir, "in.txt").write_text("in\n")
+    step = Step(
+        name="remote files",
+        image="alpine:latest",
+        volumes={work_dir.as_posix(): "/work"},
+        command=["/bin/sh", "-c", f"echo out > {work_dir.as_posix()}/out.txt"],
+        match_in=["in.txt"],
+        match_out=["out.txt"]
+    )
+    step_result = run_step(step, Path(tmp_path, "step.log"), runner)
+    assert step_result.exit_code == 0
+    assert step_result.files_in == {work_dir.as_posix(): {"in.txt": "sha256:ab5080369a968a3638a5a5e0df9932a3656766bec904667f72438fd49cd515b0"}}
+    assert list(step_result.files_out[work_dir.as_posix()].keys()) == ["out.txt"]
+
+    calls = calls_file.read_text().splitlines()
+    matching_calls = [call for call in calls if "proceed.file_matching" in call]
+    assert len(matching_calls) == 2
+    assert matching_calls[0].endswith(f"--dirs {work_dir.as_posix()} --patterns in.txt")
+
+
+def test_step_remote_file_matching_in_step_allocation(tmp_path):
+    calls_file = Path(tmp_path, "calls.txt")
+    fake_salloc = write_fake_script(
+        Path(tmp_path, "salloc"),
+        f'#!/bin/sh\necho "salloc $@" >> "{calls_file.as_posix()}"\necho "salloc: Granted job allocation 4000" >&2\n'
+    )
+    fake_scancel = write_fake_script(Path(tmp_path, "scancel"), f'#!/bin/sh\necho "scancel $@" >> "{calls_file.as_posix()}"\n')
+    fake_srun = write_fake_script(
+        Path(tmp_path, "fake_srun"),
+        f'#!/bin/sh\necho "srun $@" >> "{calls_file.as_posix()}"\nwhile [ "$1" != "--" ]; do shift; done\nshift\nexec "$@"\n'
+    )
+    runner = SlurmRunner(srun_path=fake_srun, salloc_path=fake_salloc, scancel_path=fake_scancel, remote_file_matching=True)
+    work_dir = Path(tmp_path, "work")
+    work_dir.mkdir()
+    Path(work_dir, "in.txt").write_text("in\n")
+    step = Step(
+        name="remote files",
+        image="alpine:latest",
+        volumes={work_dir.as_posix(): "/work"},
+        command=["/bin/sh", "-c", f"echo out > {work_dir.as_posix()}/out.txt"],
+        match_done=["done.txt"],
+        match_in=["in.txt"],
+        match_out=["out.txt"],
+        match_summary=["*.yaml"],
+        slurm={"partition": "short", "cpus_per_task": 4}
+    )
+    step_result = run_step(step, Path(tmp_path, "step.log"), runner)
+    assert step_result.exit_code == 0
+    assert step_result.job_id == "4000"
+    assert list(step_result.files_in[work_dir.as_posix()].keys()) == ["in.txt"]
+    assert list(step_result.files_out[work_dir.as_posix()].keys()) == ["out.txt"]
+
+    # The step waits in the queue once, for its own allocation, then file matching and the step run within it.
+    calls = calls_file.read_text().splitlines()
+    assert calls[0] == "salloc --no-shell --job-name=remote files --partition=short --cpus-per-task=4"
+    assert calls[-1] == "scancel 4000"
+    srun_calls = calls[1:-1]
+    assert len(srun_calls) == 5
+    assert all(call.startswith("srun ") and "--jobid=4000" in call.split() for call in srun_calls)
+    assert len([call for call in srun_calls if "proceed.file_matching" in call]) == 4
+
+
+def test_step_remote_file_matching_placement(tmp_path):
+    calls_file = Path(tmp_path, "calls.txt")
+    fake_srun = write_fake_script(
+        Path(tmp_path, "fake_srun"),
+        f'#!/bin/sh\necho "$@" >> "{calls_file.as_posix()}"\nwhile [ "$1" != "--" ]; do shift; done\nshift\nexec "$@"\n'
+    )
+    runner = SlurmRunner(srun_path=fake_srun, remote_file_matching=True)
+    work_dir = Path(tmp_path, "work")
+    work_dir.mkdir()
+    step = Step(name="placed", slurm={"partition": "short", "account": "lab", "cpus_per_task": 8})
+
+    # Without an allocation, matching runs where the step's jobs would run, but without the step's resources.
+    runner.match_patterns_in_dirs([work_dir.as_posix()], ["*.txt"], step)
+    call = calls_file.read_text().splitlines()[-1].split()
+    assert "--partition=short" in call
+    assert "--account=lab" in call
+    assert "--cpus-per-task=8" not in call
+    assert not any(arg.startswith("--jobid") for arg in call)
+
+    # Within an allocation, matching runs as a job step in the allocation.
+    runner.allocation_id = "3000"
+    runner.match_patterns_in_dirs([work_dir.as_posix()], ["*.txt"], step)
+    call = calls_file.read_text().splitlines()[-1].split()
+    assert "--jobid=3000" in call
+    assert "--partition=short" not in call
+
+
+def test_step_remote_file_matching_fallback(tmp_path):
+    runner = SlurmRunner(srun_path="/usr/bin/echo", remote_file_matching=True)
+    work_dir = Path(tmp_path, "work")
+    work_dir.mkdir()
+    Path(work_dir, "in.txt").write_text("in\n")
+    files_in = runner.match_patterns_in_dirs([work_dir.as_posix()], ["in.txt"])
+    assert list(files_in[work_dir.as_posix()].keys()) == ["in.txt"]
+
+
+def test_parse_slurm_duration():
+    assert parse_slurm_duration("00:00:05") == 5.0
+    assert parse_slurm_duration("01:02:03") == 3723.0
+    assert parse_slurm_duration("02:03.250") == 123.25
+    assert parse_slurm_duration("1-00:00:01") == 86401.0
+    assert parse_slurm_duration("") is None
+    assert parse_slurm_duration("UNLIMITED") is None
+
+
+def test_parse_slurm_memory():
+    assert parse_slurm_memory("0") == 0
+    assert parse_slurm_memory("1234K") == 1234 * 1024
+    assert parse_slurm_memory("1.5G") == int(1.5 * 1024 ** 3)
+    assert parse_slurm_memory("") is None
+    assert parse_slurm_memory("512", default_unit="M") == 512 * 1024 ** 2
+
+
+def test_parse_slurm_time_limit():
+    assert parse_slurm_time_limit(30) == 30 * 60
+    assert parse_slurm_time_limit("30:15") == 30 * 60 + 15
+    assert parse_slurm_time_limit("01:02:03") == 3723
+    assert parse_slurm_time_limit("2-12") == (2 * 24 + 12) * 60 * 60
+    assert parse_slurm_time_limit("2-12:30") == ((2 * 24 + 12) * 60 + 30) * 60
+    assert parse_slurm_time_limit("1-00:00:01") == 86401
+    assert parse_slurm_time_limit("UNLIMITED") is None
+    with raises(ValueError):
+        parse_slurm_time_limit("an hour")
+
+
+def test_parse_slurm_gpus():
+    assert parse_slurm_gpus(2) == {None: 2}
+    assert parse_slurm_gpus("a100:2") == {"a100": 2}
+    assert parse_slurm_gpus("a100:2,v100:1") == {"a100": 2, "v100": 1}
+    with raises(ValueError):
+        parse_slurm_gpus("a100")
+
+
+fake_accounting_sacct_script = """#!/bin/sh
+# Stand-in for sacct that notes its args and reports the same accounting for any job.
+echo "$@" > "{args_file}"
+echo "2001|COMPLETED|2024-01-31T12:00:00|2024-01-31T12:00:30|00:01:40|03:20.500||node[01-02]|4|16G"
+echo "2001.extern|COMPLETED|2024-01-31T12:00:00|2024-01-31T12:00:30|00:01:40|00:00:00|1024K|node[01-02]|4|"
+echo "2001.0|COMPLETED|2024-01-31T12:00:00|2024-01-31T12:00:30|00:01:40|03:20.500|2G|node[01-02]|4|"
+"""
+
+
+def test_step_slurm_accounting(tmp_path):
+    args_file = Path(tmp_path, "sacct_args.txt")
+    sacct_script = fake_accounting_sacct_script.format(args_file=args_file.as_posix())
+    runner = SlurmRunner(srun_path="/usr/bin/echo", sacct_path=write_fake_script(Path(tmp_path, "sacct"), sacct_script))
+    step = Step(name="accounted", image="alpine:latest", command=["echo"])
+    step_result = run_step(step, Path(tmp_path, "step.log"), runner)
+    assert step_result.exit_code == 0
+    assert step_result.job_id == "2001"
+
+    slurm_accounting = step_result.slurm_accounting
+    assert slurm_accounting.job_id == "2001"
+    assert slurm_accounting.step_ids == ["2001.extern", "2001.0"]
+    assert slurm_accounting.state == "COMPLETED"
+    assert slurm_accounting.alloc_cpus == 4
+    assert slurm_accounting.req_mem == "16G"
+    assert slurm_accounting.elapsed == 100.0
+    assert slurm_accounting.total_cpu == 200.5
+    assert slurm_accounting.max_rss == 2 * 1024 ** 3
+    assert slurm_accounting.queue_wait == 30.0
+
+    # sacct should look up the job by the unique job name given to srun.
+    with open(step_result.log_file) as f:
+        job_name_arg = [arg for arg in f.read().split() if arg.startswith("--job-name=accounted.")][0]
+    sacct_args = args_file.read_text().split()
+    assert f"--name={job_name_arg.split('=')[1]}" in sacct_args
+
+
+def test_step_slurm_accounting_not_found(tmp_path):
+    runner = SlurmRunner(
+        srun_path="/usr/bin/echo",
+        sacct_path="/usr/bin/true",
+        accounting_retries=2,
+        accounting_delay=0.01
+    )
+    step = Step(name="unaccounted", image="alpine:latest", command=["echo"])
+    step_result = run_step(step, Path(tmp_path, "step.log"), runner)
+    assert step_result.exit_code == 0
+    assert step_result.job_id is None
+    assert step_result.slurm_accounting is None
+
+
+def test_pipeline_allocation_options():
+    steps = [
+        Step(name="a", slurm={"cpus_per_task": 2, "mem": "8G", "time": "01:00:00", "partition": "short"}),
+        Step(name="b", slurm={"cpus-per-task": 8, "mem": "512M", "time": 30, "partition": "short"}),
+        Step(name="c", slurm={"mem": "16G", "time": "1-00:00:00", "partition": "long"}),
+        Step(name="fan out", array="0-9", slurm={"cpus_per_task": 64})
+    ]
+    options = pipeline_allocation_options(steps)
+    assert options == {"cpus_per_task": 8, "mem": "16G", "time": "1-01:30:00"}
+
+    # Without a time for every step, leave the time up to Slurm.
+    assert "time" not in pipeline_allocation_options(steps[0:2] + [Step(name="d", slurm={"mem": "1G"})])
+
+
+def test_pipeline_allocation_options_slurm_syntax():
+    steps = [
+        Step(name="a", slurm={"gpus": "a100:2", "nodes": "1-2", "mem": 2048, "time": "2-12"}),
+        Step(name="b", slurm={"gpus": "a100:1,v100:1", "nodes": 2, "mem": "1G", "time": "30"}),
+    ]
+    options = pipeline_allocation_options(steps)
+    assert options == {"gpus": "a100:2,v100:1", "nodes": 2, "mem": 2048, "time": "2-12:30:00"}
+
+    # Step GPUs need GPUs in the allocation, too.
+    gpu_steps = [Step(name="a", gpus=True), Step(name="b", gpus="a100:2"), Step(name="c", gpus=["--gpus=3"])]
+    assert pipeline_allocation_options(gpu_steps) == {"gpus_per_node": "1,a100:2", "gpus": 3}
+
+    # Any unlimited step makes the whole allocation unlimited.
+    assert pipeline_allocation_options(steps + [Step(name="c", slurm={"time": "UNLIMITED"})])["time"] == "UNLIMITED"
+
+
+def test_pipeline_in_allocation(tmp_path):
+    calls_file = Path(tmp_path, "calls.txt")
+    fake_salloc = write_fake_script(
+        Path(tmp_path, "salloc"),
+        f'#!/bin/sh\necho "salloc $@" >> "{calls_file.as_posix()}"\necho "salloc: Granted job allocation 3000" >&2\n'
+    )
+    fake_scancel = write_fake_script(
+        Path(tmp_path, "scancel"),
+        f'#!/bin/sh\necho "scancel $@" >> "{calls_file.as_posix()}"\n'
+    )
+    runner = SlurmRunner(
+        srun_path="/usr/bin/echo",
+        salloc_path=fake_salloc,
+        scancel_path=fake_scancel,
+        allocate=True,
+        allocation={"account": "lab"}
+    )
+    pipeline = Pipeline(
+        steps=[
+            Step(name="a", image="alpine:latest", command=["echo", "a"], slurm={"cpus_per_task": 2, "partition": "short"}),
+            Step(name="b", image="alpine:latest", command=["echo", "b"], slurm={"cpus_per_task": 4, "partition": "short"}),
+        ]
+    )
+    run_recorder = RunRecorder(tmp_path)
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, runner)
+
+    assert [step_result.exit_code for step_result in pipeline_result.step_results] == [0, 0]
+    assert [step_result.job_id for step_result in pipeline_result.step_results] == ["3000", "3000"]
+    with open(pipeline_result.step_results[1].log_file) as f:
+        logs = f.read()
+    assert "--jobid=3000" in logs
+    assert "--cpus-per-task=4" in logs
+    assert "--partition" not in logs
+
+    calls = calls_file.read_text().splitlines()
+    assert calls == [
+        "salloc --no-shell --job-name=proceed --cpus-per-task=4 --partition=short --account=lab",
+        "scancel 3000"
+    ]
+    assert runner.allocation_id is None
+
+
+def test_array_step_in_allocation(fake_slurm_runner, tmp_path):
+    # Array steps run as their own sbatch jobs, so their inner srun must not target the pipeline allocation.
+    fake_slurm_runner.allocation_id = "555"
+    step = Step(name="fan out", image="alpine:latest", array="0-1", command=["echo", "hello"])
+    step_result = run_step(step, Path(tmp_path, "fan_out.log"), fake_slurm_runner)
+    assert step_result.exit_code == 0
+
+    options = json.loads(Path(tmp_path, "fake_slurm_state", "1000.json").read_text())["options"]
+    assert not any(arg.startswith("--jobid") for arg in shlex.split(options["wrap"]))
+
+
+def test_pipeline_allocation_invalid_options(tmp_path):
+    runner = SlurmRunner(srun_path="/usr/bin/echo", salloc_path="/usr/bin/false", allocate=True)
+    pipeline = Pipeline(steps=[Step(name="a", image="alpine:latest", command=["echo", "a"], slurm={"time": "soon"})])
+    run_recorder = RunRecorder(tmp_path)
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, runner)
+
+    # Options Proceed can't combine should not abort the pipeline, just the allocation.
+    assert pipeline_result.step_results[0].exit_code == 0
+    assert runner.allocation_id is None
+
+
+def test_pipeline_allocation_error(tmp_path):
+    runner = SlurmRunner(srun_path="/usr/bin/echo", salloc_path="/usr/bin/false", allocate=True)
+    pipeline = Pipeline(steps=[Step(name="a", image="alpine:latest", command=["echo", "a"])])
+    run_recorder = RunRecorder(tmp_path)
+    pipeline_result = run_pipeline(pipeline, tmp_path, run_recorder, runner)
+
+    # The step should still run with its own srun.
+    assert pipeline_result.step_results[0].exit_code == 0
+    with open(pipeline_result.step_results[0].log_file) as f:
+        assert "--jobid" not in f.read()
@@ -0,0 +1,129 @@
+import logging
+import gzip
+from pathlib import Path
+from datetime import datetime
+
+from pytest import raises
+
+from proceed.step_logs import StepLogWriter, log_file_details, log_file_name, open_log, stream_log_path
+from proceed.file_matching import hash_contents
+
+
+def write_lines(log_path: Path, echo: str, limit: int = None, line_count: int = 10):
+    with StepLogWriter(log_path, "test step", echo=echo, limit=limit) as log_writer:
+        for index in range(line_count):
+            log_writer.write(f"line {index}\n".encode("utf-8"))
+
+
+def echoed_lines(caplog) -> list[str]:
+    return [message for message in caplog.messages if message.startswith("Step 'test step': line")]
+
+
+def test_log_file_name():
+    assert log_file_name("step") == "step.log"
+    assert log_file_name("step", "gzip") == "step.log.gz"
+    assert log_file_name("step", "zstd") == "step.log.zst"
+    with raises(ValueError):
+        log_file_name("step", "NOPE")
+
+
+def test_echo_policy_unknown(tmp_path):
+    with raises(ValueError):
+        StepLogWriter(Path(tmp_path, "step.log"), "test step", echo="NOPE")
+
+
+def test_echo_all(tmp_path, caplog):
+    log_path = Path(tmp_path, "step.log")
+    with caplog.at_level(logging.INFO):
+        write_lines(log_path, "all")
+    assert echoed_lines(caplog) == [f"Step 'test step': line {index}" for index in range(10)]
+    assert log_path.read_text() == "".join(f"line {index}\n" for index in range(10))
+
+
+def test_echo_none(tmp_path, caplog):
+    log_path = Path(tmp_path, "step.log")
+    with caplog.at_level(logging.INFO):
+        write_lines(log_path, "none")
+    assert echoed_lines(caplog) == []
+    assert log_path.read_text() == "".join(f"line {index}\n" for index in range(10))
+
+
+def test_echo_sampled(tmp_path, caplog):
+    log_path = Path(tmp_path, "step.log")
+    with caplog.at_level(logging.INFO):
+        write_lines(log_path, "sampled", limit=4)
+    assert echoed_lines(caplog) == ["Step 'test step': line 0", "Step 'test step': line 4", "Step 'test step': line 8"]
+    assert f"Step 'test step': wrote 10 lines to {log_path}" in caplog.messages
+
+
+def test_echo_rate_limited(tmp_path, caplog):
+    log_path = Path(tmp_path, "step.log")
+    with caplog.at_level(logging.INFO):
+        write_lines(log_path, "rate_limited", limit=3)
+    assert echoed_lines(caplog) == ["Step 'test step': line 0", "Step 'test step': line 1", "Step 'test step': line 2"]
+
+
+def test_echo_tail(tmp_path, caplog):
+    log_path = Path(tmp_path, "step.log")
+    with caplog.at_level(logging.INFO):
+        write_lines(log_path, "tail", limit=2)
+    assert echoed_lines(caplog) == ["Step 'test step': line 8", "Step 'test step': line 9"]
+
+
+def test_gzip_compression(tmp_path):
+    log_path = Path(tmp_path, log_file_name("step", "gzip"))
+    write_lines(log_path, "none")
+    with open_log(log_path, "at") as f:
+        f.write("appended\n")
+
+    with gzip.open(log_path, "rt") as f:
+        assert f.read() == "".join(f"line {index}\n" for index in range(10)) + "appended\n"
+
+
+def test_zstd_compression(tmp_path):
+    log_path = Path(tmp_path, log_file_name("step", "zstd"))
+    write_lines(log_path, "none")
+    with open_log(log_path, "at") as f:
+        f.write("appended\n")
+
+    with open_log(log_path, "rt") as f:
+        assert f.read() == "".join(f"line {index}\n" for index in range(10)) + "appended\n"
+
+
+def test_log_details(tmp_path):
+    for compression in [None, "gzip", "zstd"]:
+        log_path = Path(tmp_path, log_file_name("step", compression))
+        with StepLogWriter(log_path, "test step", echo="none") as log_writer:
+            for index in range(1000):
+                log_writer.write(f"line {index}\n".encode("utf-8"))
+            assert log_writer.log_details() == {}
+
+        log_details = log_writer.log_details()
+        assert log_details["log_digest"] == hash_contents(log_path)
+        assert log_details["log_size"] == log_path.stat().st_size
+        assert log_file_details(log_path) == log_details
+
+    # Appending to an existing log means the writer doesn't see the whole file.
+    with StepLogWriter(log_path, "test step", echo="none", mode="ab") as log_writer:
+        log_writer.write(b"appended\n")
+    assert log_writer.log_details() == {}
+
+    assert log_file_details(Path(tmp_path, "no_such_file.log")) == {}
+
+
+def test_stream_log_path():
+    assert stream_log_path(Path("/results/step.log"), "stdout") == Path("/results/step.stdout.log")
+    assert stream_log_path(Path("/results/step.log.gz"), "stderr") == Path("/results/step.stderr.log.gz")
+    assert stream_log_path(Path("/results/step.txt"), "stdout") == Path("/results/step.txt.stdout")
+
+
+def test_timestamps(tmp_path):
+    log_path = Path(tmp_path, "step.log")
+    with StepLogWriter(log_path, "test step", echo="none", timestamps=True) as log_writer:
+        log_writer.write(b"one\ntw")
+        log_writer.write(b"o\nthree\n")
+
+    lines = log_path.read_text().splitlines()
+    assert [line.split(" ", maxsplit=1)[1] for line in lines] == ["one", "two", "three"]
+    for line in lines:
+        assert datetime.strptime(line.split(" ")[0], "%Y-%m-%dT%H:%M:%S.%fZ")